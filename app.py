@@ -1,6 +1,8 @@
+import os
 import streamlit as st
 import pandas as pd
-from model import DeputyRecommender
+from model import RecommenderRegistry, partition_path
+from proposition_search import PropositionSearch
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -10,12 +12,26 @@ from sklearn.preprocessing import StandardScaler
 # Set the page configuration to wide
 st.set_page_config(layout="wide")
 
-# Load the deputies data to populate the dropdown menu
-data_path = 'data/enriched_df.csv'
-df = pd.read_csv(data_path, encoding='utf-8')
+# Models of every legislature and year, loaded when a period is first selected
+@st.cache_resource
+def load_registry():
+    return RecommenderRegistry()
 
-# Initialize the recommender
-recommender = DeputyRecommender(data_path)
+# Features of one period, as its model was built from them
+@st.cache_data
+def load_features(legislature, year):
+    return pd.read_parquet(os.path.join(partition_path(legislature, year), 'features.parquet'))
+
+registry = load_registry()
+periods = registry.periods()
+
+def format_period(period):
+    return f"Legislature {period[0]}, {period[1]}"
+
+# One proposition index shared by every session
+@st.cache_resource
+def load_proposition_search():
+    return PropositionSearch()
 
 # Function to load and display the Markdown file
 def load_markdown(file_path):
@@ -28,9 +44,15 @@ st.title('Deputy Recommender System')
 
 # Sidebar navigation with selectbox
 st.sidebar.title("Navigation")
-page = st.sidebar.selectbox("Go to", ["Recommender", "Model Explanation"])
+page = st.sidebar.selectbox("Go to", ["Recommender", "Proposition Search", "Model Explanation"])
 
 if page == "Recommender":
+    # The deputy's period, and the period whose deputies they are compared with
+    period = st.selectbox('Period:', periods, index=len(periods) - 1, format_func=format_period)
+    against = st.selectbox('Compare against:', periods, index=periods.index(period), format_func=format_period)
+    df = load_features(*period)
+    rec_df = load_features(*against)
+
     # Dropdown menu for selecting a deputy
     deputy_name = st.selectbox('Select a Deputy:', df['name'].unique())
 
@@ -43,7 +65,10 @@ if page == "Recommender":
         deputy_id = df.loc[df['name'] == deputy_name, 'deputy_id'].values[0]
         
         try:
-            recommendations = recommender.recommend_by_id(deputy_id, top_n)
+            if against == period:
+                recommendations = registry.recommend_by_id(deputy_id, *period, top_n)
+            else:
+                recommendations = registry.compare(deputy_id, period, against, top_n)
             st.write(f"Recommendations for {deputy_name}:")
             
             # Display the main deputy's photo and data
@@ -54,7 +79,7 @@ if page == "Recommender":
             
             with cols[1]:
                 # Create a dashboard view for the main deputy
-                st.subheader("Deputy information for the year 2024")
+                st.subheader(f"Deputy information for the year {period[1]}")
                 st.write("*Ideology, populist elements (score 0 to 1) and agenda was generated using Zero Shot GPT API to summarize the propositions of a given deputy.")
                 st.write(f"**Name:** {deputy_name}")
                 st.write(f"**ID:** {deputy_id}")
@@ -90,7 +115,7 @@ if page == "Recommender":
                                   f"Diff: {percentage_diff:+.1f}%")
                 
                 # Collect values for the recommendations
-                rec_values = [df.loc[df['deputy_id'] == rec['deputy_id'], feature].values[0] for rec in recommendations['similar_deputies']]
+                rec_values = [rec_df.loc[rec_df['deputy_id'] == rec['deputy_id'], feature].values[0] for rec in recommendations['similar_deputies']]
                 fig = px.bar(
                     x=['Deputy', 'Mean', 'Median'] + [rec['name'] for rec in recommendations['similar_deputies']], 
                     y=[deputy_value, mean_value, median_value] + rec_values, 
@@ -106,7 +131,7 @@ if page == "Recommender":
             cols = st.columns(top_n)
             for i, rec in enumerate(recommendations['similar_deputies']):
                 with cols[i]:
-                    rec_photo_url = df.loc[df['deputy_id'] == rec['deputy_id'], 'photo_url'].values[0]
+                    rec_photo_url = rec_df.loc[rec_df['deputy_id'] == rec['deputy_id'], 'photo_url'].values[0]
                     st.image(rec_photo_url, caption=rec['name'], width=100)
                     st.markdown(f"**Name:** {rec['name']}")
                     st.markdown(f"**Similarity Score:** {rec['similarity_score']}")
@@ -116,7 +141,7 @@ if page == "Recommender":
             # Display the deputy and recommendations data
             st.write("Deputy and Recommendations Data")
             st.write(df[df['deputy_id'] == deputy_id])
-            st.write(df[df['deputy_id'].isin([rec['deputy_id'] for rec in recommendations['similar_deputies']])])
+            st.write(rec_df[rec_df['deputy_id'].isin([rec['deputy_id'] for rec in recommendations['similar_deputies']])])
         
         except ValueError as e:
             st.error(f"Error: {e}")
@@ -133,6 +158,21 @@ if page == "Recommender":
 #         # Placeholder for LLM response
 #         st.write("TO-DO: add a model with RAG on the dataset")
 
+elif page == "Proposition Search":
+    st.title("Proposition Search")
+    query = st.text_input('Which deputies proposed things about:', '')
+    top_n = st.slider('Number of Deputies:', 1, 50, 10)
+
+    if query:
+        try:
+            results = load_proposition_search().search(query, top_n)
+            if results.empty:
+                st.write("No propositions found.")
+            else:
+                st.dataframe(results, use_container_width=True)
+        except Exception as e:
+            st.error(f"Proposition search unavailable (run the silver layer first): {e}")
+
 elif page == "Model Explanation":
     st.title("Model Explanation")
     load_markdown('docs/about_the_model.md')
\ No newline at end of file
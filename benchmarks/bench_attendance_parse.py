@@ -0,0 +1,70 @@
+"""
+Parse-time benchmark for the attendance scraper over saved deputy pages.
+
+Compares the previous approach (BeautifulSoup over the whole page) with
+`parse_attendance_html`, which only parses the `presencas__section` fragments,
+and checks that both return the same counts.
+
+    python benchmarks/bench_attendance_parse.py [--repeat 50]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "data"))
+
+from get_data import parse_attendance_html, plenary_attendance_counts  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "attendance")
+
+
+def parse_full_document(html: str):
+    """Previous implementation: build the whole DOM, then look for the section."""
+    soup = BeautifulSoup(html, "html.parser")
+    for section in soup.find_all("section", class_="presencas__section"):
+        heading = section.find("h4", class_="presencas__section-heading")
+        if heading and "Presença em Plenário" in heading.text:
+            return plenary_attendance_counts(section)
+    return None
+
+
+def time_parser(parser, pages, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            parser(html)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+
+    for path, html in zip(paths, pages):
+        expected = parse_full_document(html)
+        got = parse_attendance_html(html)
+        assert got == expected, f"{os.path.basename(path)}: {got} != {expected}"
+
+    full = time_parser(parse_full_document, pages, args.repeat)
+    targeted = time_parser(parse_attendance_html, pages, args.repeat)
+    avg_kb = sum(len(html) for html in pages) / len(pages) / 1024
+
+    print(f"{len(pages)} fixtures, {avg_kb:.0f} KiB on average, {args.repeat} repeats")
+    print(f"full document parse : {full * 1000:8.3f} ms/page")
+    print(f"targeted parse      : {targeted * 1000:8.3f} ms/page")
+    print(f"speedup             : {full / targeted:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
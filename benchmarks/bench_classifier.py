@@ -0,0 +1,212 @@
+"""
+Deputy classification throughput benchmark against an offline fake LLM.
+
+Classifies synthetic deputies with gpt_classifier.classify_deputies_batch at a few
+concurrency levels, against a model that injects latency and, in the throttled
+scenarios, enforces its own rate limit with 429s. Reports wall time, deputies per
+second, calls made, cache hits, 429/5xx responses, peak calls in flight and
+completeness.
+
+    python benchmarks/bench_classifier.py [--deputies 120] [--latency-ms 200] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "data"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from classification_cache import ClassificationCache  # noqa: E402
+from fake_llm import FakeLLM, FakeLLMConfig  # noqa: E402
+from gpt_classifier import classify_deputies_batch  # noqa: E402
+from http_retry import RetryPolicy  # noqa: E402
+from proposition_budget import BudgetStats, count_tokens  # noqa: E402
+
+SUBJECTS = [
+    "saúde pública", "segurança pública", "educação básica", "meio ambiente",
+    "tributação", "previdência", "agricultura familiar", "armas de fogo",
+]
+ACTIONS = [
+    "Institui o programa nacional de", "Altera a legislação de", "Cria o fundo de",
+    "Dispõe sobre a fiscalização de", "Estabelece diretrizes para", "Susta os efeitos do decreto sobre",
+]
+TARGETS = [
+    "municípios de pequeno porte", "pessoas com deficiência", "jovens de baixa renda",
+    "produtores rurais", "servidores públicos", "micro e pequenas empresas",
+    "comunidades indígenas", "idosos", "estudantes da rede pública",
+]
+
+# Classifier settings and server limits per scenario; unless a scenario is about
+# the budgets, the classifier's own limits are set high enough not to matter
+UNLIMITED = {"requests_per_minute": 60_000, "tokens_per_minute": 100_000_000}
+SCENARIOS = {
+    "serial": {"batch_size": 1, **UNLIMITED},
+    "concurrent_16": {"batch_size": 16, **UNLIMITED},
+    "concurrent_50": {"batch_size": 50, **UNLIMITED},
+    "flaky_50": {"batch_size": 50, **UNLIMITED, "server": {"error_rate": 0.05}},
+    # The server accepts 20 calls per second: unpaced, then paced just below it
+    "throttled_50": {
+        "batch_size": 50,
+        **UNLIMITED,
+        "server": {"requests_per_window": 20, "window_seconds": 1.0},
+    },
+    "paced_50": {
+        "batch_size": 50,
+        "requests_per_minute": 1080,
+        "tokens_per_minute": 100_000_000,
+        "server": {"requests_per_window": 20, "window_seconds": 1.0},
+    },
+    # The default gpt-4o-mini budgets (500 RPM, 200k TPM)
+    "budgeted_50": {"batch_size": 50},
+    # A second run over the same propositions, answered by the classification cache
+    "cached_50": {"batch_size": 50, **UNLIMITED, "warm_cache": True},
+    # Hundreds of ementas per deputy: one whole-list prompt, then budgeted chunks
+    "prolific_whole": {"batch_size": 50, **UNLIMITED, "prolific": True, "token_budget": None},
+    "prolific_chunked": {"batch_size": 50, **UNLIMITED, "prolific": True},
+}
+
+
+def synthetic_deputies(count: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame(
+        {
+            "deputy_id": range(204300, 204300 + count),
+            "propositions_list": [
+                str(
+                    [
+                        f"Dispõe sobre {rng.choice(SUBJECTS)} ({i}-{j})"
+                        for j in range(rng.randint(1, 30))
+                    ]
+                )
+                for i in range(count)
+            ],
+        }
+    )
+
+
+def prolific_deputies(count: int, seed: int = 0) -> pd.DataFrame:
+    """Deputies with 100 to 400 ementas, a third of them template requests for hearings."""
+    rng = random.Random(seed)
+
+    def ementa() -> str:
+        if rng.random() < 1 / 3:
+            return (
+                f"Requer a realização de audiência pública para debater {rng.choice(SUBJECTS)} "
+                f"no dia {rng.randint(1, 28)}/{rng.randint(1, 12)}/2023"
+            )
+        return (
+            f"{rng.choice(ACTIONS)} {rng.choice(SUBJECTS)} voltado a {rng.choice(TARGETS)}, "
+            f"com metas para {rng.choice(TARGETS)} e {rng.choice(SUBJECTS)} até {rng.randint(2024, 2040)}"
+        )
+
+    return pd.DataFrame(
+        {
+            "deputy_id": range(204300, 204300 + count),
+            "propositions_list": [
+                str([ementa() for _ in range(rng.randint(100, 400))]) for _ in range(count)
+            ],
+        }
+    )
+
+
+def bench(scenario: str, args) -> Dict:
+    settings = dict(SCENARIOS[scenario])
+    server = settings.pop("server", {})
+    warm_cache = settings.pop("warm_cache", False)
+    if settings.pop("prolific", False):
+        deputies = prolific_deputies(args.deputies)
+    else:
+        deputies = synthetic_deputies(args.deputies)
+
+    def fake_llm() -> FakeLLM:
+        return FakeLLM(
+            FakeLLMConfig(
+                latency_ms=args.latency_ms,
+                jitter_ms=args.latency_ms / 2,
+                latency_ms_per_1k_tokens=args.latency_ms_per_1k_tokens,
+                retry_after=0.2,
+                **server,
+            )
+        )
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ClassificationCache(os.path.join(cache_dir, "classifications.sqlite"))
+        retry = RetryPolicy(max_retries=8, base_delay=0.1, max_delay=2.0)
+        if warm_cache:
+            classify_deputies_batch(
+                deputies, **settings, llm=fake_llm(), retry=retry, cache=cache
+            )
+        llm = fake_llm()
+        budget = BudgetStats()
+        hits_before = cache.snapshot()["hits"]
+        start = time.perf_counter()
+        results = classify_deputies_batch(
+            deputies, **settings, llm=llm, retry=retry, cache=cache, budget_stats=budget
+        )
+        seconds = time.perf_counter() - start
+        cache_hits = cache.snapshot()["hits"] - hits_before
+        cache.close()
+    stats = llm.report()
+    budget_report = budget.report()
+    return {
+        "scenario": scenario,
+        "batch_size": settings["batch_size"],
+        "seconds": round(seconds, 3),
+        "deputies_per_second": round(len(results) / seconds, 1),
+        "calls": stats["calls"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "tokens_saved": budget_report["tokens_saved"],
+        "latency_saved_seconds": budget_report["latency_saved_seconds"],
+        "cache_hits": cache_hits,
+        "rate_limited": stats["rate_limited"],
+        "server_errors": stats["errors"],
+        "max_in_flight": stats["max_in_flight"],
+        "completeness": round(len(results) / len(deputies), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deputies", type=int, default=120)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--latency-ms-per-1k-tokens", type=float, default=50.0)
+    parser.add_argument(
+        "--scenario", choices=list(SCENARIOS), action="append", help="Default: all"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    # Retries and failures are expected here and show up in the results instead
+    logging.disable(logging.CRITICAL)
+    # Load (or fail to download) the tokenizer before anything is timed
+    count_tokens("")
+
+    results: List[Dict] = [bench(scenario, args) for scenario in args.scenario or list(SCENARIOS)]
+
+    print(
+        f"{'scenario':<16} {'batch':>5} {'seconds':>8} {'dep/s':>7} {'calls':>6} "
+        f"{'tokens':>9} {'saved':>8} {'cached':>6} {'429':>5} {'5xx':>5} {'in flight':>9} {'complete':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['scenario']:<16} {r['batch_size']:>5} {r['seconds']:>8.2f} "
+            f"{r['deputies_per_second']:>7.1f} {r['calls']:>6} {r['prompt_tokens']:>9} "
+            f"{r['tokens_saved']:>8} {r['cache_hits']:>6} "
+            f"{r['rate_limited']:>5} "
+            f"{r['server_errors']:>5} {r['max_in_flight']:>9} {r['completeness']:>9.1%}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Collector throughput and retry-overhead benchmark against the local mock API.
+
+Runs expenses, attendance and propositions collection with the thread and the
+async engine under a few server conditions (clean, flaky, throttled) and reports
+wall time, requests per second, how many requests were repeats of an earlier URL
+(retries), the 429/5xx responses seen, and how complete the collected data is.
+
+    python benchmarks/bench_collector.py [--deputies 40] [--latency-ms 20] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "data"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from async_collector import run_collection  # noqa: E402
+from get_data import DeputiesDataCollector  # noqa: E402
+from mock_camara import MockConfig, MockServer  # noqa: E402
+
+TASKS = ["expenses", "attendance", "propositions"]
+
+SCENARIOS = {
+    "clean": {},
+    "flaky": {"error_rate": 0.05},
+    "throttled": {"throttle_rps": 60.0, "throttle_burst": 20, "retry_after": 0.5},
+}
+
+
+def run_threads(server: MockServer, output_dir: str, web_rate: float) -> Dict:
+    collector = DeputiesDataCollector(
+        output_dir=output_dir, sleep_time=1 / web_rate, cache=None
+    )
+    collector.BASE_URL = server.api_url
+    collector.WEBSITE_URL = server.website_url
+    _, expenses, attendance, propositions = collector.build_data_collection(
+        year=server.mock.config.year, tasks=TASKS
+    )
+    return {"expenses": expenses, "attendance": attendance, "propositions": propositions}
+
+
+def run_async(server: MockServer, output_dir: str, web_rate: float) -> Dict:
+    return asyncio.run(
+        run_collection(
+            TASKS,
+            year=server.mock.config.year,
+            output_dir=output_dir,
+            base_url=server.api_url,
+            website_url=server.website_url,
+            api_rate=1000,
+            web_rate=web_rate,
+            cache=None,
+        )
+    )
+
+
+def completeness(tables: Dict, expected: Dict[str, int]) -> Dict[str, float]:
+    """Share of the expected rows each table actually holds."""
+    collected = {
+        "expenses": len(tables.get("expenses", [])),
+        "propositions": int(tables["propositions"]["proposition_count"].sum())
+        if "propositions" in tables and len(tables["propositions"])
+        else 0,
+        # Failed pages are saved with zero counts, so only count real rows
+        "attendance": int((tables["attendance"]["presencas"] > 0).sum())
+        if "attendance" in tables and len(tables["attendance"])
+        else 0,
+    }
+    return {name: collected[name] / expected[name] for name in collected}
+
+
+def bench(scenario: str, engine: str, args) -> Dict:
+    config = MockConfig(
+        deputies=args.deputies,
+        expenses_per_deputy=args.expenses_per_deputy,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.latency_ms / 2,
+        **SCENARIOS[scenario],
+    )
+    runner = run_threads if engine == "threads" else run_async
+    with MockServer(config) as server, tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        tables = runner(server, output_dir, args.web_rate)
+        seconds = time.perf_counter() - start
+        stats = server.mock.stats()
+        expected = server.mock.expected_rows()
+
+    statuses = stats["by_status"]
+    return {
+        "scenario": scenario,
+        "engine": engine,
+        "seconds": round(seconds, 3),
+        "requests": stats["requests"],
+        "requests_per_second": round(stats["requests"] / seconds, 1),
+        "retry_overhead": round(stats["repeated_requests"] / stats["distinct_requests"], 4),
+        "throttled": statuses.get("429", 0),
+        "server_errors": sum(v for k, v in statuses.items() if k.startswith("5")),
+        "completeness": {k: round(v, 4) for k, v in completeness(tables, expected).items()},
+        "server": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deputies", type=int, default=40)
+    parser.add_argument("--expenses-per-deputy", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--web-rate", type=float, default=50.0, help="Website pages per second"
+    )
+    parser.add_argument(
+        "--scenario", choices=list(SCENARIOS), action="append", help="Default: all"
+    )
+    parser.add_argument(
+        "--engine", choices=["threads", "async"], action="append", help="Default: both"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    # Failed requests are expected here and show up in the results instead
+    logging.disable(logging.CRITICAL)
+
+    results: List[Dict] = []
+    for scenario in args.scenario or list(SCENARIOS):
+        for engine in args.engine or ["threads", "async"]:
+            results.append(bench(scenario, engine, args))
+
+    print(
+        f"{'scenario':<10} {'engine':<8} {'seconds':>8} {'req/s':>8} {'retries':>8} "
+        f"{'429':>5} {'5xx':>5} {'expenses':>9} {'attend.':>8} {'props':>7}"
+    )
+    for r in results:
+        c = r["completeness"]
+        print(
+            f"{r['scenario']:<10} {r['engine']:<8} {r['seconds']:>8.2f} "
+            f"{r['requests_per_second']:>8.1f} {r['retry_overhead']:>8.1%} "
+            f"{r['throttled']:>5} {r['server_errors']:>5} {c['expenses']:>9.1%} "
+            f"{c['attendance']:>8.1%} {c['propositions']:>7.1%}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+End-to-end pipeline benchmark on synthetic inputs at multiples of today's volume.
+
+For every scale, the code is copied into a scratch tree, synthetic_data writes
+the raw inputs and classifications into it, and the stages of data/pipeline.py
+(bronze, silver, gold, overlap, enrich, model) run there one at a time. Each stage
+records wall time, peak memory (the largest resident set of the stage process
+and its children), the database size and the size of its outputs. A stage that
+fails, runs past --timeout or hits --max-memory-gb stops that scale; its error
+is reported and the larger scales still run.
+
+    python benchmarks/bench_pipeline.py [--scales 1 10 100] [--max-memory-gb 4] [--json out.json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from synthetic_data import ROOT_DIR, generate  # noqa: E402
+
+STAGES = ["bronze", "silver", "gold", "overlap", "enrich", "model"]
+
+# Data, state and caches are produced by the run; only the code and configuration are copied
+COPY_IGNORE = shutil.ignore_patterns(
+    ".git", "__pycache__", "benchmarks", "docs", "raw", "_state", ".*_cache", ".llm_cache",
+    "*.csv", "*.parquet", "*_parquet", "*.db", "*.db.wal", "*.pkl",
+)
+
+
+def load_pipeline(root: str):
+    """data/pipeline.py of the scratch tree, so its stages point at that tree."""
+    sys.path.insert(0, os.path.join(root, "data"))
+    spec = importlib.util.spec_from_file_location("scratch_pipeline", os.path.join(root, "data", "pipeline.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def size_of(paths: List[str]) -> int:
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+def run_stage(stage, log_path: str, timeout: float, max_memory_gb: Optional[float]) -> Dict:
+    """Run one stage as a child process; wall seconds, peak RSS and exit status."""
+
+    def limit_memory():
+        if max_memory_gb:
+            limit = int(max_memory_gb * 1024**3)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(
+            stage.command, cwd=stage.cwd, stdout=log, stderr=subprocess.STDOUT, preexec_fn=limit_memory
+        )
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+        # wait4 reports the child's peak RSS, covering the children it waited for
+        _, status, usage = os.wait4(process.pid, 0)
+        timer.cancel()
+    seconds = time.perf_counter() - start
+    if os.WIFSIGNALED(status):
+        killed = signal.Signals(os.WTERMSIG(status)).name
+        error = "timed out" if seconds >= timeout else f"killed by {killed}"
+    else:
+        error = None if os.WEXITSTATUS(status) == 0 else f"exit status {os.WEXITSTATUS(status)}"
+    if error:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+            tail = log.read().strip().splitlines()[-3:]
+        error = f"{error}: {' | '.join(tail)}" if tail else error
+    return {"seconds": round(seconds, 2), "peak_mb": round(usage.ru_maxrss / 1024, 1), "error": error}
+
+
+def bench_scale(scale: float, args) -> List[Dict]:
+    workdir = tempfile.mkdtemp(prefix=f"bench_pipeline_{scale:g}x_")
+    root = os.path.join(workdir, "repo")
+    shutil.copytree(ROOT_DIR, root, ignore=COPY_IGNORE)
+
+    start = time.perf_counter()
+    inputs = generate(os.path.join(root, "data"), scale, args.year, seed=args.seed)
+    rows = [
+        {
+            "scale": scale,
+            "stage": "generate",
+            "seconds": round(time.perf_counter() - start, 2),
+            "peak_mb": None,
+            "db_mb": 0.0,
+            "outputs_mb": round(sum(stats["bytes"] for stats in inputs.values()) / 1e6, 1),
+            "error": None,
+            "deputies": inputs["deputies"]["rows"],
+            "expense_rows": inputs["expense"]["rows"],
+        }
+    ]
+    print(format_row(rows[0]), flush=True)
+    pipeline = load_pipeline(root)
+    stages = {stage.name: stage for stage in pipeline.build_stages(args.year)}
+
+    for name in STAGES:
+        stage = stages[name]
+        result = run_stage(stage, os.path.join(workdir, f"{name}.log"), args.timeout, args.max_memory_gb)
+        outputs = [os.path.join(root, path) for path in pipeline.expand(stage.outputs)]
+        rows.append(
+            {
+                "scale": scale,
+                "stage": name,
+                **result,
+                "db_mb": round(size_of([pipeline.DB_PATH]) / 1e6, 1),
+                "outputs_mb": round(size_of(outputs) / 1e6, 1),
+            }
+        )
+        print(format_row(rows[-1]), flush=True)
+        if result["error"]:
+            break
+
+    if args.keep:
+        print(f"Kept {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def format_row(row: Dict) -> str:
+    peak = f"{row['peak_mb']:>9.1f}" if row["peak_mb"] is not None else f"{'':>9}"
+    return (
+        f"{row['scale']:>6g}x {row['stage']:<9} {row['seconds']:>9.2f} {peak} "
+        f"{row['db_mb']:>8.1f} {row['outputs_mb']:>10.1f}  {row['error'] or 'ok'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds per stage")
+    parser.add_argument(
+        "--max-memory-gb", type=float, help="Address-space limit per stage, to fail instead of swapping"
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch trees and stage logs")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{'scale':>7} {'stage':<9} {'seconds':>9} {'peak MB':>9} {'db MB':>8} {'output MB':>10}  status")
+    results = []
+    for scale in args.scales:
+        rows = bench_scale(scale, args)
+        results.extend(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Near-duplicate proposition detection benchmark: MinHash/LSH against all pairs.
+
+Samples the real ementas in the gold metrics (with replacement beyond their
+count) and rewrites a share of them with a few words changed, the way
+copied propositions differ. For each size, times
+proposition_overlap.find_near_duplicates and an exact all-pairs Jaccard over the
+same shingle sets (a sparse incidence-matrix product), and reports the pairs
+each finds and the LSH recall. All pairs is skipped above --max-exact.
+
+    python benchmarks/bench_proposition_overlap.py [--sizes 5000 20000 80000] [--json out.json]
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from proposition_budget import shingles  # noqa: E402
+from proposition_overlap import (  # noqa: E402
+    BANDS,
+    NEAR_DUPLICATE_JACCARD,
+    NUM_PERM,
+    lsh_candidates,
+    minhash_signatures,
+)
+
+METRICS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data", "gold", "deputies_consolidated_metrics_parquet"
+)
+
+
+def real_ementas() -> List[str]:
+    texts = []
+    for propositions in pd.read_parquet(METRICS_PATH, columns=["propositions_list"])["propositions_list"]:
+        if propositions is None or len(propositions) == 0:
+            continue
+        try:
+            texts.extend(ast.literal_eval(propositions[0]))
+        except (ValueError, SyntaxError):
+            # A few lists hold doubled quotes Python can't read back
+            continue
+    return texts
+
+
+def sample(texts: List[str], size: int, rng: np.random.Generator, edited: float = 0.3) -> List[str]:
+    """`size` ementas; `edited` of them have one or two words replaced by words of another ementa."""
+    picked = [texts[i] for i in rng.integers(len(texts), size=size)]
+    for i in np.flatnonzero(rng.random(size) < edited):
+        words = picked[i].split()
+        donor = texts[rng.integers(len(texts))].split()
+        for _ in range(rng.integers(1, 3)):
+            words[rng.integers(len(words))] = donor[rng.integers(len(donor))]
+        picked[i] = " ".join(words)
+    return picked
+
+
+def exact_pairs(sets: List[frozenset], threshold: float) -> set:
+    """Every pair at or above `threshold` Jaccard, from the intersections of all pairs."""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, s in enumerate(sets):
+        for shingle in s:
+            rows.append(i)
+            cols.append(vocabulary.setdefault(shingle, len(vocabulary)))
+    incidence = scipy.sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(sets), len(vocabulary))
+    )
+    intersections = scipy.sparse.triu(incidence @ incidence.T, k=1).tocoo()
+    sizes = np.array([len(s) for s in sets])
+    jaccard = intersections.data / (sizes[intersections.row] + sizes[intersections.col] - intersections.data)
+    keep = jaccard >= threshold
+    return set(zip(intersections.row[keep].tolist(), intersections.col[keep].tolist()))
+
+
+def bench(texts: List[str], size: int, args) -> Dict:
+    corpus = sample(texts, size, np.random.default_rng(args.seed))
+    sets = list({shingles(text, keep_digits=True): None for text in corpus})
+
+    start = time.perf_counter()
+    candidates = lsh_candidates(minhash_signatures(sets, NUM_PERM), BANDS)
+    found = {
+        (i, j)
+        for i, j in candidates
+        if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= NEAR_DUPLICATE_JACCARD
+    }
+    result = {
+        "ementas": size,
+        "distinct": len(sets),
+        "lsh_seconds": round(time.perf_counter() - start, 2),
+        "candidates": len(candidates),
+        "lsh_pairs": len(found),
+        "exact_seconds": None,
+        "exact_pairs": None,
+        "recall": None,
+    }
+    if size <= args.max_exact:
+        start = time.perf_counter()
+        exact = exact_pairs(sets, NEAR_DUPLICATE_JACCARD)
+        result["exact_seconds"] = round(time.perf_counter() - start, 2)
+        result["exact_pairs"] = len(exact)
+        result["recall"] = round(len(found & exact) / len(exact), 4) if exact else None
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 10000, 20000, 40000, 80000])
+    parser.add_argument("--max-exact", type=int, default=40000, help="Largest size compared against all pairs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    texts = real_ementas()
+    print(f"{len(texts)} real ementas")
+    print(
+        f"{'ementas':>8} {'distinct':>9} {'LSH s':>7} {'candidates':>11} {'LSH pairs':>10} "
+        f"{'exact s':>8} {'exact pairs':>12} {'recall':>7}"
+    )
+    results = []
+    for size in args.sizes:
+        r = bench(texts, size, args)
+        results.append(r)
+        exact = (
+            f"{r['exact_seconds']:>8.2f} {r['exact_pairs']:>12} {r['recall'] if r['recall'] is not None else '-':>7}"
+            if r["exact_seconds"] is not None
+            else f"{'-':>8} {'-':>12} {'-':>7}"
+        )
+        print(
+            f"{r['ementas']:>8} {r['distinct']:>9} {r['lsh_seconds']:>7.2f} {r['candidates']:>11} "
+            f"{r['lsh_pairs']:>10} {exact}",
+            flush=True,
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Offline stand-in for the structured-output chat model used by utils/gpt_classifier.
+
+FakeLLM answers `invoke(prompt)` with a deterministic Classification after an
+injected latency, optionally growing with the prompt length. It can enforce its
+own requests/tokens budget over a sliding window, raising a 429 with a
+Retry-After header like the OpenAI API, or fail a share of calls with 500s, so
+the classifier can be exercised without a key.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    # Extra latency per 1000 prompt tokens, as long prompts take longer to process
+    latency_ms_per_1k_tokens: float = 0.0
+    # Server-side limits over a sliding window (None: unlimited)
+    requests_per_window: Optional[float] = None
+    tokens_per_window: Optional[float] = None
+    window_seconds: float = 60.0
+    retry_after: float = 1.0
+    # Share of calls failing with a 500
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+class FakeAPIError(Exception):
+    """Shaped like openai.APIStatusError: `status_code` and `response.headers`."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": f"{retry_after:g}"} if retry_after is not None else {}
+        self.response = type("Response", (), {"headers": headers})()
+
+
+class RateLimitError(FakeAPIError):
+    def __init__(self, retry_after: float):
+        super().__init__(429, retry_after)
+
+
+class FakeLLM:
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._window = deque()  # (time, tokens) of the calls accepted in the current window
+        self.in_flight = 0
+        self.stats = {
+            "calls": 0,
+            "ok": 0,
+            "rate_limited": 0,
+            "errors": 0,
+            "max_in_flight": 0,
+            "prompt_tokens": 0,
+        }
+
+    def _admit(self, tokens: int) -> Union[float, Exception]:
+        """Account for one call; returns the latency (ms) to inject, or the error to raise."""
+        config = self.config
+        now = time.monotonic()
+        with self._lock:
+            self.stats["calls"] += 1
+            while self._window and now - self._window[0][0] > config.window_seconds:
+                self._window.popleft()
+            over_requests = (
+                config.requests_per_window is not None
+                and len(self._window) + 1 > config.requests_per_window
+            )
+            over_tokens = (
+                config.tokens_per_window is not None
+                and sum(t for _, t in self._window) + tokens > config.tokens_per_window
+            )
+            if over_requests or over_tokens:
+                self.stats["rate_limited"] += 1
+                return RateLimitError(config.retry_after)
+            if self._random.random() < config.error_rate:
+                self.stats["errors"] += 1
+                return FakeAPIError(500)
+            self._window.append((now, tokens))
+            self.stats["prompt_tokens"] += tokens
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+            delay = max(
+                0.0,
+                config.latency_ms
+                + config.latency_ms_per_1k_tokens * tokens / 1000
+                + self._random.uniform(-1, 1) * config.jitter_ms,
+            )
+        return delay
+
+    def invoke(self, prompt):
+        from gpt_classifier import AgendaCategory, Classification, IdeologicalPosition
+
+        text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        admitted = self._admit(len(text) // 4)
+        if isinstance(admitted, Exception):
+            raise admitted
+        try:
+            time.sleep(admitted / 1000)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.stats["ok"] += 1
+
+        # The same prompt always gets the same answer
+        digest = hashlib.sha256(text.encode()).digest()
+        ideologies, agendas = list(IdeologicalPosition), list(AgendaCategory)
+        return Classification(
+            ideology=ideologies[digest[0] % len(ideologies)],
+            agenda_category=agendas[digest[1] % len(agendas)],
+            populist_elements=round(digest[2] / 255, 1),
+        )
+
+    def report(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,457 @@
+"""
+Local stand-in for the Câmara open-data API and the deputy pages on the website.
+
+Serves deterministic synthetic data in the shape the collectors expect:
+
+    GET /api/v2/deputados                      deputies of a legislature, paginated
+    GET /api/v2/deputados/{id}/despesas        expenses, paginated, ano/mes filters
+    GET /api/v2/proposicoes                    propositions by author and date range
+    GET /deputados/{id}?ano=YYYY               deputy page with the attendance sections
+
+Paginated endpoints send `x-total-count` and a `links` list like the real API.
+Latency, an error rate (HTTP 500) and throttling (HTTP 429 with Retry-After once
+a requests-per-second budget is exhausted) are configurable, and every request
+is counted so clients can be compared on throughput and retry overhead.
+
+    python benchmarks/mock_camara.py --port 8765 --latency-ms 40 --error-rate 0.02 --throttle-rps 30
+
+Point a collector at it with base_url/BASE_URL = http://127.0.0.1:8765/api/v2 and
+website_url/WEBSITE_URL = http://127.0.0.1:8765/deputados.
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+PARTIES = ["PT", "PL", "UNIÃO", "PP", "PSD", "MDB", "REPUBLICANOS", "PDT", "PSB", "PSOL"]
+STATES = ["SP", "RJ", "MG", "BA", "RS", "PR", "PE", "CE", "PA", "MA"]
+EXPENSE_TYPES = [
+    "COMBUSTÍVEIS E LUBRIFICANTES.",
+    "DIVULGAÇÃO DA ATIVIDADE PARLAMENTAR.",
+    "MANUTENÇÃO DE ESCRITÓRIO DE APOIO À ATIVIDADE PARLAMENTAR",
+    "PASSAGEM AÉREA - SIGEPA",
+    "TELEFONIA",
+]
+PROPOSITION_TOPICS = [
+    "segurança pública",
+    "saúde",
+    "educação básica",
+    "reforma tributária",
+    "meio ambiente",
+    "agronegócio",
+    "programas sociais",
+]
+FIRST_DEPUTY_ID = 204300
+
+
+class MockConfig:
+    """Knobs of the mock server; all randomness is seeded so runs are repeatable."""
+
+    def __init__(
+        self,
+        deputies: int = 513,
+        legislature: int = 57,
+        year: int = 2024,
+        expenses_per_deputy: int = 250,
+        propositions_per_deputy: int = 20,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rps: float = 0.0,
+        throttle_burst: int = 10,
+        retry_after: float = 1.0,
+        seed: int = 42,
+    ):
+        self.deputies = deputies
+        self.legislature = legislature
+        self.year = year
+        self.expenses_per_deputy = expenses_per_deputy
+        self.propositions_per_deputy = propositions_per_deputy
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.throttle_burst = throttle_burst
+        self.retry_after = retry_after
+        self.seed = seed
+
+    def deputy_ids(self) -> List[int]:
+        return [FIRST_DEPUTY_ID + i for i in range(self.deputies)]
+
+
+class MockCamara:
+    """Synthetic dataset plus the request accounting shared by all handlers."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.request_keys = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._tokens = float(config.throttle_burst)
+        self._updated = time.monotonic()
+
+    # Dataset
+
+    def deputies(self) -> List[Dict]:
+        cfg = self.config
+        return [
+            {
+                "id": dep_id,
+                "uri": f"/api/v2/deputados/{dep_id}",
+                "nome": f"Deputado {dep_id}",
+                "siglaPartido": PARTIES[dep_id % len(PARTIES)],
+                "siglaUf": STATES[dep_id % len(STATES)],
+                "idLegislatura": cfg.legislature,
+                "urlFoto": f"https://www.camara.leg.br/internet/deputado/bandep/{dep_id}.jpg",
+                "email": f"dep.{dep_id}@camara.leg.br",
+            }
+            for dep_id in cfg.deputy_ids()
+        ]
+
+    @lru_cache(maxsize=None)
+    def expenses(self, deputy_id: int) -> List[Dict]:
+        cfg = self.config
+        rng = random.Random(cfg.seed * 1_000_003 + deputy_id)
+        rows = []
+        for i in range(cfg.expenses_per_deputy):
+            month = 1 + i * 12 // max(cfg.expenses_per_deputy, 1)
+            value = round(rng.uniform(20, 15000), 2)
+            rows.append(
+                {
+                    "ano": cfg.year,
+                    "mes": month,
+                    "tipoDespesa": rng.choice(EXPENSE_TYPES),
+                    "codDocumento": deputy_id * 10_000 + i,
+                    "tipoDocumento": "Nota Fiscal",
+                    "codTipoDocumento": 0,
+                    "dataDocumento": f"{cfg.year}-{month:02d}-{1 + i % 28:02d}T00:00:00",
+                    "numDocumento": str(i),
+                    "valorDocumento": value,
+                    "urlDocumento": "",
+                    "nomeFornecedor": f"FORNECEDOR {rng.randint(1, 60)}",
+                    "cnpjCpfFornecedor": f"{rng.randint(10**13, 10**14 - 1)}",
+                    "valorLiquido": value,
+                    "valorGlosa": 0.0,
+                    "numRessarcimento": "",
+                    "codLote": deputy_id,
+                    "parcela": 0,
+                }
+            )
+        return rows
+
+    @lru_cache(maxsize=None)
+    def propositions(self, deputy_id: int) -> List[Dict]:
+        cfg = self.config
+        rng = random.Random(cfg.seed * 7_000_003 + deputy_id)
+        rows = []
+        for i in range(cfg.propositions_per_deputy):
+            month = 1 + i * 12 // max(cfg.propositions_per_deputy, 1)
+            rows.append(
+                {
+                    "id": 2_400_000 + deputy_id * 100 + i,
+                    "siglaTipo": "PL",
+                    "numero": i + 1,
+                    "ano": cfg.year,
+                    "ementa": f"Dispõe sobre {rng.choice(PROPOSITION_TOPICS)} "
+                    f"e altera a Lei nº {rng.randint(1000, 15000)}.",
+                    "dataApresentacao": f"{cfg.year}-{month:02d}-{1 + i % 28:02d}",
+                }
+            )
+        return rows
+
+    def attendance(self, deputy_id: int) -> Dict[str, int]:
+        rng = random.Random(self.config.seed * 3_000_017 + deputy_id)
+        return {
+            "presencas": rng.randint(40, 90),
+            "ausencias_justificadas": rng.randint(0, 20),
+            "ausencias_nao_justificadas": rng.randint(0, 10),
+        }
+
+    def expected_rows(self) -> Dict[str, int]:
+        """Rows a complete, unfiltered collection of the configured year should produce."""
+        deputies = self.config.deputies
+        return {
+            "deputies": deputies,
+            "expenses": deputies * self.config.expenses_per_deputy,
+            "propositions": deputies * self.config.propositions_per_deputy,
+            "attendance": deputies,
+        }
+
+    # Accounting and fault injection
+
+    def _throttled(self) -> bool:
+        if self.config.throttle_rps <= 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.config.throttle_burst,
+                self._tokens + (now - self._updated) * self.config.throttle_rps,
+            )
+            self._updated = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        endpoint = request.match_info.route.name or "unknown"
+        key = f"{request.path}?{urlencode(sorted(request.query.items()))}"
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.request_keys[key] += 1
+            fail = self.random.random() < self.config.error_rate
+
+        delay = self.config.latency_ms + self.random.uniform(0, self.config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if self._throttled():
+            response = web.json_response(
+                {"status": 429, "title": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": f"{self.config.retry_after:g}"},
+            )
+        elif fail:
+            response = web.json_response(
+                {"status": 500, "title": "Internal Server Error"}, status=500
+            )
+        else:
+            response = await handler(request)
+
+        with self._lock:
+            self.statuses[response.status] += 1
+            self.bytes_sent += len(getattr(response, "body", b"") or b"")
+        return response
+
+    def stats(self) -> Dict:
+        """Requests per endpoint and status, and how many were repeats of an earlier URL."""
+        with self._lock:
+            total = sum(self.requests.values())
+            distinct = len(self.request_keys)
+            return {
+                "requests": total,
+                "distinct_requests": distinct,
+                "repeated_requests": total - distinct,
+                "by_endpoint": dict(self.requests),
+                "by_status": {str(k): v for k, v in sorted(self.statuses.items())},
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.statuses.clear()
+            self.request_keys.clear()
+            self.bytes_sent = 0
+
+
+def paginate(request: web.Request, rows: List[Dict], default_items: int = 15):
+    """Slice `rows` by pagina/itens and build the API's x-total-count and links."""
+    items = int(request.query.get("itens", default_items))
+    page = int(request.query.get("pagina", 1))
+    last = max(1, -(-len(rows) // items))
+
+    def link(rel: str, target: int) -> Dict:
+        query = {**request.query, "pagina": target, "itens": items}
+        return {"rel": rel, "href": f"{request.url.origin()}{request.path}?{urlencode(query)}"}
+
+    links = [link("self", page), link("first", 1), link("last", last)]
+    if page < last:
+        links.insert(1, link("next", page + 1))
+    data = rows[(page - 1) * items : page * items]
+    return data, links, {"x-total-count": str(len(rows))}
+
+
+def create_app(mock: MockCamara) -> web.Application:
+    """aiohttp application serving `mock`'s dataset."""
+
+    async def deputados(request: web.Request) -> web.Response:
+        legislature = int(request.query.get("idLegislatura", mock.config.legislature))
+        rows = mock.deputies() if legislature == mock.config.legislature else []
+        data, links, headers = paginate(request, rows)
+        return web.json_response({"dados": data, "links": links}, headers=headers)
+
+    async def despesas(request: web.Request) -> web.Response:
+        deputy_id = int(request.match_info["deputy_id"])
+        if not 0 <= deputy_id - FIRST_DEPUTY_ID < mock.config.deputies:
+            return web.json_response({"status": 404, "title": "Not Found"}, status=404)
+        rows = mock.expenses(deputy_id)
+        years = [int(v) for v in request.query.getall("ano", [])]
+        months = [int(v) for v in request.query.getall("mes", [])]
+        if years:
+            rows = [row for row in rows if row["ano"] in years]
+        if months:
+            rows = [row for row in rows if row["mes"] in months]
+        data, links, headers = paginate(request, rows)
+        return web.json_response({"dados": data, "links": links}, headers=headers)
+
+    async def proposicoes(request: web.Request) -> web.Response:
+        author = request.query.get("idDeputadoAutor")
+        rows = mock.propositions(int(author)) if author else []
+        start = request.query.get("dataApresentacaoInicio", "0000-00-00")
+        end = request.query.get("dataApresentacaoFim", "9999-12-31")
+        rows = [
+            {key: row[key] for key in ("id", "siglaTipo", "numero", "ano", "ementa")}
+            for row in rows
+            if start <= row["dataApresentacao"] <= end
+        ]
+        if request.query.get("ordem", "ASC").upper() == "DESC":
+            rows = rows[::-1]
+        data, links, headers = paginate(request, rows)
+        return web.json_response({"dados": data, "links": links}, headers=headers)
+
+    async def deputy_page(request: web.Request) -> web.Response:
+        deputy_id = int(request.match_info["deputy_id"])
+        return web.Response(
+            text=attendance_page(deputy_id, mock.attendance(deputy_id)),
+            content_type="text/html",
+        )
+
+    app = web.Application(middlewares=[mock.middleware])
+    app.router.add_get("/api/v2/deputados", deputados, name="deputados")
+    app.router.add_get(
+        "/api/v2/deputados/{deputy_id:\\d+}/despesas", despesas, name="despesas"
+    )
+    app.router.add_get("/api/v2/proposicoes", proposicoes, name="proposicoes")
+    app.router.add_get("/deputados/{deputy_id:\\d+}", deputy_page, name="deputy_page")
+    return app
+
+
+def _section(heading: str, counts: Dict[str, int]) -> str:
+    labels = [
+        ("Presenças", counts["presencas"]),
+        ("Ausências justificadas", counts["ausencias_justificadas"]),
+        ("Ausências não justificadas", counts["ausencias_nao_justificadas"]),
+    ]
+    items = "".join(
+        '\n          <li class="presencas__data">'
+        f'\n            <span class="presencas__label">{label}</span>'
+        f'\n            <span class="presencas__qtd">{value} dias</span>'
+        "\n          </li>"
+        for label, value in labels
+    )
+    return (
+        '\n      <section class="presencas__section">'
+        f'\n        <h4 class="presencas__section-heading">{heading}</h4>'
+        f'\n        <ul class="presencas__content">{items}\n        </ul>'
+        "\n      </section>"
+    )
+
+
+def attendance_page(deputy_id: int, counts: Dict[str, int], filler: int = 300) -> str:
+    """A deputy page of realistic size with plenary and committee attendance sections."""
+    scripts = "".join(
+        f'\n    <script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"id":{i}}});</script>'
+        for i in range(filler // 3)
+    )
+    news = "".join(
+        f'\n      <article class="noticia"><h3 class="noticia__titulo">'
+        f'<a href="/noticias/{i}">Notícia {i} do deputado {deputy_id}</a></h3>'
+        '<p class="noticia__resumo">Texto resumido da notícia com informações sobre a '
+        "tramitação e votação em comissão permanente da Câmara dos Deputados.</p></article>"
+        for i in range(filler)
+    )
+    committees = {key: value // 2 for key, value in counts.items()}
+    return (
+        '<!DOCTYPE html>\n<html lang="pt-br">\n<head>\n  <meta charset="utf-8">'
+        f"\n  <title>Deputado {deputy_id} - Portal da Câmara dos Deputados</title>{scripts}"
+        '\n</head>\n<body>\n    <div class="presencas">'
+        + _section("Presença em Plenário", counts)
+        + _section("Presença em Comissões", committees)
+        + f'\n    </div>\n    <div class="noticias-deputado">{news}\n    </div>'
+        "\n</body>\n</html>\n"
+    )
+
+
+class MockServer:
+    """Runs the mock in a background thread, for benchmarks driving blocking clients."""
+
+    def __init__(self, config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+        self.mock = MockCamara(config)
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v2"
+
+    @property
+    def website_url(self) -> str:
+        return f"http://{self.host}:{self.port}/deputados"
+
+    def __enter__(self) -> "MockServer":
+        started = threading.Event()
+
+        def serve() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(create_app(self.mock), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, self.host, self.port)
+            self._loop.run_until_complete(site.start())
+            self.port = self._runner.addresses[0][1]
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--deputies", type=int, default=513)
+    parser.add_argument("--expenses-per-deputy", type=int, default=250)
+    parser.add_argument("--propositions-per-deputy", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--throttle-rps", type=float, default=0.0, help="0 disables throttling"
+    )
+    parser.add_argument("--throttle-burst", type=int, default=10)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        deputies=args.deputies,
+        expenses_per_deputy=args.expenses_per_deputy,
+        propositions_per_deputy=args.propositions_per_deputy,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps,
+        throttle_burst=args.throttle_burst,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    web.run_app(create_app(MockCamara(config)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Synthetic pipeline inputs at a multiple of today's volume.
+
+Writes what the collector and the classifier leave for the pipeline, in their
+shapes: data/raw/{deputies,attendance,expense,proposition}_<year>_<date>.csv,
+the party classification CSV and data/gold/classified_deputies.parquet.
+Today's volume is one legislature: 606 deputies with about 145 expense
+documents and 62 ementas each; `scale` multiplies the deputies (more
+legislatures and assemblies), keeping the per-deputy volume. Parties and states
+are drawn from the real deputies file, so every party has a classification and
+enrichment never needs the LLM.
+
+    python benchmarks/synthetic_data.py --scale 10 --data-dir /tmp/scaled/data
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "data"))
+
+from get_data import EXPENSE_COLUMNS  # noqa: E402
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RAW_DIR = os.path.join(ROOT_DIR, "data", "raw")
+
+BASELINE_DEPUTIES = 606
+EXPENSES_PER_DEPUTY = 145
+EMENTAS_PER_DEPUTY = 62
+
+EXPENSE_TYPES = [
+    "SERVIÇO DE TÁXI, PEDÁGIO E ESTACIONAMENTO",
+    "PASSAGEM AÉREA - SIGEPA",
+    "MANUTENÇÃO DE ESCRITÓRIO DE APOIO À ATIVIDADE PARLAMENTAR",
+    "COMBUSTÍVEIS E LUBRIFICANTES",
+    "DIVULGAÇÃO DA ATIVIDADE PARLAMENTAR.",
+    "TELEFONIA",
+]
+DOCUMENT_TYPES = ["Nota Fiscal", "Nota Fiscal Eletrônica", "Recibos/Outros"]
+ACTIONS = [
+    "Dispõe sobre", "Altera a Lei nº {n}, para dispor sobre", "Institui o programa nacional de",
+    "Requer a realização de audiência pública para debater", "Susta os efeitos do decreto que regulamenta",
+    "Estabelece diretrizes para", "Requer informações ao Ministro de Estado sobre",
+]
+TOPICS = [
+    "segurança pública", "saúde da mulher", "educação básica", "reforma tributária",
+    "meio ambiente", "agricultura familiar", "programas sociais", "porte de armas de fogo",
+    "mobilidade urbana", "proteção de dados pessoais", "previdência social", "cultura e esporte",
+]
+QUALIFIERS = [
+    "nos municípios de pequeno porte", "para pessoas com deficiência", "e dá outras providências",
+    "no âmbito do Sistema Único de Saúde", "para jovens de baixa renda", "nas regiões Norte e Nordeste",
+]
+LABELS = {
+    "ideology": ["progressive", "moderate_progressive", "centrist", "moderate_conservative", "conservative"],
+    "agenda_category": ["economic", "social", "environmental", "technological", "cultural"],
+}
+
+
+def write_csv(df: pd.DataFrame, path: str) -> None:
+    # pyarrow's writer: the 100x expense file is too big for DataFrame.to_csv
+    pcsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def ementas(rng: np.random.Generator, count: int) -> str:
+    """A deputy's ementas as the collector stores them: the repr of a Python list."""
+    texts = [
+        f"{ACTIONS[rng.integers(len(ACTIONS))].format(n=rng.integers(1000, 15000))} "
+        f"{TOPICS[rng.integers(len(TOPICS))]} {QUALIFIERS[rng.integers(len(QUALIFIERS))]}, "
+        f"com metas para {TOPICS[rng.integers(len(TOPICS))]} {QUALIFIERS[rng.integers(len(QUALIFIERS))]}"
+        for _ in range(count)
+    ]
+    return str(texts)
+
+
+def generate(
+    data_dir: str,
+    scale: float = 1.0,
+    year: int = 2024,
+    expenses_per_deputy: int = EXPENSES_PER_DEPUTY,
+    ementas_per_deputy: int = EMENTAS_PER_DEPUTY,
+    seed: int = 0,
+) -> Dict[str, Dict]:
+    """Write the synthetic inputs under `data_dir`; returns rows and bytes per file."""
+    rng = np.random.default_rng(seed)
+    raw_dir = os.path.join(data_dir, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    os.makedirs(os.path.join(data_dir, "gold"), exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d")
+    files = {}
+
+    real = pd.read_csv(sorted(glob.glob(os.path.join(RAW_DIR, "deputies_*.csv")))[-1])
+    n = int(round(BASELINE_DEPUTIES * scale))
+    deputy_ids = np.arange(1_000_000, 1_000_000 + n)
+    picks = rng.integers(len(real), size=n)
+    deputies = pd.DataFrame(
+        {
+            "deputy_id": deputy_ids,
+            "name": [f"Deputado Sintético {i}" for i in range(n)],
+            "party": real["party"].to_numpy()[picks],
+            "state": real["state"].to_numpy()[picks],
+            "email": [f"dep.sintetico{i}@camara.leg.br" for i in range(n)],
+            "photo_url": [f"https://www.camara.leg.br/internet/deputado/bandep/{d}.jpg" for d in deputy_ids],
+            "idLegislatura": 57,
+        }
+    )
+    files["deputies"] = (deputies, f"deputies_{year}_{stamp}.csv")
+
+    days = 87
+    present = rng.integers(40, days + 1, size=n)
+    justified = rng.integers(0, days - present + 1)
+    attendance = pd.DataFrame(
+        {
+            "deputy_id": deputy_ids,
+            "year": year,
+            "timestamp": f"{datetime.now():%Y-%m-%d %H:%M:%S.%f}",
+            "presencas": present,
+            "ausencias_justificadas": justified,
+            "ausencias_nao_justificadas": days - present - justified,
+            "total_dias": days,
+            "taxa_presenca": (present / days * 100).round(2),
+        }
+    )
+    files["attendance"] = (attendance, f"attendance_{year}_{stamp}.csv")
+
+    per_deputy = rng.poisson(expenses_per_deputy, size=n)
+    rows = int(per_deputy.sum())
+    months = rng.integers(1, 13, size=rows)
+    value = rng.gamma(2.0, 700.0, size=rows).round(2)
+    expenses = pd.DataFrame(
+        {
+            "deputy_id": np.repeat(deputy_ids, per_deputy),
+            "valorDocumento": value,
+            "dataDocumento": [f"{year}-{m:02d}-{d:02d}" for m, d in zip(months, rng.integers(1, 29, size=rows))],
+            "valorLiquido": value,
+            "mes": months,
+            "ano": year,
+            "tipoDespesa": np.array(EXPENSE_TYPES)[rng.integers(len(EXPENSE_TYPES), size=rows)],
+            "tipoDocumento": np.array(DOCUMENT_TYPES)[rng.integers(len(DOCUMENT_TYPES), size=rows)],
+            "cnpjCpfFornecedor": rng.integers(10**13, 10**14, size=rows).astype(str),
+            "nomeFornecedor": [f"Fornecedor {i}" for i in rng.integers(0, 5000, size=rows)],
+            "parcela": 0,
+        }
+    )[EXPENSE_COLUMNS]
+    files["expense"] = (expenses, f"expense_{year}_{stamp}.csv")
+
+    counts = np.minimum(rng.poisson(ementas_per_deputy, size=n), 500)
+    propositions = pd.DataFrame(
+        {
+            "deputy_id": deputy_ids,
+            # The API counts propositions without an ementa too
+            "proposition_count": counts * 2,
+            "ementas": [ementas(rng, count) for count in counts],
+        }
+    )
+    files["proposition"] = (propositions, f"proposition_{year}_{stamp}.csv")
+
+    report = {}
+    for name, (df, file_name) in files.items():
+        path = os.path.join(raw_dir, file_name)
+        write_csv(df, path)
+        report[name] = {"rows": len(df), "bytes": os.path.getsize(path)}
+    shutil.copy(os.path.join(RAW_DIR, "class_partidos.csv"), raw_dir)
+
+    # What gpt_classifier would have written for these deputies
+    labels = pd.DataFrame(
+        {
+            "deputy_id": deputy_ids,
+            "classification": [
+                {
+                    "agenda_category": LABELS["agenda_category"][a],
+                    "ideology": LABELS["ideology"][i],
+                    "populist_elements": round(float(p), 1),
+                }
+                for a, i, p in zip(
+                    rng.integers(5, size=n), rng.integers(5, size=n), rng.uniform(0.1, 0.8, size=n)
+                )
+            ],
+        }
+    )
+    path = os.path.join(data_dir, "gold", "classified_deputies.parquet")
+    labels.to_parquet(path, index=False)
+    report["classified_deputies"] = {"rows": n, "bytes": os.path.getsize(path)}
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", required=True, help="Folder to write raw/ and gold/ into")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiple of today's 606 deputies")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--expenses-per-deputy", type=int, default=EXPENSES_PER_DEPUTY)
+    parser.add_argument("--ementas-per-deputy", type=int, default=EMENTAS_PER_DEPUTY)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = generate(
+        args.data_dir,
+        args.scale,
+        args.year,
+        args.expenses_per_deputy,
+        args.ementas_per_deputy,
+        args.seed,
+    )
+    for name, stats in report.items():
+        print(f"{name:<20} {stats['rows']:>10} rows {stats['bytes'] / 1e6:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,671 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import aiohttp
+import pandas as pd
+
+from get_data import (
+    COLLECTION_TASKS,
+    EXPENSE_DICTIONARY_COLUMNS,
+    EXPENSES_PAGE_SIZE,
+    REQUEST_HEADERS,
+    DeputiesDataCollector,
+    attendance_checkpoint,
+    attendance_record,
+    build_attendance_dim,
+    build_deputies_dim,
+    build_expenses_fact,
+    expense_page_params,
+    finish_attendance_checkpoint,
+    page_count,
+    parse_attendance_html,
+    propositions_record,
+    validate_row_count,
+)
+from checkpoint import JsonlCheckpoint
+from http_cache import HTTPStatusError, ResponseCache
+from http_retry import RequestMetrics, RetryPolicy, log_retry
+from orchestrator import RunSummary, mark_incomplete
+from parquet_sink import PartitionedParquetSink
+from rate_limit import AdaptiveLimit, TokenBucket
+from watermarks import (
+    WatermarkStore,
+    latest_output_file,
+    merge_expenses,
+    merge_propositions,
+    write_rolling_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDeputiesDataCollector:
+    """
+    Asyncio version of DeputiesDataCollector built on aiohttp.
+    All requests share one pooled session and are paced by one token bucket
+    per host, so the API and the website are each kept at their allowed rate.
+    """
+
+    BASE_URL = DeputiesDataCollector.BASE_URL
+    WEBSITE_URL = DeputiesDataCollector.WEBSITE_URL
+
+    def __init__(
+        self,
+        legislature: int = 57,
+        output_dir: str = "/bronze",
+        api_rate: float = 10.0,
+        web_rate: float = 0.75,
+        max_connections: int = 20,
+        web_concurrency: int = 4,
+        base_url: Optional[str] = None,
+        website_url: Optional[str] = None,
+        timeout: float = 60.0,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        """Initialize the collector. Call inside `async with` to open the session."""
+        self.legislature = legislature
+        self.output_dir = output_dir
+        self.max_connections = max_connections
+        self.web_concurrency = web_concurrency
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.website_url = (website_url or self.WEBSITE_URL).rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limiters = {
+            "api": TokenBucket(api_rate),
+            "web": TokenBucket(web_rate),
+        }
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.metrics = RequestMetrics()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    async def __aenter__(self) -> "AsyncDeputiesDataCollector":
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self.session = aiohttp.ClientSession(
+            connector=connector, headers=REQUEST_HEADERS, timeout=self.timeout
+        )
+        self.web_semaphore = asyncio.Semaphore(self.web_concurrency)
+        # In-flight request caps per host; halved on 429s and regrown on successes
+        self.concurrency = {
+            "api": AdaptiveLimit(self.max_connections),
+            "web": AdaptiveLimit(self.web_concurrency),
+        }
+        return self
+
+    @staticmethod
+    def _query(params: Optional[Dict]) -> Optional[List[Tuple[str, str]]]:
+        """aiohttp query pairs; list values become repeated keys (e.g. mes=1&mes=2)."""
+        if params is None:
+            return None
+        return [
+            (key, str(item))
+            for key, value in params.items()
+            for item in (value if isinstance(value, list) else [value])
+        ]
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+        self.session = None
+
+    async def _get(
+        self, url: str, params: Optional[Dict] = None, host: str = "api"
+    ) -> Tuple[bytes, Mapping[str, str]]:
+        """
+        Rate-limited GET returning the body and response headers.
+        Fresh cache hits skip both the network and the limiter. 429/5xx responses
+        and connection errors are retried with jittered exponential backoff that
+        honors Retry-After; 429s also shrink the host's adaptive concurrency limit.
+        """
+        entry = None
+        request_headers = {}
+        if self.cache is not None:
+            entry = self.cache.lookup(url, params)
+            if entry is not None and self.cache.is_fresh(entry):
+                entry = self.cache.serve(entry)
+                return entry.content, entry.headers
+            request_headers = self.cache.conditional_headers(entry)
+
+        concurrency = self.concurrency[host]
+        attempt = 0
+        while True:
+            await self.limiters[host].acquire()
+            status, retry_after, body, error = None, None, b"", None
+            async with concurrency:
+                start = time.perf_counter()
+                try:
+                    async with self.session.get(
+                        url, params=self._query(params), headers=request_headers
+                    ) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        body = await response.read()
+                        headers = response.headers.copy()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+            self.metrics.observe(url, time.perf_counter() - start, status, len(body))
+
+            if status == 429 and await concurrency.throttled():
+                logger.warning(
+                    f"Throttled on {url}; concurrency lowered to {int(concurrency.limit)}"
+                )
+            if self.retry.should_retry(attempt, status):
+                delay = self.retry.delay(attempt, retry_after)
+                reason = status or type(error).__name__
+                log_retry(url, reason, attempt, self.retry.max_retries, delay)
+                self.metrics.retried(url)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            if error is not None or status in self.retry.statuses:
+                self.metrics.failed(url)
+            else:
+                await concurrency.success()
+            if error is not None:
+                logger.error(f"Error making request to {url}: {str(error)}")
+                raise error
+            if status == 304 and entry is not None:
+                entry = self.cache.revalidated(entry, params)
+                return entry.content, entry.headers
+            if status >= 400:
+                logger.error(f"Error making request to {url}: HTTP {status}")
+                raise HTTPStatusError(f"{status} error for url: {url}")
+            if self.cache is not None:
+                self.cache.store(url, params, status, headers, body)
+            # CIMultiDict keeps header lookups case-insensitive, like requests
+            return body, headers
+
+    async def _get_json(
+        self, url: str, params: Optional[Dict] = None
+    ) -> Tuple[Dict, Mapping[str, str]]:
+        """Rate-limited API GET returning the decoded JSON and response headers."""
+        body, headers = await self._get(url, params=params, host="api")
+        return json.loads(body), headers
+
+    async def get_deputies_table(self) -> pd.DataFrame:
+        """Collect deputies data and create the deputies dimension table."""
+        deputies_data = []
+        page = 1
+        params = {
+            "idLegislatura": self.legislature,
+            "ordenarPor": "nome",
+            "itens": 1000,
+        }
+
+        while True:
+            params["pagina"] = page
+            try:
+                data, _ = await self._get_json(
+                    f"{self.base_url}/deputados", params=params
+                )
+
+                if not data["dados"]:
+                    break
+
+                deputies_data.extend(data["dados"])
+                total_items = int(data.get("links", [{}])[0].get("total", 0))
+
+                logger.info(
+                    f"Fetched page {page} of deputies. Total items: {total_items}"
+                )
+
+                if len(deputies_data) >= total_items:
+                    break
+
+                page += 1
+
+            except Exception as e:
+                logger.error(f"Error fetching deputies page {page}: {str(e)}")
+                break
+
+        if not deputies_data:
+            logger.error("No deputies data collected!")
+            return pd.DataFrame()
+
+        return build_deputies_dim(deputies_data)
+
+    async def _get_expenses_page(
+        self, url: str, deputy_id: int, page: int, year: Optional[int], months
+    ) -> List:
+        """Fetch one expenses page, logging and returning no rows on failure."""
+        try:
+            data, _ = await self._get_json(
+                url, params=expense_page_params(page, year, months)
+            )
+            return data["dados"]
+        except Exception as e:
+            logger.error(
+                f"Error fetching expenses page {page} for deputy {deputy_id}: {str(e)}"
+            )
+            return []
+
+    async def get_expenses_table(
+        self,
+        deputy_id: int,
+        year: Optional[int] = None,
+        months: Optional[List[int]] = None,
+    ) -> Tuple[pd.DataFrame, bool]:
+        """
+        Get expenses data for a specific deputy, optionally only for some months of a year.
+        Page 1 also reports x-total-count; the remaining pages are then fetched
+        concurrently, each one still paced by the shared API limiter.
+        Returns the rows and whether they are complete: False when a request failed
+        or fewer rows came back than x-total-count.
+        """
+        url = f"{self.base_url}/deputados/{deputy_id}/despesas"
+        try:
+            data, headers = await self._get_json(
+                url, params=expense_page_params(1, year, months)
+            )
+            total_items = int(headers.get("x-total-count", 0))
+            total_pages = page_count(total_items, EXPENSES_PAGE_SIZE)
+
+            logger.info(
+                f"Fetching {total_pages} pages of expenses for deputy {deputy_id}"
+            )
+
+            pages = await asyncio.gather(
+                *(
+                    self._get_expenses_page(url, deputy_id, page, year, months)
+                    for page in range(2, total_pages + 1)
+                )
+            )
+            all_expenses = list(data["dados"])
+            for rows in pages:
+                all_expenses.extend(rows)
+
+            complete = validate_row_count(deputy_id, len(all_expenses), total_items)
+
+            if not all_expenses:
+                return pd.DataFrame(), complete
+
+            return build_expenses_fact(all_expenses, deputy_id), complete
+
+        except Exception as e:
+            logger.error(f"Error processing expenses for deputy {deputy_id}: {str(e)}")
+            return pd.DataFrame(), False
+
+    async def get_propositions_data(
+        self,
+        deputy_id: int,
+        year: int,
+        since: Optional[str] = None,
+        after_id: int = 0,
+    ) -> Dict:
+        """
+        Get propositions data for a deputy for a specific year.
+        Returns a dict with deputy_id, proposition_count, a list of ementa texts
+        and the last proposition id seen. With `since`/`after_id` only propositions
+        presented from that date and newer than that id are returned.
+        """
+        base_url = f"{self.base_url}/proposicoes"
+        params = {
+            "idDeputadoAutor": deputy_id,
+            "dataApresentacaoInicio": since or f"{year}-01-01",
+            "dataApresentacaoFim": f"{year}-12-31",
+            "ordem": "ASC",
+            "ordenarPor": "id",
+        }
+        try:
+            _, headers = await self._get_json(base_url, params={**params, "itens": 1})
+            total_count = int(headers.get("x-total-count", 0))
+            total_pages = (total_count + 999) // 1000
+
+            pages = await asyncio.gather(
+                *(
+                    self._get_json(
+                        base_url, params={**params, "pagina": page, "itens": 1000}
+                    )
+                    for page in range(1, total_pages + 1)
+                )
+            )
+            all_props = [prop for data, _ in pages for prop in data.get("dados", [])]
+            return propositions_record(deputy_id, all_props, total_count, after_id)
+        except Exception as e:
+            logger.error(
+                f"Error fetching propositions for deputy {deputy_id} in year {year}: {e}"
+            )
+            return {"deputy_id": deputy_id, "proposition_count": 0, "ementas": []}
+
+    async def scrape_attendance(
+        self, deputy_id: int, year: int, timestamp: datetime
+    ) -> Optional[Dict]:
+        """Scrape one deputy's plenary attendance; None if the request failed."""
+        try:
+            async with self.web_semaphore:
+                body, _ = await self._get(
+                    f"{self.website_url}/{deputy_id}", params={"ano": year}, host="web"
+                )
+            attendance_data = parse_attendance_html(body.decode("utf-8"))
+            if attendance_data is None:
+                logger.warning(
+                    f"No plenary attendance section found for deputy {deputy_id}"
+                )
+                attendance_data = {}
+            logger.info(f"Collected attendance data for deputy {deputy_id}")
+            return attendance_record(deputy_id, year, timestamp, attendance_data)
+        except Exception as e:
+            logger.error(
+                f"Error collecting attendance data for deputy {deputy_id}: {str(e)}"
+            )
+            return None
+
+    async def batch_scrape_attendance(
+        self,
+        deputy_ids: List[int],
+        year: int = 2024,
+        checkpoint: Optional[JsonlCheckpoint] = None,
+    ) -> pd.DataFrame:
+        """
+        Scrape attendance data for multiple deputies, at most `web_concurrency` at a
+        time and paced by the website limiter. Deputies already in `checkpoint` are
+        skipped and each new success is appended to it as soon as it completes.
+        """
+        timestamp = datetime.now()
+        results = checkpoint.load() if checkpoint is not None else {}
+        pending = [dep_id for dep_id in deputy_ids if dep_id not in results]
+        logger.info(
+            f"Scraping attendance data for {len(pending)} deputies in {year} "
+            f"({len(deputy_ids) - len(pending)} already checkpointed)"
+        )
+
+        async def scrape(dep_id: int) -> None:
+            record = await self.scrape_attendance(dep_id, year, timestamp)
+            if record is None:
+                record = attendance_record(dep_id, year, timestamp, {})
+            elif checkpoint is not None:
+                checkpoint.append(record)
+            results[dep_id] = record
+
+        await asyncio.gather(*(scrape(dep_id) for dep_id in pending))
+        return build_attendance_dim([results[dep_id] for dep_id in deputy_ids])
+
+    async def collect_expenses(
+        self,
+        deputy_ids: List[int],
+        year: int,
+        incremental: bool = False,
+        output_format: str = "csv",
+    ) -> pd.DataFrame:
+        """
+        Collect expenses for all deputies concurrently and save them.
+        With `incremental`, only the months from each deputy's watermark onward
+        are refetched and merged into the existing expenses data. A deputy whose
+        fetch came back short keeps its previous rows and loses its watermark, so
+        the next incremental run refetches its whole year.
+        With output_format="parquet", each deputy is written to its partition as
+        soon as it completes and a (deputy_id, rows, path, complete) summary is returned.
+        Deputies whose rows came back short are marked on the result for the run summary.
+        """
+        if output_format == "parquet":
+            return await self._stream_expenses_parquet(deputy_ids, year, incremental)
+        watermarks = WatermarkStore(self.output_dir, year)
+        previous_file = (
+            latest_output_file(self.output_dir, "expense", year) if incremental else None
+        )
+        if previous_file:
+            refreshed = {
+                dep_id: watermarks.expense_months(dep_id) for dep_id in deputy_ids
+            }
+            logger.info(f"Incremental expenses collection on top of {previous_file}")
+            jobs = (
+                self.get_expenses_table(dep_id, year, refreshed[dep_id])
+                for dep_id in deputy_ids
+            )
+        else:
+            jobs = (self.get_expenses_table(dep_id) for dep_id in deputy_ids)
+
+        fetched = await asyncio.gather(*jobs)
+        all_expenses = []
+        incomplete = []
+        for dep_id, (df, complete) in zip(deputy_ids, fetched):
+            if not complete:
+                watermarks.reset_expenses(dep_id)
+                incomplete.append(dep_id)
+                if previous_file:
+                    # Keep the previous rows over a partial refetch
+                    del refreshed[dep_id]
+                    continue
+            else:
+                watermarks.record_expenses(dep_id, df)
+            if not df.empty:
+                all_expenses.append(df)
+        expenses_fact = (
+            pd.concat(all_expenses, ignore_index=True)
+            if all_expenses
+            else pd.DataFrame()
+        )
+        if previous_file:
+            expenses_fact = merge_expenses(
+                pd.read_csv(previous_file), expenses_fact, refreshed, year
+            )
+            write_rolling_snapshot(expenses_fact, self.output_dir, "expense", year)
+        else:
+            self._save(expenses_fact, "expense", year)
+        watermarks.save()
+        return mark_incomplete(expenses_fact, incomplete)
+
+    async def collect_propositions(
+        self,
+        deputy_ids: List[int],
+        year: int,
+        incremental: bool = False,
+        output_format: str = "csv",
+    ) -> pd.DataFrame:
+        """
+        Collect propositions for all deputies concurrently and save them.
+        With `incremental`, only propositions newer than each deputy's watermark
+        are fetched and appended to the existing propositions data.
+        With output_format="parquet", a (deputy_id, rows, path) summary is returned.
+        """
+        if output_format == "parquet":
+            return await self._stream_propositions_parquet(
+                deputy_ids, year, incremental
+            )
+        watermarks = WatermarkStore(self.output_dir, year)
+        previous_file = (
+            latest_output_file(self.output_dir, "proposition", year)
+            if incremental
+            else None
+        )
+        cursors = {}
+        if previous_file:
+            cursors = {
+                dep_id: watermarks.proposition_cursor(dep_id) for dep_id in deputy_ids
+            }
+            logger.info(f"Incremental propositions collection on top of {previous_file}")
+
+        results = await asyncio.gather(
+            *(
+                self.get_propositions_data(dep_id, year, *cursors.get(dep_id, (None, 0)))
+                for dep_id in deputy_ids
+            )
+        )
+        for res in results:
+            # Failed fetches carry no last_id and leave the watermark untouched
+            if "last_id" in res:
+                watermarks.record_propositions(res["deputy_id"], res.pop("last_id"))
+        propositions_dim = pd.DataFrame(list(results))
+        if previous_file:
+            appended = [dep_id for dep_id, (since, _) in cursors.items() if since]
+            propositions_dim = merge_propositions(
+                pd.read_csv(previous_file), propositions_dim, appended
+            )
+            write_rolling_snapshot(
+                propositions_dim, self.output_dir, "proposition", year
+            )
+        else:
+            self._save(propositions_dim, "proposition", year)
+        watermarks.save()
+        return propositions_dim
+
+    async def _stream_expenses_parquet(
+        self, deputy_ids: List[int], year: int, incremental: bool
+    ) -> pd.DataFrame:
+        """
+        Write each deputy's expenses to its Parquet partition as soon as it completes.
+        A short incremental refetch leaves the partition as it was; any short fetch
+        drops the deputy's watermark, so the next incremental run refetches its whole year.
+        """
+        watermarks = WatermarkStore(self.output_dir, year)
+        sink = PartitionedParquetSink(
+            self.output_dir, "expenses", year, EXPENSE_DICTIONARY_COLUMNS
+        )
+        refreshed = {
+            dep_id: watermarks.expense_months(dep_id)
+            for dep_id in deputy_ids
+            if incremental and sink.exists(dep_id)
+        }
+
+        async def fetch(dep_id: int) -> Tuple[int, pd.DataFrame, bool]:
+            if dep_id in refreshed:
+                df, complete = await self.get_expenses_table(
+                    dep_id, year, refreshed[dep_id]
+                )
+            else:
+                df, complete = await self.get_expenses_table(dep_id)
+            return dep_id, df, complete
+
+        for next_done in asyncio.as_completed([fetch(dep_id) for dep_id in deputy_ids]):
+            dep_id, df, complete = await next_done
+            if not complete:
+                watermarks.reset_expenses(dep_id)
+                if dep_id in refreshed:
+                    df = pd.DataFrame()
+            elif dep_id in refreshed:
+                df = merge_expenses(
+                    sink.read(dep_id), df, {dep_id: refreshed[dep_id]}, year
+                )
+            if complete:
+                watermarks.record_expenses(dep_id, df)
+            sink.write(dep_id, df, complete)
+        watermarks.save()
+        return sink.summary()
+
+    async def _stream_propositions_parquet(
+        self, deputy_ids: List[int], year: int, incremental: bool
+    ) -> pd.DataFrame:
+        """Write each deputy's propositions to its Parquet partition as soon as it completes."""
+        watermarks = WatermarkStore(self.output_dir, year)
+        sink = PartitionedParquetSink(self.output_dir, "propositions", year)
+        cursors = {
+            dep_id: watermarks.proposition_cursor(dep_id)
+            for dep_id in deputy_ids
+            if incremental and sink.exists(dep_id)
+        }
+
+        jobs = [
+            self.get_propositions_data(dep_id, year, *cursors.get(dep_id, (None, 0)))
+            for dep_id in deputy_ids
+        ]
+        for next_done in asyncio.as_completed(jobs):
+            res = await next_done
+            dep_id = res["deputy_id"]
+            if "last_id" in res:
+                watermarks.record_propositions(dep_id, res.pop("last_id"))
+            df = pd.DataFrame([res])
+            since, _ = cursors.get(dep_id, (None, 0))
+            if since:
+                df = merge_propositions(sink.read(dep_id), df, [dep_id])
+            sink.write(dep_id, df)
+        watermarks.save()
+        return sink.summary()
+
+    def _save(self, df: pd.DataFrame, prefix: str, year: int) -> str:
+        """Save a table to CSV using the same naming as the threaded collector."""
+        timestamp = datetime.now().strftime("%Y%m%d")
+        file_path = os.path.join(self.output_dir, f"{prefix}_{year}_{timestamp}.csv")
+        df.to_csv(file_path, index=False)
+        logger.info(f"Saved {prefix} data to {file_path}")
+        return file_path
+
+    async def _timed(self, summary: RunSummary, name: str, job) -> pd.DataFrame:
+        start = time.perf_counter()
+        try:
+            result = await job
+        except Exception as e:
+            summary.record(name, "failed", time.perf_counter() - start, error=str(e))
+            raise
+        summary.record(name, "ok", time.perf_counter() - start, result)
+        return result
+
+    async def run_task(
+        self,
+        tasks: Sequence[str] = ("all",),
+        year: int = 2024,
+        incremental: bool = False,
+        output_format: str = "csv",
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Run collection tasks ('deputies', 'expenses', 'attendance', 'propositions' or 'all').
+        The deputies dimension is fetched once for all of them; a per-task timing
+        summary is logged and saved under _state/runs.
+        """
+        selected = set(COLLECTION_TASKS if "all" in tasks else tasks)
+        summary = RunSummary(self.output_dir, self.metrics)
+        deputies_dim = await self._timed(
+            summary, "deputies_dim", self.get_deputies_table()
+        )
+        if deputies_dim.empty:
+            logger.error("No deputies found. Aborting data collection.")
+            summary.save()
+            return {}
+        deputy_ids = deputies_dim["deputy_id"].tolist()
+        tables = {}
+
+        if "deputies" in selected:
+            tables["deputies"] = deputies_dim
+            self._save(deputies_dim, "deputies", year)
+        jobs = {}
+        if "expenses" in selected:
+            jobs["expenses"] = self.collect_expenses(
+                deputy_ids, year, incremental, output_format
+            )
+        checkpoint = attendance_checkpoint(self.output_dir, year)
+        if "attendance" in selected:
+            jobs["attendance"] = self.batch_scrape_attendance(
+                deputy_ids, year, checkpoint
+            )
+        if "propositions" in selected:
+            jobs["propositions"] = self.collect_propositions(
+                deputy_ids, year, incremental, output_format
+            )
+
+        # API and website tasks run side by side, each paced by its own limiter
+        results = await asyncio.gather(
+            *(self._timed(summary, name, job) for name, job in jobs.items()),
+            return_exceptions=True,
+        )
+        for name, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Task {name} failed: {result}")
+            else:
+                tables[name] = result
+        if "attendance" in tables:
+            self._save(tables["attendance"], "attendance", year)
+            finish_attendance_checkpoint(checkpoint, deputy_ids)
+
+        if self.cache is not None:
+            self.cache.log_stats()
+        summary.save()
+        return tables
+
+
+async def run_collection(
+    tasks: Sequence[str],
+    year: int = 2024,
+    incremental: bool = False,
+    output_format: str = "csv",
+    **collector_kwargs,
+) -> Dict:
+    """Open an async collector, run the tasks and close the connection pool."""
+    async with AsyncDeputiesDataCollector(**collector_kwargs) as collector:
+        return await collector.run_task(tasks, year, incremental, output_format)
@@ -1,49 +1,276 @@
 import os
+import re
+import glob
 import json
+import time
+import hashlib
+import argparse
 import duckdb
 
-# Load the JSON configuration
-with open('sources.json', 'r') as open_file:
-    sources = json.load(open_file)
-
-# Create a DuckDB connection to the deputies_db in the /data folder
-con = duckdb.connect('../deputies_db.db')
-
-# Create the bronze schema if it doesn't exist
-con.execute("CREATE SCHEMA IF NOT EXISTS bronze;")
-
-# Track successfully created tables
-created_tables = []
-
-# Iterate over the CSV files specified in the JSON
-for csv_file in sources['csv_files']:
-    start_name = csv_file['start_name']
-    table_name = csv_file['table_name']
-    
-    # Find the CSV file in the ../raw directory
-    for file in os.listdir('../raw'):
-        if file.startswith(start_name) and file.endswith('.csv'):
-            csv_path = os.path.join('../raw', file)
-            
-            # Read the CSV file to get the column names and types
-            df = duckdb.read_csv(csv_path, sample_size=1)
-            columns = ', '.join([f"{col} {dtype}" for col, dtype in zip(df.columns, df.dtypes)])
-            
-            # Create the table in the bronze schema if it does not exist
-            con.execute(f"CREATE TABLE IF NOT EXISTS bronze.{table_name} ({columns});")
-            
-            # Ingest the CSV file into the DuckDB table in the bronze schema
-            con.execute(f"COPY bronze.{table_name} FROM '{csv_path}' (AUTO_DETECT TRUE, strict_mode false);")
-            print(f"Ingested {csv_path} into table bronze.{table_name}")
-            
-            # Add to created tables list
-            created_tables.append(f"bronze.{table_name}")
-
-# Export the tables to CSV files in the current folder
-for table_name in created_tables:
-    export_path = f"{table_name.replace('bronze.', '')}.csv"
-    con.execute(f"COPY {table_name} TO '{export_path}' (HEADER, DELIMITER ',');")
-    print(f"Exported table {table_name} to {export_path}")
-
-# Close the DuckDB connection
-con.close()
\ No newline at end of file
+RAW_DIR = '../raw'
+MANIFEST_TABLE = 'bronze.ingestion_manifest'
+
+
+# Collected files are named <source>_<year>_<date>.csv; reference files (class_partidos.csv) have no year
+YEAR_PATTERN = re.compile(r'^[a-z]+_(\d{4})_')
+# get_data.py --format parquet writes <dataset>/year=<year>/deputy_id=<id>/part-0.parquet instead
+PARQUET_GLOB = os.path.join('*', 'year=*', 'deputy_id=*', '*.parquet')
+PARTITION_YEAR_PATTERN = re.compile(r'year=(\d{4})')
+
+
+def file_year(file_name):
+    match = YEAR_PATTERN.match(file_name) or PARTITION_YEAR_PATTERN.search(file_name)
+    return int(match.group(1)) if match else None
+
+
+def select_year(raw_files, year):
+    """
+    The raw files of one year, plus the ones without a year. Bronze holds a single
+    year, so without `year` the raw folder must hold only one.
+    """
+    years = sorted({file_year(name) for name in raw_files} - {None})
+    if year is None:
+        if len(years) > 1:
+            raise SystemExit(f'{RAW_DIR} holds files of {years}; pass --year to choose which one to load')
+        return raw_files
+    return {name: stat for name, stat in raw_files.items() if file_year(name) in (year, None)}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a raw file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as open_file:
+        for chunk in iter(lambda: open_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def read_csv_sql(file_name):
+    """Full-sample type detection, with each row tagged by the raw file it came from."""
+    path = os.path.join(RAW_DIR, file_name)
+    return (
+        f"SELECT *, {quote(file_name)} AS _source_file "
+        f"FROM read_csv({quote(path)}, sample_size=-1)"
+    )
+
+
+def python_list_sql(column):
+    """A list column as the CSV export holds it: a Python list literal of quoted strings."""
+    item = r"'''' || replace(replace(x, '\', '\\'), '''', '\''') || ''''"
+    return f"'[' || array_to_string(list_transform({column}, x -> {item}), ', ') || ']'"
+
+
+def read_parquet_sql(con, file_names):
+    """
+    Partitioned Parquet files in the shape of the CSV export, so silver reads either alike:
+    deputy_id comes back from the path, the year key is dropped (rows carry their own
+    year) and list columns become Python list literals. Rows are tagged like read_csv_sql.
+    """
+    paths = ', '.join(quote(os.path.join(RAW_DIR, file_name)) for file_name in file_names)
+    source = f"read_parquet([{paths}], hive_partitioning=true, filename=true)"
+    list_columns = [
+        row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+        if row[1].endswith('[]')
+    ]
+    replace = ''
+    if list_columns:
+        replace = ' REPLACE (' + ', '.join(
+            f'{python_list_sql(column)} AS "{column}"' for column in list_columns
+        ) + ')'
+    prefix = len(os.path.join(RAW_DIR, ''))
+    return (
+        f"SELECT deputy_id, * EXCLUDE (deputy_id, year, filename){replace}, "
+        f"filename[{prefix + 1}:] AS _source_file FROM {source}"
+    )
+
+
+def read_sql(con, file_names):
+    """One SELECT per CSV file and one for all the Parquet files."""
+    parquet_files = [file_name for file_name in file_names if file_name.endswith('.parquet')]
+    selects = [read_csv_sql(file_name) for file_name in file_names if file_name.endswith('.csv')]
+    if parquet_files:
+        selects.append(read_parquet_sql(con, parquet_files))
+    return selects
+
+
+def union_sql(con, file_names):
+    return ' UNION ALL BY NAME '.join(read_sql(con, file_names))
+
+
+def bronze_schemas(con):
+    """Columns and types of every bronze table, read in one query."""
+    # No bound parameters here: binding makes duckdb import pandas, which dwarfs a no-op run
+    schemas = {}
+    for table_name, column_name, data_type in con.execute(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = 'bronze'"
+    ).fetchall():
+        schemas.setdefault(table_name, {})[column_name] = data_type
+    return schemas
+
+
+def fits_table(con, file_name, existing):
+    """Whether a file's detected columns and types can be inserted into the existing table."""
+    schema = con.execute(f"DESCRIBE {read_sql(con, [file_name])[0]}").fetchall()
+    return all(existing.get(row[0]) == row[1] for row in schema)
+
+
+def plan_source(con, existing, files, manifest):
+    """
+    Compare the raw files of one source with its manifest entries.
+    Unchanged files (same size and mtime) are skipped without being read; a file
+    that was only touched keeps its rows and gets its mtime refreshed.
+    `existing` is the current table schema (empty if the table doesn't exist yet).
+    Returns (files to load, files whose rows must go, touched files, rebuild flag).
+    """
+    to_load, to_drop, touched = [], [], []
+    for file_name, (size, mtime) in files.items():
+        entry = manifest.get(file_name)
+        if entry and entry['size'] == size and entry['mtime'] == mtime:
+            continue
+        sha256 = file_sha256(os.path.join(RAW_DIR, file_name))
+        if entry and entry['sha256'] == sha256:
+            touched.append((file_name, mtime))
+            continue
+        to_load.append((file_name, size, mtime, sha256))
+        if entry:
+            to_drop.append(file_name)
+    to_drop += [file_name for file_name in manifest if file_name not in files]
+
+    # A missing table, one from the old append-only loader (no lineage column), or a
+    # file whose detected types don't fit the table: rebuild the source from all its files
+    rebuild = bool(files) and (
+        '_source_file' not in existing
+        or any(not fits_table(con, item[0], existing) for item in to_load)
+    )
+    if rebuild:
+        hashes = {file_name: entry['sha256'] for file_name, entry in manifest.items()}
+        hashes.update({item[0]: item[3] for item in to_load})
+        to_load = [
+            (file_name, size, mtime, hashes[file_name])
+            for file_name, (size, mtime) in files.items()
+        ]
+        touched = []
+    return to_load, to_drop, touched, rebuild
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load the raw CSV files and Parquet datasets into the bronze tables.')
+    parser.add_argument(
+        '--year',
+        type=int,
+        help="Load only this year's raw files; the rows of other years' files are removed",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    # Load the JSON configuration
+    with open('sources.json', 'r') as open_file:
+        sources = json.load(open_file)
+
+    # Create a DuckDB connection to the deputies_db in the /data folder
+    con = duckdb.connect('../deputies_db.db')
+
+    # Create the bronze schema and the manifest of loaded raw files if they don't exist
+    con.execute("CREATE SCHEMA IF NOT EXISTS bronze;")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            table_name VARCHAR,
+            path VARCHAR,
+            size BIGINT,
+            mtime DOUBLE,
+            sha256 VARCHAR,
+            rows BIGINT,
+            loaded_at TIMESTAMP,
+            PRIMARY KEY (table_name, path)
+        );
+    """)
+    manifest = {}
+    for table_name, path, size, mtime, sha256 in con.execute(
+        f"SELECT table_name, path, size, mtime, sha256 FROM {MANIFEST_TABLE}"
+    ).fetchall():
+        manifest.setdefault(table_name, {})[path] = {'size': size, 'mtime': mtime, 'sha256': sha256}
+
+    # Scan the ../raw directory once for every source: its CSV files and the
+    # partition files of the Parquet datasets (expenses/..., propositions/...)
+    raw_files = {}
+    for entry in os.scandir(RAW_DIR):
+        if entry.is_file() and entry.name.endswith('.csv'):
+            stat = entry.stat()
+            raw_files[entry.name] = (stat.st_size, stat.st_mtime)
+    for path in glob.glob(os.path.join(RAW_DIR, PARQUET_GLOB)):
+        stat = os.stat(path)
+        raw_files[os.path.relpath(path, RAW_DIR).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime)
+    raw_files = select_year(raw_files, args.year)
+
+    schemas = bronze_schemas(con)
+
+    # Track tables whose rows changed in this run
+    changed_tables = []
+
+    # Load every source in one transaction, so a failure leaves bronze and the manifest untouched
+    con.execute("BEGIN TRANSACTION;")
+    try:
+        for csv_file in sources['csv_files']:
+            start_name = csv_file['start_name']
+            table_name = csv_file['table_name']
+            files = {name: stat for name, stat in raw_files.items() if name.startswith(start_name)}
+            to_load, to_drop, touched, rebuild = plan_source(
+                con, schemas.get(table_name, {}), files, manifest.get(table_name, {})
+            )
+
+            for file_name, mtime in touched:
+                con.execute(
+                    f"UPDATE {MANIFEST_TABLE} SET mtime = ? WHERE table_name = ? AND path = ?",
+                    [mtime, table_name, file_name],
+                )
+            if not to_load and not to_drop:
+                print(f"Table bronze.{table_name} is up to date")
+                continue
+
+            if rebuild:
+                con.execute(f"CREATE OR REPLACE TABLE bronze.{table_name} AS {union_sql(con, [f[0] for f in to_load])};")
+                con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", [table_name])
+            else:
+                # A changed or removed file replaces only its own rows
+                if to_drop:
+                    placeholders = ', '.join('?' for _ in to_drop)
+                    con.execute(f"DELETE FROM bronze.{table_name} WHERE _source_file IN ({placeholders})", to_drop)
+                    con.execute(
+                        f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ? AND path IN ({placeholders})",
+                        [table_name] + to_drop,
+                    )
+                if to_load:
+                    con.execute(f"INSERT INTO bronze.{table_name} BY NAME {union_sql(con, [f[0] for f in to_load])};")
+
+            rows = dict(con.execute(
+                f"SELECT _source_file, COUNT(*) FROM bronze.{table_name} GROUP BY _source_file"
+            ).fetchall()) if to_load else {}
+            for file_name, size, mtime, sha256 in to_load:
+                con.execute(
+                    f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?, now())",
+                    [table_name, file_name, size, mtime, sha256, rows.get(file_name, 0)],
+                )
+                print(f"Ingested {file_name} ({rows.get(file_name, 0)} rows) into table bronze.{table_name}")
+            for file_name in to_drop:
+                print(f"Removed rows of {file_name} from table bronze.{table_name}")
+            changed_tables.append(f"bronze.{table_name}")
+        con.execute("COMMIT;")
+    except Exception:
+        con.execute("ROLLBACK;")
+        raise
+
+    # Export the changed tables to CSV files in the current folder
+    for table_name in changed_tables:
+        export_path = f"{table_name.replace('bronze.', '')}.csv"
+        con.execute(f"COPY (SELECT * EXCLUDE (_source_file) FROM {table_name}) TO '{export_path}' (HEADER, DELIMITER ',');")
+        print(f"Exported table {table_name} to {export_path}")
+
+    # Close the DuckDB connection
+    con.close()
+    print(f"Bronze ingestion finished in {(time.perf_counter() - start) * 1000:.0f} ms, {len(changed_tables)} tables changed")
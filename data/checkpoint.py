@@ -0,0 +1,52 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlCheckpoint:
+    """
+    Append-only JSONL checkpoint of per-deputy results.
+    Each completed deputy is flushed as one line, so a crashed run can resume
+    by skipping the deputy_ids already recorded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def load(self) -> Dict[int, Dict]:
+        """Latest record per deputy_id; a truncated last line from a crash is ignored."""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[int(record["deputy_id"])] = record
+        return records
+
+    def append(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def records(self, deputy_ids: Iterable[int]) -> List[Dict]:
+        """Recorded results for the given deputies, in the given order."""
+        done = self.load()
+        return [done[dep_id] for dep_id in deputy_ids if dep_id in done]
+
+    def clear(self) -> None:
+        """Remove the checkpoint once its results have been saved."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"Removed checkpoint {self.path}")
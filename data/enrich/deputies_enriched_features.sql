@@ -0,0 +1,49 @@
+-- config: incremental=false, partition_by=none
+-- Feature table read by the recommender. attendance_rate is relative to the longest
+-- attendance record, so every row depends on all the others: always rebuilt in full,
+-- and exported as a single Parquet file ordered by deputy_id. It lives outside data/gold
+-- so the gold stage doesn't build it: the enrich stage does, once the party map is complete.
+WITH gpt_classification AS (
+    SELECT
+        deputy_id,
+        classification.agenda_category AS agenda_category,
+        classification.ideology AS ideology,
+        classification.populist_elements AS populist_elements
+    FROM read_parquet('../gold/classified_deputies.parquet')
+),
+
+party_ideology_map AS (
+    SELECT
+        p.party,
+        m.json ->> p.party AS party_classification
+    FROM read_json_objects('../party_ideology_map.json') AS m,
+        unnest(json_keys(m.json)) AS p(party)
+),
+
+metrics AS (
+    SELECT
+        *,
+        MAX(total_days) OVER () AS max_days
+    FROM deputies_db.gold.deputies_consolidated_metrics
+)
+
+-- Ratios over a zero denominator are NULL (missing), never inf
+SELECT
+    m.* EXCLUDE (propositions_list, max_days) REPLACE (
+        COALESCE(m.party_classification, pim.party_classification) AS party_classification,
+        TRY_CAST(m.party_score AS DOUBLE) AS party_score,
+        ROUND(m.attendance_count / NULLIF(m.max_days, 0), 3) AS attendance_rate
+    ),
+    gc.agenda_category,
+    gc.ideology,
+    gc.populist_elements,
+    ROUND(m.total_expenses / NULLIF(m.proposition_count, 0), 1) AS cost_per_proposition,
+    ROUND(m.total_expenses / NULLIF(m.total_documents, 0), 1) AS mean_expend_per_document,
+    ROUND(m.taxi_toll_parking / NULLIF(m.total_expenses, 0), 3) AS share_taxi_toll_parking,
+    ROUND(m.flight_passages / NULLIF(m.total_expenses, 0), 3) AS share_flight_passages,
+    ROUND(m.office_maintenance / NULLIF(m.total_expenses, 0), 3) AS share_office_maintenance,
+    ROUND(m.fuel_lubricants / NULLIF(m.total_expenses, 0), 3) AS share_fuel_lubricants
+FROM metrics AS m
+LEFT JOIN gpt_classification AS gc ON m.deputy_id = gc.deputy_id
+LEFT JOIN party_ideology_map AS pim ON m.party = pim.party
+ORDER BY m.deputy_id;
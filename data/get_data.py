@@ -1,9 +1,10 @@
 import requests
 from typing import List, Dict, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import logging
 import os
+import threading
 import time
 import re
 import argparse
@@ -11,6 +12,20 @@ import pandas as pd
 from tqdm import tqdm
 from bs4 import BeautifulSoup
 
+from checkpoint import JsonlCheckpoint
+from http_cache import ResponseCache
+from http_retry import RequestMetrics, RetryPolicy, log_retry
+from orchestrator import CollectionTask, RunSummary, mark_incomplete, run_tasks
+from parquet_sink import PartitionedParquetSink
+from rate_limit import ThreadAdaptiveLimit, ThreadTokenBucket
+from watermarks import (
+    WatermarkStore,
+    latest_output_file,
+    merge_expenses,
+    merge_propositions,
+    write_rolling_snapshot,
+)
+
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +37,245 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Page size sent as `itens` to /despesas; page counts are derived from the same value
+EXPENSES_PAGE_SIZE = 100
+
+# Expense pages of one deputy fetched side by side (within the API's overall concurrency)
+EXPENSE_PAGE_WORKERS = 4
+
+EXPENSE_COLUMNS = [
+    "deputy_id",
+    "valorDocumento",
+    "dataDocumento",
+    "valorLiquido",
+    "mes",
+    "ano",
+    "tipoDespesa",
+    "tipoDocumento",
+    "cnpjCpfFornecedor",
+    "nomeFornecedor",
+    "parcela",
+]
+
+
+def build_deputies_dim(deputies_data: List[Dict]) -> pd.DataFrame:
+    """Shape raw /deputados records into the deputies dimension table."""
+    df = pd.DataFrame(deputies_data)
+
+    deputies_dim = df[
+        [
+            "id",
+            "nome",
+            "siglaPartido",
+            "siglaUf",
+            "email",
+            "urlFoto",
+            "idLegislatura",
+        ]
+    ].copy()
+
+    deputies_dim = deputies_dim.rename(
+        columns={
+            "id": "deputy_id",
+            "nome": "name",
+            "siglaPartido": "party",
+            "siglaUf": "state",
+            "urlFoto": "photo_url",
+        }
+    )
+
+    return deputies_dim.drop_duplicates(subset=["deputy_id"])
+
+
+# Repetitive string columns stored dictionary-encoded in the Parquet output
+EXPENSE_DICTIONARY_COLUMNS = [
+    "tipoDespesa",
+    "tipoDocumento",
+    "cnpjCpfFornecedor",
+    "nomeFornecedor",
+]
+
+
+def expense_page_params(
+    page: int, year: Optional[int] = None, months: Optional[List[int]] = None
+) -> Dict:
+    """Query parameters for one page of a deputy's expenses, optionally filtered by year/months."""
+    params = {
+        "pagina": page,
+        "itens": EXPENSES_PAGE_SIZE,
+        "ordenarPor": "dataDocumento",
+    }
+    if year is not None:
+        params["ano"] = year
+    if months is not None:
+        params["mes"] = months
+    return params
+
+
+def page_count(total_items: int, page_size: int) -> int:
+    """Number of pages needed to cover `total_items` at `page_size` per page."""
+    return -(-total_items // page_size)
+
+
+def validate_row_count(deputy_id: int, fetched: int, expected: int) -> bool:
+    """Whether the collected expense rows match the API's x-total-count; mismatches are logged."""
+    if fetched != expected:
+        logger.warning(
+            f"Expense row count mismatch for deputy {deputy_id}: "
+            f"fetched {fetched}, x-total-count {expected}"
+        )
+        return False
+    return True
+
+
+def propositions_record(
+    deputy_id: int, all_props: List[Dict], total_count: int, after_id: int = 0
+) -> Dict:
+    """
+    Summarize a deputy's propositions. When resuming after a watermark id,
+    only newer propositions are kept and counted.
+    """
+    if after_id:
+        all_props = [prop for prop in all_props if int(prop["id"]) > after_id]
+        total_count = len(all_props)
+    return {
+        "deputy_id": deputy_id,
+        "proposition_count": total_count,
+        "ementas": [prop["ementa"] for prop in all_props if prop.get("ementa")],
+        "last_id": max((int(prop["id"]) for prop in all_props), default=after_id),
+    }
+
+
+def build_expenses_fact(all_expenses: List[Dict], deputy_id: int) -> pd.DataFrame:
+    """Shape raw /despesas records of one deputy into the expenses fact table."""
+    expenses_df = pd.DataFrame(all_expenses)
+    expenses_df["deputy_id"] = deputy_id
+
+    # Convert date and extract month/year
+    expenses_df["dataDocumento"] = pd.to_datetime(expenses_df["dataDocumento"])
+
+    # Select relevant columns
+    expenses_fact = expenses_df[EXPENSE_COLUMNS].copy()
+
+    # Convert valorDocumento to float
+    expenses_fact["valorLiquido"] = pd.to_numeric(
+        expenses_fact["valorDocumento"], errors="coerce"
+    )
+
+    return expenses_fact
+
+
+# Opening tag of an attendance block up to its closing tag; the blocks hold no nested sections
+ATTENDANCE_SECTION_RE = re.compile(
+    r"<section\b[^>]*\bpresencas__section\b.*?</section>", re.DOTALL
+)
+
+
+def plenary_attendance_counts(plenary_section) -> Dict[str, int]:
+    """Read the attendance counts out of a parsed plenary `presencas__section`."""
+    attendance_data = {}
+    attendance_items = plenary_section.find_all("li", class_="presencas__data")
+
+    for item in attendance_items:
+        label = item.find("span", class_="presencas__label").text.strip()
+        value_text = item.find("span", class_="presencas__qtd").text.strip()
+        try:
+            value = int(re.search(r"\d+", value_text).group())
+        except Exception:
+            value = 0
+
+        label_lower = label.lower()
+        if "presença" in label_lower and "ausência" not in label_lower:
+            attendance_data["presencas"] = value
+        elif (
+            "ausências justificadas" in label_lower
+            or "ausencias justificadas" in label_lower
+        ):
+            attendance_data["ausencias_justificadas"] = value
+        elif (
+            "ausências não justificadas" in label_lower
+            or "ausencias nao justificadas" in label_lower
+        ):
+            attendance_data["ausencias_nao_justificadas"] = value
+
+    return attendance_data
+
+
+def parse_attendance_html(html: str) -> Optional[Dict[str, int]]:
+    """
+    Extract plenary attendance counts from a deputy page.
+    Only the `presencas__section` fragments are handed to BeautifulSoup instead
+    of the whole page. Returns None when there is no plenary attendance section.
+    """
+    for match in ATTENDANCE_SECTION_RE.finditer(html):
+        fragment = match.group(0)
+        if "Presença em Plenário" not in fragment:
+            continue
+        section = BeautifulSoup(fragment, "html.parser")
+        heading = section.find("h4", class_="presencas__section-heading")
+        if heading and "Presença em Plenário" in heading.text:
+            return plenary_attendance_counts(section)
+    return None
+
+
+def attendance_checkpoint(output_dir: str, year: int) -> JsonlCheckpoint:
+    """Checkpoint of the deputies whose attendance was already scraped for a year."""
+    return JsonlCheckpoint(
+        os.path.join(output_dir, "_state", f"attendance_{year}.jsonl")
+    )
+
+
+def finish_attendance_checkpoint(
+    checkpoint: JsonlCheckpoint, deputy_ids: List[int]
+) -> None:
+    """Drop the checkpoint once every deputy succeeded; keep it to retry failures."""
+    missing = set(deputy_ids) - set(checkpoint.load())
+    if missing:
+        logger.warning(
+            f"Attendance failed for {len(missing)} deputies; rerun to retry them"
+        )
+    else:
+        checkpoint.clear()
+
+
+def attendance_record(
+    deputy_id: int, year: int, timestamp: datetime, attendance_data: Dict[str, int]
+) -> Dict:
+    """Build one attendance row, defaulting missing counts to zero."""
+    return {
+        "deputy_id": deputy_id,
+        "year": year,
+        "timestamp": timestamp,
+        "presencas": attendance_data.get("presencas", 0),
+        "ausencias_justificadas": attendance_data.get("ausencias_justificadas", 0),
+        "ausencias_nao_justificadas": attendance_data.get(
+            "ausencias_nao_justificadas", 0
+        ),
+    }
+
+
+def build_attendance_dim(results: List[Dict]) -> pd.DataFrame:
+    """Create the attendance table and add percentage calculations."""
+    df = pd.DataFrame(results)
+
+    if not df.empty:
+        df["total_dias"] = (
+            df["presencas"]
+            + df["ausencias_justificadas"]
+            + df["ausencias_nao_justificadas"]
+        )
+        df["taxa_presenca"] = (df["presencas"] / df["total_dias"] * 100).round(2)
+
+    return df
+
+
+COLLECTION_TASKS = ["deputies", "expenses", "attendance", "propositions"]
+
 
 class DeputiesDataCollector:
     """Collects and organizes data from the Brazilian Chamber of Deputies."""
@@ -35,35 +289,138 @@ class DeputiesDataCollector:
         max_workers: int = 10,
         output_dir: str = "/bronze",
         sleep_time: float = 1.33,
+        cache: Optional[ResponseCache] = None,
+        attendance_workers: int = 4,
+        retry: Optional[RetryPolicy] = None,
+        timeout: float = 60.0,
     ):
         """Initialize the data collector."""
         self.legislature = legislature
         self.max_workers = max_workers
         self.output_dir = output_dir
         self.sleep_time = sleep_time
+        self.cache = cache
+        self.attendance_workers = attendance_workers
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.metrics = RequestMetrics()
+        # In-flight request caps per host; halved on 429s and regrown on successes.
+        # Expenses and propositions may run side by side, each with max_workers threads.
+        self.concurrency = {
+            "api": ThreadAdaptiveLimit(2 * max_workers),
+            "web": ThreadAdaptiveLimit(attendance_workers),
+        }
+        # Shared pacing for the website: one request every `sleep_time` seconds overall
+        self.web_limiter = ThreadTokenBucket(1 / sleep_time) if sleep_time > 0 else None
+        self._deputies_dim: Optional[pd.DataFrame] = None
+        self._deputies_lock = threading.Lock()
 
         # Initialize sessions
         self.api_session = requests.Session()
         self.web_session = requests.Session()
 
         # Set headers
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        self.api_session.headers.update(headers)
-        self.web_session.headers.update(headers)
+        self.api_session.headers.update(REQUEST_HEADERS)
+        self.web_session.headers.update(REQUEST_HEADERS)
 
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
 
+    def _get(
+        self,
+        url: str,
+        params: Dict = None,
+        session: Optional[requests.Session] = None,
+        limiter: Optional[ThreadTokenBucket] = None,
+    ):
+        """GET through the response cache when one is configured; `limiter` paces network hits."""
+        session = session or self.api_session
+        if self.cache is None:
+            return self._send(url, params, session, limiter)
+
+        entry = self.cache.lookup(url, params)
+        if entry is not None and self.cache.is_fresh(entry):
+            return self.cache.serve(entry)
+
+        response = self._send(
+            url, params, session, limiter, self.cache.conditional_headers(entry)
+        )
+        if response.status_code == 304 and entry is not None:
+            return self.cache.revalidated(entry, params)
+        return self.cache.store(
+            url, params, response.status_code, response.headers, response.content
+        )
+
+    def _send(
+        self,
+        url: str,
+        params: Optional[Dict],
+        session: requests.Session,
+        limiter: Optional[ThreadTokenBucket] = None,
+        headers: Optional[Dict] = None,
+    ) -> requests.Response:
+        """
+        Network GET with retries on 429/5xx and connection errors.
+        Waits follow the retry policy (jittered exponential backoff, at least the
+        server's Retry-After); 429s also shrink the host's adaptive concurrency limit.
+        The last response is returned (or the last error raised) once retries run out.
+        """
+        concurrency = self.concurrency[
+            "web" if session is self.web_session else "api"
+        ]
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            response, error = None, None
+            with concurrency:
+                start = time.perf_counter()
+                try:
+                    response = session.get(
+                        url, params=params, headers=headers, timeout=self.timeout
+                    )
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                ) as e:
+                    error = e
+            status = response.status_code if response is not None else None
+            self.metrics.observe(
+                url,
+                time.perf_counter() - start,
+                status,
+                len(response.content) if response is not None else 0,
+            )
+
+            if status == 429 and concurrency.throttled():
+                logger.warning(
+                    f"Throttled on {url}; concurrency lowered to {int(concurrency.limit)}"
+                )
+            if not self.retry.should_retry(attempt, status):
+                if status is None or status in self.retry.statuses:
+                    self.metrics.failed(url)
+                    if error is not None:
+                        raise error
+                else:
+                    concurrency.success()
+                return response
+
+            retry_after = (
+                response.headers.get("Retry-After") if response is not None else None
+            )
+            delay = self.retry.delay(attempt, retry_after)
+            reason = status or type(error).__name__
+            log_retry(url, reason, attempt, self.retry.max_retries, delay)
+            self.metrics.retried(url)
+            time.sleep(delay)
+            attempt += 1
+
     def _make_request(
         self, url: str, params: Dict = None, session: Optional[requests.Session] = None
     ) -> Dict:
         """Make HTTP request with error handling."""
-        session = session or self.api_session
         try:
-            response = session.get(url, params=params)
+            response = self._get(url, params=params, session=session)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -108,226 +465,169 @@ class DeputiesDataCollector:
             logger.error("No deputies data collected!")
             return pd.DataFrame()
 
-        df = pd.DataFrame(deputies_data)
-
-        deputies_dim = df[
-            [
-                "id",
-                "nome",
-                "siglaPartido",
-                "siglaUf",
-                "email",
-                "urlFoto",
-                "idLegislatura",
-            ]
-        ].copy()
-
-        deputies_dim = deputies_dim.rename(
-            columns={
-                "id": "deputy_id",
-                "nome": "name",
-                "siglaPartido": "party",
-                "siglaUf": "state",
-                "urlFoto": "photo_url",
-            }
-        )
+        return build_deputies_dim(deputies_data)
 
-        return deputies_dim.drop_duplicates(subset=["deputy_id"])
+    def deputies_dim(self, refresh: bool = False) -> pd.DataFrame:
+        """
+        Deputies dimension, fetched once per collector and shared by every task.
+        An empty result is not memoized, so the next caller retries the API.
+        """
+        with self._deputies_lock:
+            if self._deputies_dim is None or refresh:
+                deputies_dim = self.get_deputies_table()
+                if deputies_dim.empty:
+                    return deputies_dim
+                self._deputies_dim = deputies_dim
+            return self._deputies_dim
+
+    def deputy_ids(self) -> List[int]:
+        deputies_dim = self.deputies_dim()
+        return deputies_dim["deputy_id"].tolist() if not deputies_dim.empty else []
+
+    def _get_expenses_page(
+        self, url: str, deputy_id: int, page: int, year: Optional[int], months
+    ) -> List:
+        """Fetch one expenses page, logging and returning no rows on failure."""
+        try:
+            data = self._make_request(url, params=expense_page_params(page, year, months))
+            return data["dados"]
+        except Exception as e:
+            logger.error(
+                f"Error fetching expenses page {page} for deputy {deputy_id}: {str(e)}"
+            )
+            return []
 
-    def get_expenses_table(self, deputy_id: int) -> pd.DataFrame:
-        """Get expenses data for a specific deputy."""
+    def get_expenses_table(
+        self,
+        deputy_id: int,
+        year: Optional[int] = None,
+        months: Optional[List[int]] = None,
+    ) -> Tuple[pd.DataFrame, bool]:
+        """
+        Get expenses data for a specific deputy, optionally only for some months of a year.
+        Page 1 also reports x-total-count; the remaining pages are then fetched
+        concurrently, each request still within the API's adaptive concurrency limit.
+        Returns the rows and whether they are complete: False when a request failed
+        or fewer rows came back than the API's x-total-count.
+        """
         try:
-            params = {"itens": 1}
             url = f"{self.BASE_URL}/deputados/{deputy_id}/despesas"
-            response = self.api_session.get(url, params=params)
+            # The first page doubles as the probe for x-total-count
+            response = self._get(url, params=expense_page_params(1, year, months))
 
             if response.status_code != 200:
-                return pd.DataFrame()
+                return pd.DataFrame(), False
 
             total_items = int(response.headers.get("x-total-count", 0))
-            total_pages = (total_items + 99) // 100
+            total_pages = page_count(total_items, EXPENSES_PAGE_SIZE)
 
             logger.info(
                 f"Fetching {total_pages} pages of expenses for deputy {deputy_id}"
             )
 
-            all_expenses = []
-            for page in range(1, total_pages + 1):
-                try:
-                    params = {
-                        "pagina": page,
-                        "itens": 1000,
-                        "ordenarPor": "dataDocumento",
-                    }
-                    data = self._make_request(url, params=params)
-                    all_expenses.extend(data["dados"])
-                except Exception as e:
-                    logger.error(
-                        f"Error fetching expenses page {page} for deputy {deputy_id}: {str(e)}"
-                    )
-                    continue
+            all_expenses = list(response.json()["dados"])
+            pages = range(2, total_pages + 1)
+            if pages:
+                with ThreadPoolExecutor(
+                    max_workers=min(len(pages), EXPENSE_PAGE_WORKERS)
+                ) as executor:
+                    for rows in executor.map(
+                        lambda page: self._get_expenses_page(
+                            url, deputy_id, page, year, months
+                        ),
+                        pages,
+                    ):
+                        all_expenses.extend(rows)
+
+            complete = validate_row_count(deputy_id, len(all_expenses), total_items)
 
             if not all_expenses:
-                return pd.DataFrame()
-
-            expenses_df = pd.DataFrame(all_expenses)
-            expenses_df["deputy_id"] = deputy_id
-
-            # Convert date and extract month/year
-            expenses_df["dataDocumento"] = pd.to_datetime(expenses_df["dataDocumento"])
-
-            # Select relevant columns
-            expenses_fact = expenses_df[
-                [
-                    "deputy_id",
-                    "valorDocumento",
-                    "dataDocumento",
-                    "valorLiquido",
-                    "mes",
-                    "ano",
-                    "tipoDespesa",
-                    "tipoDocumento",
-                    "cnpjCpfFornecedor",
-                    "nomeFornecedor",
-                    "parcela",
-                ]
-            ].copy()
-
-            # Convert valorDocumento to float
-            expenses_fact["valorLiquido"] = pd.to_numeric(
-                expenses_fact["valorDocumento"], errors="coerce"
-            )
+                return pd.DataFrame(), complete
 
-            return expenses_fact
+            return build_expenses_fact(all_expenses, deputy_id), complete
 
         except Exception as e:
             logger.error(f"Error processing expenses for deputy {deputy_id}: {str(e)}")
-            return pd.DataFrame()
+            return pd.DataFrame(), False
+
+    def scrape_attendance(
+        self, deputy_id: int, year: int, timestamp: datetime
+    ) -> Optional[Dict]:
+        """Scrape one deputy's plenary attendance; None if the request failed."""
+        try:
+            url = f"{self.WEBSITE_URL}/{deputy_id}?ano={year}"
+            response = self._get(url, session=self.web_session, limiter=self.web_limiter)
+            response.raise_for_status()
+
+            attendance_data = parse_attendance_html(response.text)
+            if attendance_data is None:
+                logger.warning(
+                    f"No plenary attendance section found for deputy {deputy_id}"
+                )
+                attendance_data = {}
+            logger.info(f"Collected attendance data for deputy {deputy_id}")
+            return attendance_record(deputy_id, year, timestamp, attendance_data)
+
+        except Exception as e:
+            logger.error(
+                f"Error collecting attendance data for deputy {deputy_id}: {str(e)}"
+            )
+            return None
 
     def batch_scrape_attendance(
-        self, deputy_ids: List[int], year: int = 2024
+        self,
+        deputy_ids: List[int],
+        year: int = 2024,
+        checkpoint: Optional[JsonlCheckpoint] = None,
     ) -> pd.DataFrame:
-        """Batch scrapes attendance data for multiple deputies in a given year."""
-        results = []
+        """
+        Batch scrapes attendance data for multiple deputies in a given year.
+        Up to `attendance_workers` pages are fetched at once under the shared website
+        pacing. Deputies already in `checkpoint` are skipped and each new success is
+        appended to it; failures get zero counts and are retried on the next run.
+        """
         timestamp = datetime.now()
+        results = checkpoint.load() if checkpoint is not None else {}
+        pending = [dep_id for dep_id in deputy_ids if dep_id not in results]
 
         logger.info(
-            f"Scraping attendance data for {len(deputy_ids)} deputies in {year}"
+            f"Scraping attendance data for {len(pending)} deputies in {year} "
+            f"({len(deputy_ids) - len(pending)} already checkpointed)"
         )
 
-        for deputy_id in tqdm(deputy_ids, desc="Processing deputies"):
-            try:
-                url = f"{self.WEBSITE_URL}/{deputy_id}?ano={year}"
-                time.sleep(self.sleep_time)
-
-                response = self.web_session.get(url)
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.text, "html.parser")
-
-                # Find plenary attendance section
-                plenary_section = None
-                for section in soup.find_all("section", class_="presencas__section"):
-                    heading = section.find("h4", class_="presencas__section-heading")
-                    if heading and "Presença em Plenário" in heading.text:
-                        plenary_section = section
-                        break
-
-                if not plenary_section:
-                    logger.warning(
-                        f"No plenary attendance section found for deputy {deputy_id}"
-                    )
-                    results.append(
-                        {
-                            "deputy_id": deputy_id,
-                            "year": year,
-                            "timestamp": timestamp,
-                            "presencas": 0,
-                            "ausencias_justificadas": 0,
-                            "ausencias_nao_justificadas": 0,
-                        }
-                    )
-                    continue
-
-                attendance_data = {}
-                attendance_items = plenary_section.find_all(
-                    "li", class_="presencas__data"
-                )
-
-                for item in attendance_items:
-                    label = item.find("span", class_="presencas__label").text.strip()
-                    value_text = item.find("span", class_="presencas__qtd").text.strip()
-                    try:
-                        value = int(re.search(r"\d+", value_text).group())
-                    except Exception:
-                        value = 0
-
-                    label_lower = label.lower()
-                    if "presença" in label_lower and "ausência" not in label_lower:
-                        attendance_data["presencas"] = value
-                    elif (
-                        "ausências justificadas" in label_lower
-                        or "ausencias justificadas" in label_lower
-                    ):
-                        attendance_data["ausencias_justificadas"] = value
-                    elif (
-                        "ausências não justificadas" in label_lower
-                        or "ausencias nao justificadas" in label_lower
-                    ):
-                        attendance_data["ausencias_nao_justificadas"] = value
-
-                results.append(
-                    {
-                        "deputy_id": deputy_id,
-                        "year": year,
-                        "timestamp": timestamp,
-                        "presencas": attendance_data.get("presencas", 0),
-                        "ausencias_justificadas": attendance_data.get(
-                            "ausencias_justificadas", 0
-                        ),
-                        "ausencias_nao_justificadas": attendance_data.get(
-                            "ausencias_nao_justificadas", 0
-                        ),
-                    }
-                )
-                logger.info(f"Collected attendance data for deputy {deputy_id}")
-
-            except Exception as e:
-                logger.error(
-                    f"Error collecting attendance data for deputy {deputy_id}: {str(e)}"
-                )
-                results.append(
-                    {
-                        "deputy_id": deputy_id,
-                        "year": year,
-                        "timestamp": timestamp,
-                        "presencas": 0,
-                        "ausencias_justificadas": 0,
-                        "ausencias_nao_justificadas": 0,
-                    }
-                )
-
-        # Create DataFrame
-        df = pd.DataFrame(results)
-
-        # Add percentage calculations
-        if not df.empty:
-            df["total_dias"] = (
-                df["presencas"]
-                + df["ausencias_justificadas"]
-                + df["ausencias_nao_justificadas"]
-            )
-            df["taxa_presenca"] = (df["presencas"] / df["total_dias"] * 100).round(2)
-
-        return df
-
-    def get_propositions_data(self, deputy_id: int, year: int) -> Dict:
+        with ThreadPoolExecutor(max_workers=self.attendance_workers) as executor:
+            futures = {
+                executor.submit(self.scrape_attendance, dep_id, year, timestamp): dep_id
+                for dep_id in pending
+            }
+            for future in tqdm(
+                as_completed(futures), total=len(futures), desc="Processing deputies"
+            ):
+                dep_id = futures[future]
+                record = future.result()
+                if record is None:
+                    record = attendance_record(dep_id, year, timestamp, {})
+                elif checkpoint is not None:
+                    checkpoint.append(record)
+                results[dep_id] = record
+
+        return build_attendance_dim([results[dep_id] for dep_id in deputy_ids])
+
+    def get_propositions_data(
+        self,
+        deputy_id: int,
+        year: int,
+        since: Optional[str] = None,
+        after_id: int = 0,
+    ) -> Dict:
         """
         Get propositions data for a deputy for a specific year.
-        Returns a dict with deputy_id, proposition_count, and a list of ementa texts.
+        Returns a dict with deputy_id, proposition_count, a list of ementa texts
+        and the last proposition id seen. With `since`/`after_id` only propositions
+        presented from that date and newer than that id are returned.
         """
         try:
-            start_date = f"{year}-01-01"
+            start_date = since or f"{year}-01-01"
             end_date = f"{year}-12-31"
             base_url = f"{self.BASE_URL}/proposicoes"
             params = {
@@ -338,13 +638,12 @@ class DeputiesDataCollector:
                 "ordem": "ASC",
                 "ordenarPor": "id",
             }
-            response = self.api_session.get(base_url, params=params)
+            response = self._get(base_url, params=params)
             response.raise_for_status()
             total_count = int(response.headers.get("x-total-count", 0))
-            ementas = []
+            all_props = []
             if total_count > 0:
                 total_pages = (total_count + 999) // 1000
-                all_props = []
                 for page in range(1, total_pages + 1):
                     params_page = {
                         "idDeputadoAutor": deputy_id,
@@ -355,19 +654,11 @@ class DeputiesDataCollector:
                         "ordem": "ASC",
                         "ordenarPor": "id",
                     }
-                    page_response = self.api_session.get(base_url, params=params_page)
+                    page_response = self._get(base_url, params=params_page)
                     page_response.raise_for_status()
                     data = page_response.json()
                     all_props.extend(data.get("dados", []))
-                for prop in all_props:
-                    ementa = prop.get("ementa")
-                    if ementa:
-                        ementas.append(ementa)
-            return {
-                "deputy_id": deputy_id,
-                "proposition_count": total_count,
-                "ementas": ementas,
-            }
+            return propositions_record(deputy_id, all_props, total_count, after_id)
         except Exception as e:
             logger.error(
                 f"Error fetching propositions for deputy {deputy_id} in year {year}: {e}"
@@ -376,7 +667,7 @@ class DeputiesDataCollector:
 
     def save_deputies_data(self, year: int = 2024) -> pd.DataFrame:
         """Run and save deputies data to CSV."""
-        deputies_dim = self.get_deputies_table()
+        deputies_dim = self.deputies_dim()
         timestamp = datetime.now().strftime("%Y%m%d")
         file_path = os.path.join(self.output_dir, f"deputies_{year}_{timestamp}.csv")
         deputies_dim.to_csv(file_path, index=False)
@@ -384,16 +675,57 @@ class DeputiesDataCollector:
         return deputies_dim
 
     def save_expenses_data(
-        self, deputy_ids: Optional[List[int]] = None, year: int = 2024
+        self,
+        deputy_ids: Optional[List[int]] = None,
+        year: int = 2024,
+        incremental: bool = False,
+        output_format: str = "csv",
     ) -> pd.DataFrame:
-        """Run and save expenses data to CSV."""
+        """
+        Run and save expenses data to CSV, or stream it to partitioned Parquet.
+        With `incremental`, only the months from each deputy's watermark onward
+        are refetched and merged into the existing expenses data. A deputy whose
+        fetch came back short keeps its previous rows and loses its watermark, so
+        the next incremental run refetches its whole year.
+        With output_format="parquet", each deputy is written as soon as it is
+        collected and a (deputy_id, rows, path, complete) summary is returned instead
+        of the rows. Deputies whose rows came back short are marked on the result
+        (see orchestrator.mark_incomplete), so the run summary reports them.
+        """
         if deputy_ids is None:
-            deputies_dim = self.get_deputies_table()
-            deputy_ids = deputies_dim["deputy_id"].tolist()
+            deputy_ids = self.deputy_ids()
+        if output_format == "parquet":
+            return self._stream_expenses_parquet(deputy_ids, year, incremental)
+        watermarks = WatermarkStore(self.output_dir, year)
+        previous_file = (
+            latest_output_file(self.output_dir, "expense", year) if incremental else None
+        )
+        refreshed = {}
+        if previous_file:
+            refreshed = {
+                dep_id: watermarks.expense_months(dep_id) for dep_id in deputy_ids
+            }
+            logger.info(f"Incremental expenses collection on top of {previous_file}")
+
+        def fetch(dep_id: int) -> Tuple[pd.DataFrame, bool]:
+            if previous_file:
+                return self.get_expenses_table(dep_id, year, refreshed[dep_id])
+            return self.get_expenses_table(dep_id)
+
         all_expenses = []
+        incomplete = []
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            expenses_dfs = list(executor.map(self.get_expenses_table, deputy_ids))
-            for df in expenses_dfs:
+            fetched = list(executor.map(fetch, deputy_ids))
+            for dep_id, (df, complete) in zip(deputy_ids, fetched):
+                if not complete:
+                    watermarks.reset_expenses(dep_id)
+                    incomplete.append(dep_id)
+                    if previous_file:
+                        # Keep the previous rows over a partial refetch
+                        del refreshed[dep_id]
+                        continue
+                else:
+                    watermarks.record_expenses(dep_id, df)
                 if not df.empty:
                     all_expenses.append(df)
         expenses_fact = (
@@ -401,24 +733,81 @@ class DeputiesDataCollector:
             if all_expenses
             else pd.DataFrame()
         )
-        timestamp = datetime.now().strftime("%Y%m%d")
-        file_path = os.path.join(self.output_dir, f"expense_{year}_{timestamp}.csv")
-        expenses_fact.to_csv(file_path, index=False)
+        if previous_file:
+            expenses_fact = merge_expenses(
+                pd.read_csv(previous_file), expenses_fact, refreshed, year
+            )
+            file_path = write_rolling_snapshot(
+                expenses_fact, self.output_dir, "expense", year
+            )
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d")
+            file_path = os.path.join(self.output_dir, f"expense_{year}_{timestamp}.csv")
+            expenses_fact.to_csv(file_path, index=False)
+        watermarks.save()
         logger.info(f"Saved expenses data to {file_path}")
-        return expenses_fact
+        return mark_incomplete(expenses_fact, incomplete)
+
+    def _stream_expenses_parquet(
+        self, deputy_ids: List[int], year: int, incremental: bool
+    ) -> pd.DataFrame:
+        """
+        Write each deputy's expenses to its Parquet partition as soon as it completes.
+        A short incremental refetch leaves the partition as it was; any short fetch
+        drops the deputy's watermark, so the next incremental run refetches its whole year.
+        """
+        watermarks = WatermarkStore(self.output_dir, year)
+        sink = PartitionedParquetSink(
+            self.output_dir, "expenses", year, EXPENSE_DICTIONARY_COLUMNS
+        )
+
+        refreshed = {
+            dep_id: watermarks.expense_months(dep_id)
+            for dep_id in deputy_ids
+            if incremental and sink.exists(dep_id)
+        }
+
+        def fetch(dep_id: int) -> Tuple[pd.DataFrame, bool]:
+            if dep_id in refreshed:
+                return self.get_expenses_table(dep_id, year, refreshed[dep_id])
+            return self.get_expenses_table(dep_id)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch, dep_id): dep_id for dep_id in deputy_ids}
+            for future in as_completed(futures):
+                # Drop our reference so finished results can be freed right after writing
+                dep_id = futures.pop(future)
+                df, complete = future.result()
+                if not complete:
+                    watermarks.reset_expenses(dep_id)
+                    if dep_id in refreshed:
+                        df = pd.DataFrame()
+                elif dep_id in refreshed:
+                    df = merge_expenses(
+                        sink.read(dep_id), df, {dep_id: refreshed[dep_id]}, year
+                    )
+                if complete:
+                    watermarks.record_expenses(dep_id, df)
+                sink.write(dep_id, df, complete)
+        watermarks.save()
+        return sink.summary()
 
     def save_attendance_data(
         self, deputy_ids: Optional[List[int]] = None, year: int = 2024
     ) -> pd.DataFrame:
-        """Run and save attendance data to CSV (non-batched version)."""
+        """
+        Run and save attendance data to CSV (non-batched version).
+        Progress is checkpointed, so a rerun after a crash only scrapes the missing deputies.
+        """
         if deputy_ids is None:
-            deputies_dim = self.get_deputies_table()
-            deputy_ids = deputies_dim["deputy_id"].tolist()
-        attendance_dim = self.batch_scrape_attendance(deputy_ids, year)
+            deputy_ids = self.deputy_ids()
+        checkpoint = attendance_checkpoint(self.output_dir, year)
+        attendance_dim = self.batch_scrape_attendance(deputy_ids, year, checkpoint)
         timestamp = datetime.now().strftime("%Y%m%d")
         file_path = os.path.join(self.output_dir, f"attendance_{year}_{timestamp}.csv")
         attendance_dim.to_csv(file_path, index=False)
         logger.info(f"Saved attendance data to {file_path}")
+        finish_attendance_checkpoint(checkpoint, deputy_ids)
         return attendance_dim
 
     def save_attendance_data_batched(
@@ -430,98 +819,234 @@ class DeputiesDataCollector:
     ) -> pd.DataFrame:
         """
         Run and save attendance data in batches of deputy IDs.
-        Processes deputy IDs in batches of batch_size, sleeps for pause_time seconds between batches,
-        and appends the results to the CSV.
+        Processes deputy IDs in batches of batch_size and sleeps for pause_time seconds
+        between batches. Every scraped deputy is checkpointed, so a rerun resumes with
+        the deputies still missing; the CSV is written once all batches are done.
         """
         if deputy_ids is None:
-            deputies_dim = self.get_deputies_table()
-            deputy_ids = deputies_dim["deputy_id"].tolist()
+            deputy_ids = self.deputy_ids()
 
-        timestamp = datetime.now().strftime("%Y%m%d")
-        file_path = os.path.join(self.output_dir, f"attendance_{year}_{timestamp}.csv")
-        result_df = pd.DataFrame()
+        checkpoint = attendance_checkpoint(self.output_dir, year)
+        done = checkpoint.load()
+        pending = [dep_id for dep_id in deputy_ids if dep_id not in done]
+        if done:
+            logger.info(f"Resuming: {len(deputy_ids) - len(pending)} deputies done")
 
         # Process in batches
-        for i in range(0, len(deputy_ids), batch_size):
-            batch_ids = deputy_ids[i : i + batch_size]
+        for i in range(0, len(pending), batch_size):
+            batch_ids = pending[i : i + batch_size]
             logger.info(f"Processing batch {i // batch_size + 1}: {batch_ids}")
-            batch_df = self.batch_scrape_attendance(batch_ids, year)
-            # Append to CSV (create new file if it doesn't exist)
-            if os.path.exists(file_path):
-                batch_df.to_csv(file_path, mode="a", index=False, header=False)
-            else:
-                batch_df.to_csv(file_path, index=False)
-            result_df = pd.concat([result_df, batch_df], ignore_index=True)
+            self.batch_scrape_attendance(batch_ids, year, checkpoint)
             # Sleep if there are more batches to process
-            if i + batch_size < len(deputy_ids):
+            if i + batch_size < len(pending):
                 logger.info(f"Sleeping for {pause_time} seconds between batches")
                 time.sleep(pause_time)
 
+        # Deputies that failed in every attempt still get a zero row
+        timestamp = datetime.now()
+        results = checkpoint.load()
+        result_df = build_attendance_dim(
+            [
+                results.get(dep_id) or attendance_record(dep_id, year, timestamp, {})
+                for dep_id in deputy_ids
+            ]
+        )
+        file_path = os.path.join(
+            self.output_dir, f"attendance_{year}_{timestamp.strftime('%Y%m%d')}.csv"
+        )
+        result_df.to_csv(file_path, index=False)
         logger.info(f"Saved batched attendance data to {file_path}")
+        finish_attendance_checkpoint(checkpoint, deputy_ids)
         return result_df
 
     def save_propositions_data(
-        self, deputy_ids: Optional[List[int]] = None, year: int = 2024
+        self,
+        deputy_ids: Optional[List[int]] = None,
+        year: int = 2024,
+        incremental: bool = False,
+        output_format: str = "csv",
     ) -> pd.DataFrame:
-        """Run and save propositions data to CSV."""
+        """
+        Run and save propositions data to CSV, or stream it to partitioned Parquet.
+        With `incremental`, only propositions newer than each deputy's watermark
+        are fetched and appended to the existing propositions data.
+        With output_format="parquet", a (deputy_id, rows, path) summary is returned.
+        """
         if deputy_ids is None:
-            deputies_dim = self.get_deputies_table()
-            deputy_ids = deputies_dim["deputy_id"].tolist()
+            deputy_ids = self.deputy_ids()
+        if output_format == "parquet":
+            return self._stream_propositions_parquet(deputy_ids, year, incremental)
+        watermarks = WatermarkStore(self.output_dir, year)
+        previous_file = (
+            latest_output_file(self.output_dir, "proposition", year)
+            if incremental
+            else None
+        )
+        cursors = {}
+        if previous_file:
+            cursors = {
+                dep_id: watermarks.proposition_cursor(dep_id) for dep_id in deputy_ids
+            }
+            logger.info(f"Incremental propositions collection on top of {previous_file}")
+
+        def fetch(dep_id: int) -> Dict:
+            since, after_id = cursors.get(dep_id, (None, 0))
+            return self.get_propositions_data(dep_id, year, since, after_id)
+
         all_propositions = []
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            results = list(
-                executor.map(
-                    lambda dep_id: self.get_propositions_data(dep_id, year), deputy_ids
-                )
-            )
+            results = list(executor.map(fetch, deputy_ids))
             for res in results:
+                # Failed fetches carry no last_id and leave the watermark untouched
+                if "last_id" in res:
+                    watermarks.record_propositions(res["deputy_id"], res.pop("last_id"))
                 all_propositions.append(res)
         propositions_dim = pd.DataFrame(all_propositions)
-        timestamp = datetime.now().strftime("%Y%m%d")
-        file_path = os.path.join(self.output_dir, f"proposition_{year}_{timestamp}.csv")
-        propositions_dim.to_csv(file_path, index=False)
+        if previous_file:
+            appended = [dep_id for dep_id, (since, _) in cursors.items() if since]
+            propositions_dim = merge_propositions(
+                pd.read_csv(previous_file), propositions_dim, appended
+            )
+            file_path = write_rolling_snapshot(
+                propositions_dim, self.output_dir, "proposition", year
+            )
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d")
+            file_path = os.path.join(
+                self.output_dir, f"proposition_{year}_{timestamp}.csv"
+            )
+            propositions_dim.to_csv(file_path, index=False)
+        watermarks.save()
         logger.info(f"Saved propositions data to {file_path}")
         return propositions_dim
 
+    def _stream_propositions_parquet(
+        self, deputy_ids: List[int], year: int, incremental: bool
+    ) -> pd.DataFrame:
+        """Write each deputy's propositions to its Parquet partition as soon as it completes."""
+        watermarks = WatermarkStore(self.output_dir, year)
+        sink = PartitionedParquetSink(self.output_dir, "propositions", year)
+
+        cursors = {
+            dep_id: watermarks.proposition_cursor(dep_id)
+            for dep_id in deputy_ids
+            if incremental and sink.exists(dep_id)
+        }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.get_propositions_data,
+                    dep_id,
+                    year,
+                    *cursors.get(dep_id, (None, 0)),
+                ): dep_id
+                for dep_id in deputy_ids
+            }
+            for future in as_completed(futures):
+                dep_id = futures.pop(future)
+                res = future.result()
+                if "last_id" in res:
+                    watermarks.record_propositions(dep_id, res.pop("last_id"))
+                df = pd.DataFrame([res])
+                since, _ = cursors.get(dep_id, (None, 0))
+                if since:
+                    df = merge_propositions(sink.read(dep_id), df, [dep_id])
+                sink.write(dep_id, df)
+        watermarks.save()
+        return sink.summary()
+
     def build_data_collection(
-        self, year: int = 2024
+        self,
+        year: int = 2024,
+        incremental: bool = False,
+        output_format: str = "csv",
+        tasks: Optional[List[str]] = None,
+        max_workers: int = 4,
     ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-        """Collect all data tables and save them to CSV."""
+        """
+        Collect the selected tables (all of them by default) as a small DAG.
+        The deputies dimension is fetched once and feeds every other task; expenses,
+        attendance and propositions then run side by side, since they hit different
+        endpoints and hosts. A per-task timing summary is logged and saved under _state/runs.
+        """
         logger.info(f"Starting data collection for legislature {self.legislature}...")
-        deputies_dim = self.get_deputies_table()
-        if deputies_dim.empty:
-            logger.error("No deputies found. Aborting data collection.")
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        deputy_ids = deputies_dim["deputy_id"].tolist()
-
-        # Collect expenses
-        logger.info(f"Collecting expenses for {len(deputy_ids)} deputies...")
-        expenses_fact = self.save_expenses_data(deputy_ids, year)
-
-        # Collect attendance data (non-batched version)
-        attendance_dim = self.save_attendance_data(deputy_ids, year)
-
-        # Collect propositions data
-        propositions_dim = self.save_propositions_data(deputy_ids, year)
-
-        # Save deputies data (if not already saved)
-        self.save_deputies_data(year)
+        selected = set(tasks or COLLECTION_TASKS)
+
+        def fetch_deputies() -> pd.DataFrame:
+            deputies_dim = self.deputies_dim()
+            if deputies_dim.empty:
+                raise RuntimeError("No deputies found. Aborting data collection.")
+            return deputies_dim
+
+        def ids(deputies_dim: pd.DataFrame) -> List[int]:
+            return deputies_dim["deputy_id"].tolist()
+
+        dag = [CollectionTask("deputies_dim", fetch_deputies)]
+        if "deputies" in selected:
+            dag.append(
+                CollectionTask(
+                    "deputies",
+                    lambda deputies_dim: self.save_deputies_data(year),
+                    ["deputies_dim"],
+                )
+            )
+        if "expenses" in selected:
+            dag.append(
+                CollectionTask(
+                    "expenses",
+                    lambda deputies_dim: self.save_expenses_data(
+                        ids(deputies_dim), year, incremental, output_format
+                    ),
+                    ["deputies_dim"],
+                )
+            )
+        if "attendance" in selected:
+            dag.append(
+                CollectionTask(
+                    "attendance",
+                    lambda deputies_dim: self.save_attendance_data(
+                        ids(deputies_dim), year
+                    ),
+                    ["deputies_dim"],
+                )
+            )
+        if "attendance_batched" in selected:
+            dag.append(
+                CollectionTask(
+                    "attendance",
+                    lambda deputies_dim: self.save_attendance_data_batched(
+                        ids(deputies_dim), year
+                    ),
+                    ["deputies_dim"],
+                )
+            )
+        if "propositions" in selected:
+            dag.append(
+                CollectionTask(
+                    "propositions",
+                    lambda deputies_dim: self.save_propositions_data(
+                        ids(deputies_dim), year, incremental, output_format
+                    ),
+                    ["deputies_dim"],
+                )
+            )
 
-        logger.info(f"""Data collection completed:
-            - Deputies: {len(deputies_dim)}
-            - Expense records: {len(expenses_fact)}
-            - Attendance records: {len(attendance_dim)}
-            - Proposition records: {len(propositions_dim)}
-            """)
-        return deputies_dim, expenses_fact, attendance_dim, propositions_dim
+        summary = RunSummary(self.output_dir, self.metrics)
+        results = run_tasks(dag, summary, max_workers)
+        return tuple(
+            results.get(name, pd.DataFrame())
+            for name in ("deputies_dim", "expenses", "attendance", "propositions")
+        )
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Run deputies data collection tasks separately."
+        description="Run deputies data collection tasks separately or together."
     )
     parser.add_argument(
         "task",
+        nargs="+",
         choices=[
             "deputies",
             "expenses",
@@ -530,7 +1055,7 @@ if __name__ == "__main__":
             "propositions",
             "all",
         ],
-        help="Which task to run",
+        help="Which tasks to run; several tasks share one deputies fetch and run concurrently",
     )
     parser.add_argument(
         "--year",
@@ -538,25 +1063,105 @@ if __name__ == "__main__":
         default=2024,
         help="Year to filter attendance/propositions data",
     )
+    parser.add_argument(
+        "--legislature",
+        type=int,
+        default=57,
+        help="Legislature whose deputies are collected",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        default="threads",
+        help="Collection engine: thread pool with requests, or asyncio with aiohttp",
+    )
+    parser.add_argument(
+        "--api-rate",
+        type=float,
+        default=10.0,
+        help="Max API requests per second (async engine)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default="data/.http_cache",
+        help="Directory of the on-disk HTTP response cache",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always fetch from the network without caching responses",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay every request from the response cache, never touching the network",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch expenses/propositions newer than the stored watermarks",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Output for expenses/propositions: one CSV, or Parquet partitioned by year and deputy",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Retries per request on 429/5xx and connection errors (0 disables)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="data/bronze",
+        help="Where the collected files are written",
+    )
     args = parser.parse_args()
+    retry_policy = RetryPolicy(max_retries=args.max_retries)
 
-    data_collector = DeputiesDataCollector(
-        legislature=57, output_dir="data/bronze", sleep_time=2
+    response_cache = (
+        None
+        if args.no_cache
+        else ResponseCache(args.cache_dir, offline=args.offline)
     )
 
-    if args.task == "deputies":
-        data_collector.save_deputies_data(year=args.year)
-    elif args.task == "expenses":
-        data_collector.save_expenses_data(year=args.year)
-    elif args.task == "attendance":
-        data_collector.save_attendance_data(year=args.year)
-    elif args.task == "attendance_batched":
-        data_collector.save_attendance_data_batched(year=args.year)
-    elif args.task == "propositions":
-        data_collector.save_propositions_data(year=args.year)
-    elif args.task == "all":
-        data_collector.build_data_collection(year=args.year)
-    else:
-        print(
-            "Invalid task. Choose from deputies, expenses, attendance, attendance_batched, propositions, or all."
+    if args.engine == "async":
+        import asyncio
+
+        from async_collector import run_collection
+
+        asyncio.run(
+            run_collection(
+                [task.replace("_batched", "") for task in args.task],
+                year=args.year,
+                legislature=args.legislature,
+                output_dir=args.output_dir,
+                api_rate=args.api_rate,
+                web_rate=1 / 2,
+                cache=response_cache,
+                retry=retry_policy,
+                incremental=args.incremental,
+                output_format=args.format,
+            )
         )
+        raise SystemExit(0)
+
+    data_collector = DeputiesDataCollector(
+        legislature=args.legislature,
+        output_dir=args.output_dir,
+        sleep_time=2,
+        cache=response_cache,
+        retry=retry_policy,
+    )
+
+    data_collector.build_data_collection(
+        year=args.year,
+        incremental=args.incremental,
+        output_format=args.format,
+        tasks=None if "all" in args.task else args.task,
+    )
+
+    if response_cache is not None:
+        response_cache.log_stats()
@@ -1,32 +1,22 @@
 import os
-import duckdb
+import sys
+import logging
+import argparse
 
-# Create a DuckDB connection to the deputies_db
-con = duckdb.connect('../deputies_db.db')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sql_models import discover_models, run_models
 
-# Create the gold schema if it doesn't exist
-con.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Iterate over the .sql files in the current folder
-for sql_file in os.listdir('.'):
-    if sql_file.endswith('.sql'):
-        table_name = sql_file.replace('.sql', '')
-        
-        # Read the SQL query from the file
-        with open(sql_file, 'r') as open_file:
-            query = open_file.read()
-        
-        # Execute the query on the deputies_db
-        result_df = con.execute(query).fetchdf()
-        
-        # Save the result to the gold schema
-        con.execute(f"CREATE OR REPLACE TABLE gold.{table_name} AS SELECT * FROM result_df;")
-        print(f"File {sql_file} processed and saved the result to table gold.{table_name}")
-        
-        # Export the result to a Parquet file partitioned by party
-        parquet_path = f"{table_name}_parquet"
-        con.execute(f"COPY (SELECT * FROM gold.{table_name}) TO '{parquet_path}' (FORMAT PARQUET, PARTITION_BY party);")
-        print(f"Exported table gold.{table_name} to Parquet files partitioned by party at {parquet_path}")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the gold models.')
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only refresh the deputies (and party partitions) whose silver/bronze inputs changed',
+    )
+    args = parser.parse_args()
 
-# Close the DuckDB connection
-con.close()
\ No newline at end of file
+    # Build every .sql file in the current folder as a table in the gold schema,
+    # directly inside DuckDB and in dependency order, then export it to Parquet
+    run_models('../deputies_db.db', discover_models('.', 'gold'), incremental=args.incremental)
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+
+# TTL (seconds) per endpoint, matched in order against the request URL
+DEFAULT_TTLS: List[Tuple[str, float]] = [
+    (r"/deputados/\d+/despesas$", 12 * HOUR),
+    (r"/proposicoes$", 12 * HOUR),
+    (r"/api/v2/deputados$", 24 * HOUR),
+    (r"camara\.leg\.br/deputados/\d+(\?|$)", 24 * HOUR),
+]
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request has no cached response."""
+
+
+class HTTPStatusError(Exception):
+    """Raised by CachedResponse.raise_for_status for error responses."""
+
+
+class CachedHeaders(dict):
+    """Header mapping with case-insensitive `get`/lookup (keys are stored lower-cased)."""
+
+    def __init__(self, headers: Mapping[str, str] = ()):
+        super().__init__((k.lower(), v) for k, v in dict(headers).items())
+
+    def __getitem__(self, key: str) -> str:
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and super().__contains__(key.lower())
+
+    def get(self, key: str, default=None):
+        return super().get(key.lower(), default)
+
+
+class CachedResponse:
+    """Response read from or written to the cache; mimics the parts of requests.Response we use."""
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        fetched_at: float,
+        from_cache: bool = False,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CachedHeaders(headers)
+        self.content = content
+        self.fetched_at = fetched_at
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPStatusError(f"{self.status_code} error for url: {self.url}")
+
+
+class ResponseCache:
+    """
+    Persistent HTTP response cache keyed by URL and query params.
+    Fresh entries (within the endpoint TTL) are served from disk; stale ones are
+    revalidated with If-None-Match/If-Modified-Since. In offline mode every
+    request is replayed from disk, which makes a populated cache directory a
+    deterministic fixture for development and benchmarks.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttls: Optional[List[Tuple[str, float]]] = None,
+        default_ttl: float = HOUR,
+        offline: bool = False,
+    ):
+        self.cache_dir = cache_dir
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)]
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        """
+        Stable cache key for a request, however its query is spelled: the URL
+        without its query string, plus the sorted query pairs of both the URL and
+        `params` (list values as repeated keys, as they are sent). `.../123?ano=2024`
+        and `.../123` with params={"ano": 2024} share a key, so the threaded and the
+        async engine replay each other's responses.
+        """
+        parts = urlsplit(url)
+        pairs = parse_qsl(parts.query, keep_blank_values=True)
+        for k, v in (params or {}).items():
+            for item in v if isinstance(v, (list, tuple)) else [v]:
+                pairs.append((str(k), str(item)))
+        base = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, "", ""))
+        normalized = json.dumps([base, sorted(pairs)])
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.body")
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def lookup(self, url: str, params: Optional[Dict] = None) -> Optional[CachedResponse]:
+        """Return the cached response for a request, fresh or not, or None."""
+        meta_path, body_path = self._paths(self.key(url, params))
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            if self.offline:
+                raise CacheMiss(f"No cached response for {url} {params}")
+            return None
+        return CachedResponse(
+            url, meta["status_code"], meta["headers"], content, meta["fetched_at"], True
+        )
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return self.offline or time.time() - entry.fetched_at < self.ttl_for(entry.url)
+
+    def serve(self, entry: CachedResponse) -> CachedResponse:
+        """Record a hit for an entry served without touching the network."""
+        self._count("hits")
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+        """Validators for revalidating a stale entry."""
+        headers = {}
+        if entry is not None:
+            if entry.headers.get("etag"):
+                headers["If-None-Match"] = entry.headers["etag"]
+            if entry.headers.get("last-modified"):
+                headers["If-Modified-Since"] = entry.headers["last-modified"]
+        return headers
+
+    def revalidated(
+        self, entry: CachedResponse, params: Optional[Dict] = None
+    ) -> CachedResponse:
+        """Refresh the timestamp of an entry confirmed by a 304 Not Modified."""
+        self._count("revalidated")
+        return self._write(entry.url, params, entry.status_code, entry.headers, entry.content)
+
+    def store(
+        self,
+        url: str,
+        params: Optional[Dict],
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+    ) -> CachedResponse:
+        """Persist a successful live response and return it as a CachedResponse."""
+        self._count("misses")
+        if status_code != 200:
+            return CachedResponse(url, status_code, headers, content, time.time())
+        self._count("stored")
+        return self._write(url, params, status_code, headers, content)
+
+    def _write(
+        self,
+        url: str,
+        params: Optional[Dict],
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+    ) -> CachedResponse:
+        meta_path, body_path = self._paths(self.key(url, params))
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        fetched_at = time.time()
+        meta = {
+            "url": url,
+            "params": {str(k): str(v) for k, v in (params or {}).items()},
+            "status_code": status_code,
+            "headers": dict(CachedHeaders(headers)),
+            "fetched_at": fetched_at,
+        }
+        # Write to temp files and rename so concurrent readers never see partial entries
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(content)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+        return CachedResponse(url, status_code, headers, content, fetched_at)
+
+    def log_stats(self) -> None:
+        logger.info(
+            "HTTP cache: "
+            + ", ".join(f"{name}={count}" for name, count in self.stats.items())
+        )
@@ -0,0 +1,171 @@
+import logging
+import random
+import re
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches everything slower
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+ENDPOINT_PATTERNS = [
+    ("despesas", re.compile(r"/deputados/\d+/despesas")),
+    ("proposicoes", re.compile(r"/proposicoes")),
+    ("deputados", re.compile(r"/api/v2/deputados")),
+    ("deputy_page", re.compile(r"/deputados/\d+")),
+]
+
+
+def endpoint_name(url: str) -> str:
+    """Group a request URL under the endpoint it belongs to, for metrics."""
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return name
+    return "other"
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a request.
+    Backoff is exponential with full jitter, capped at `max_delay`. A server's
+    Retry-After is honored as the minimum wait, with the jittered backoff added
+    on top so throttled clients don't all come back at the same instant.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        statuses: Iterable[int] = RETRY_STATUSES,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = frozenset(statuses)
+
+    def should_retry(self, attempt: int, status: Optional[int] = None) -> bool:
+        """`status` is None when the request failed without a response (connection error, timeout)."""
+        if attempt >= self.max_retries:
+            return False
+        return status is None or status in self.statuses
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        server_delay = retry_after_seconds(retry_after)
+        if server_delay is not None:
+            return min(server_delay + backoff, max(self.max_delay, server_delay))
+        return backoff
+
+
+class RequestMetrics:
+    """Thread-safe per-endpoint request counts, latency histograms, bytes and retries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict] = {}
+
+    def _endpoint(self, url: str) -> Dict:
+        name = endpoint_name(url)
+        if name not in self._endpoints:
+            self._endpoints[name] = {
+                "requests": 0,
+                "retries": 0,
+                "failures": 0,
+                "bytes": 0,
+                "statuses": {},
+                "latency_ms": {
+                    "sum": 0.0,
+                    "max": 0.0,
+                    "buckets": [0] * len(LATENCY_BUCKETS_MS),
+                },
+            }
+        return self._endpoints[name]
+
+    def observe(
+        self, url: str, seconds: float, status: Optional[int], num_bytes: int = 0
+    ) -> None:
+        """Record one network round trip; `status` is None for a connection error or timeout."""
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._endpoint(url)
+            stats["requests"] += 1
+            stats["bytes"] += num_bytes
+            key = str(status) if status is not None else "error"
+            stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+            latency = stats["latency_ms"]
+            latency["sum"] += ms
+            latency["max"] = max(latency["max"], ms)
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if ms <= bound:
+                    latency["buckets"][i] += 1
+                    break
+
+    def retried(self, url: str) -> None:
+        with self._lock:
+            self._endpoint(url)["retries"] += 1
+
+    def failed(self, url: str) -> None:
+        """A request that still failed after all its retries."""
+        with self._lock:
+            self._endpoint(url)["failures"] += 1
+
+    def report(self) -> Dict[str, Dict]:
+        """JSON-ready metrics per endpoint, with histogram bucket bounds as labels."""
+        labels = [f"le_{b:g}" if b != float("inf") else "le_inf" for b in LATENCY_BUCKETS_MS]
+        report = {}
+        with self._lock:
+            for name, stats in sorted(self._endpoints.items()):
+                latency = stats["latency_ms"]
+                report[name] = {
+                    "requests": stats["requests"],
+                    "retries": stats["retries"],
+                    "failures": stats["failures"],
+                    "bytes": stats["bytes"],
+                    "statuses": dict(stats["statuses"]),
+                    "latency_ms": {
+                        "mean": round(latency["sum"] / stats["requests"], 2)
+                        if stats["requests"]
+                        else None,
+                        "max": round(latency["max"], 2),
+                        "histogram": dict(zip(labels, latency["buckets"])),
+                    },
+                }
+        return report
+
+    def log(self) -> None:
+        for name, stats in self.report().items():
+            logger.info(
+                f"HTTP {name}: {stats['requests']} requests, {stats['retries']} retries, "
+                f"{stats['failures']} failures, {stats['bytes'] / 1e6:.1f} MB, "
+                f"mean {stats['latency_ms']['mean']} ms"
+            )
+
+
+def log_retry(url: str, reason: str, attempt: int, max_retries: int, delay: float) -> None:
+    logger.warning(
+        f"Retrying {url} in {delay:.1f}s after {reason} "
+        f"(attempt {attempt + 1}/{max_retries})"
+    )
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionTask:
+    """
+    One node of the collection DAG. `func` is called with the results of the
+    tasks it depends on as keyword arguments, named after those tasks.
+    """
+
+    def __init__(
+        self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()
+    ):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+def row_count(result: Any) -> Optional[int]:
+    """Rows in a task result: a table's length, or the count a task returned itself."""
+    if isinstance(result, int):
+        return result
+    return len(result) if hasattr(result, "__len__") else None
+
+
+def mark_incomplete(table, deputy_ids: Sequence[int]):
+    """
+    Record on a task's result table the deputies it collected only partially, so
+    the run summary reports the task as incomplete instead of ok. Returns the table.
+    """
+    table.attrs["incomplete_deputies"] = sorted(int(deputy_id) for deputy_id in deputy_ids)
+    if deputy_ids:
+        logger.warning(
+            f"{len(deputy_ids)} deputies were collected incompletely: "
+            f"{table.attrs['incomplete_deputies']}"
+        )
+    return table
+
+
+def incomplete_deputies(result: Any) -> List[int]:
+    """Deputies a task result was marked as missing rows for (see mark_incomplete)."""
+    return list(getattr(result, "attrs", {}).get("incomplete_deputies", []))
+
+
+class RunSummary:
+    """
+    Per-task status and timings of one collection run, saved as JSON under _state/runs.
+    With `metrics` (a RequestMetrics), the per-endpoint HTTP report is saved alongside.
+    """
+
+    def __init__(self, output_dir: str, metrics=None):
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.path = os.path.join(output_dir, "_state", "runs", f"{self.run_id}.json")
+        self.started = time.perf_counter()
+        self.tasks: List[Dict] = []
+        self.metrics = metrics
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        name: str,
+        status: str,
+        seconds: float = 0.0,
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> None:
+        incomplete = incomplete_deputies(result)
+        if incomplete and status == "ok":
+            status = "incomplete"
+        entry = {
+            "task": name,
+            "status": status,
+            "seconds": round(seconds, 3),
+            "rows": row_count(result),
+        }
+        if error:
+            entry["error"] = error
+        if incomplete:
+            entry["incomplete_deputies"] = incomplete
+        with self._lock:
+            self.tasks.append(entry)
+
+    def save(self) -> Dict:
+        summary = {
+            "run_id": self.run_id,
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "tasks": self.tasks,
+        }
+        if self.metrics is not None:
+            summary["http"] = self.metrics.report()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+        width = max((len(t["task"]) for t in self.tasks), default=0)
+        lines = [
+            f"  {t['task']:<{width}}  {t['status']:<10} {t['seconds']:>9.2f}s"
+            + (f" {t['rows']:>8} rows" if t["rows"] is not None else "")
+            for t in self.tasks
+        ]
+        logger.info(
+            f"Run {self.run_id} finished in {summary['total_seconds']:.2f}s:\n"
+            + "\n".join(lines)
+            + f"\nSaved run summary to {self.path}"
+        )
+        if self.metrics is not None:
+            self.metrics.log()
+        return summary
+
+
+def run_tasks(
+    tasks: Sequence[CollectionTask], summary: RunSummary, max_workers: int = 4
+) -> Dict[str, Any]:
+    """
+    Run the tasks as soon as their dependencies finish, independent ones side by
+    side. A failed task is logged and everything downstream of it is skipped;
+    the other branches still run. Returns the results of the tasks that succeeded.
+    """
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        missing = [dep for dep in task.depends_on if dep not in by_name]
+        if missing:
+            raise ValueError(f"Task {task.name} depends on unknown tasks {missing}")
+
+    results: Dict[str, Any] = {}
+    pending = dict(by_name)
+    failed = set()
+    running = {}
+
+    def timed(task: CollectionTask, kwargs: Dict) -> Any:
+        start = time.perf_counter()
+        try:
+            result = task.func(**kwargs)
+        except Exception as e:
+            summary.record(task.name, "failed", time.perf_counter() - start, error=str(e))
+            raise
+        summary.record(task.name, "ok", time.perf_counter() - start, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, task in list(pending.items()):
+                if any(dep in failed for dep in task.depends_on):
+                    logger.warning(f"Skipping {name}: an upstream task failed")
+                    summary.record(name, "skipped")
+                    failed.add(name)
+                    del pending[name]
+                elif all(dep in results for dep in task.depends_on):
+                    kwargs = {dep: results[dep] for dep in task.depends_on}
+                    running[executor.submit(timed, task, kwargs)] = name
+                    del pending[name]
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among tasks {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"Task {name} failed: {e}")
+                    failed.add(name)
+
+    summary.save()
+    return results
@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+from typing import Dict, List, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from orchestrator import mark_incomplete
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedParquetSink:
+    """
+    Streams per-deputy results into a hive-partitioned Parquet dataset:
+    <output_dir>/<dataset>/year=<year>/deputy_id=<id>/part-0.parquet
+
+    Each deputy is written as soon as it is collected, so memory only ever holds
+    the deputies in flight. Low-cardinality string columns (supplier names,
+    expense types...) are stored dictionary-encoded. Rewriting a deputy replaces
+    its partition, which keeps reruns idempotent.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        dataset: str,
+        year: int,
+        dictionary_columns: Sequence[str] = (),
+    ):
+        self.root = os.path.join(output_dir, dataset)
+        self.year = year
+        self.dictionary_columns = list(dictionary_columns)
+        self._written: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def partition_path(self, deputy_id: int) -> str:
+        return os.path.join(
+            self.root, f"year={self.year}", f"deputy_id={int(deputy_id)}", "part-0.parquet"
+        )
+
+    def exists(self, deputy_id: int) -> bool:
+        return os.path.exists(self.partition_path(deputy_id))
+
+    def read(self, deputy_id: int) -> pd.DataFrame:
+        """Load one deputy's partition back, with deputy_id restored as a column."""
+        if not self.exists(deputy_id):
+            return pd.DataFrame()
+        # Read the file itself: read_table would also add the hive keys from the path
+        df = pq.ParquetFile(self.partition_path(deputy_id)).read().to_pandas()
+        for column in self.dictionary_columns:
+            if column in df.columns:
+                df[column] = df[column].astype(object)
+        df.insert(0, "deputy_id", int(deputy_id))
+        return df
+
+    def _to_table(self, df: pd.DataFrame) -> pa.Table:
+        # Partition keys live in the directory names, not in the files
+        df = df.drop(columns=["deputy_id", "year"], errors="ignore")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for column in self.dictionary_columns:
+            index = table.schema.get_field_index(column)
+            if index >= 0 and pa.types.is_string(table.schema.field(index).type):
+                table = table.set_column(
+                    index, column, table.column(column).dictionary_encode()
+                )
+        return table
+
+    def write(self, deputy_id: int, df: pd.DataFrame, complete: bool = True) -> int:
+        """
+        Write (or replace) one deputy's partition; returns the rows written.
+        An empty frame (nothing collected, or a failed fetch) leaves any existing partition alone.
+        `complete=False` flags a deputy whose fetch came back short in the summary.
+        """
+        path = self.partition_path(deputy_id)
+        if df.empty:
+            rows = 0
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            pq.write_table(self._to_table(df), tmp_path)
+            os.replace(tmp_path, path)
+            rows = len(df)
+        with self._lock:
+            self._written.append(
+                {"deputy_id": deputy_id, "rows": rows, "path": path, "complete": complete}
+            )
+        return rows
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per deputy written in this run: deputy_id, rows, path and whether
+        its fetch was complete. Incomplete deputies are marked for the run summary.
+        """
+        with self._lock:
+            summary = pd.DataFrame(
+                self._written, columns=["deputy_id", "rows", "path", "complete"]
+            )
+        logger.info(
+            f"Wrote {int(summary['rows'].sum())} rows for {len(summary)} deputies "
+            f"to {self.root}"
+        )
+        incomplete = summary.loc[~summary["complete"].astype(bool), "deputy_id"]
+        return mark_incomplete(summary, incomplete.tolist())
@@ -0,0 +1,393 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+from orchestrator import RunSummary
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(DATA_DIR)
+DB_PATH = os.path.join(DATA_DIR, "deputies_db.db")
+STATE_DIR = os.path.join(DATA_DIR, "_state", "pipeline")
+
+SQL_MODEL_CODE = ["data/sql_models.py", "data/orchestrator.py"]
+# Partition files of the expenses/propositions datasets collected with --format parquet
+RAW_PARQUET = "data/raw/*/year=*/deputy_id=*/*.parquet"
+
+
+class Stage:
+    """
+    One step of the pipeline: a script run as a subprocess from `cwd`, since the
+    scripts use paths relative to their own folder. `inputs` and `outputs` are
+    globs relative to the repository root. `depends_on` names the stages whose
+    results reach this one through deputies_db.db rather than through files;
+    `writes_db` stages leave their results there.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: Sequence[str],
+        cwd: str,
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        depends_on: Sequence[str] = (),
+        writes_db: bool = False,
+        cacheable: bool = True,
+        clear_outputs: bool = False,
+    ):
+        self.name = name
+        self.command = list(command)
+        self.cwd = cwd
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.depends_on = list(depends_on)
+        self.writes_db = writes_db
+        self.cacheable = cacheable
+        self.clear_outputs = clear_outputs
+
+
+def build_stages(year: int) -> List[Stage]:
+    """The whole flow, from the Câmara API to the recommender's similarity matrix."""
+    python = sys.executable
+    return [
+        # The API and website are not fingerprinted: collection runs whenever it is selected
+        Stage(
+            "collect",
+            [python, "data/get_data.py", "all", "--year", str(year)]
+            + ["--output-dir", "data/raw"],
+            ROOT_DIR,
+            outputs=["data/raw/*.csv", RAW_PARQUET],
+            cacheable=False,
+        ),
+        Stage(
+            "bronze",
+            [python, "ingestion.py", "--year", str(year)],
+            os.path.join(DATA_DIR, "bronze"),
+            inputs=[
+                "data/raw/*.csv",
+                RAW_PARQUET,
+                "data/bronze/sources.json",
+                "data/bronze/ingestion.py",
+            ],
+            outputs=["data/bronze/*.csv"],
+            writes_db=True,
+        ),
+        Stage(
+            "silver",
+            [python, "ingestion.py"],
+            os.path.join(DATA_DIR, "silver"),
+            inputs=["data/silver/*.sql", "data/silver/ingestion.py"] + SQL_MODEL_CODE,
+            outputs=["data/silver/*_parquet"],
+            depends_on=["bronze"],
+            writes_db=True,
+        ),
+        Stage(
+            "gold",
+            [python, "ingestion.py", "--incremental"],
+            os.path.join(DATA_DIR, "gold"),
+            inputs=[
+                "data/gold/*.sql",
+                "data/gold/ingestion.py",
+            ]
+            + SQL_MODEL_CODE,
+            outputs=["data/gold/deputies_consolidated_metrics_parquet/*/*.parquet"],
+            depends_on=["silver"],
+            writes_db=True,
+        ),
+        # Classification calls the OpenAI API, so it only runs when selected
+        Stage(
+            "classify",
+            [python, "gpt_classifier.py"],
+            os.path.join(ROOT_DIR, "utils"),
+            inputs=[
+                "utils/gpt_classifier.py",
+                "data/gold/deputies_consolidated_metrics_parquet/*/*.parquet",
+            ],
+            outputs=[
+                "data/gold/classified_deputies.parquet",
+                "data/gold/classified_deputies.json",
+            ],
+        ),
+        # Offline model distilled from the GPT labels, with its agreement report
+        Stage(
+            "distill",
+            [python, "local_classifier.py", "train"],
+            os.path.join(ROOT_DIR, "utils"),
+            inputs=[
+                "utils/local_classifier.py",
+                "data/gold/classified_deputies.parquet",
+                "data/gold/deputies_consolidated_metrics_parquet/*/*.parquet",
+            ],
+            outputs=["model/local_classifier.pkl", "model/local_classifier_report.json"],
+            depends_on=["gold"],
+        ),
+        # Shared and near-duplicate propositions, found with MinHash/LSH over silver.fact_propositions
+        Stage(
+            "overlap",
+            [python, "proposition_overlap.py"],
+            os.path.join(ROOT_DIR, "utils"),
+            inputs=[
+                "utils/proposition_overlap.py",
+                "utils/proposition_budget.py",
+                "data/silver/fact_propositions_parquet",
+            ],
+            outputs=[
+                "data/gold/proposition_duplicates_parquet",
+                "data/gold/deputy_proposition_overlap_parquet",
+            ],
+            depends_on=["silver"],
+            writes_db=True,
+        ),
+        Stage(
+            "enrich",
+            [python, "data_processing.py"],
+            os.path.join(ROOT_DIR, "utils"),
+            inputs=[
+                "utils/data_processing.py",
+                "data/enrich/deputies_enriched_features.sql",
+                "data/gold/classified_deputies.parquet",
+                "data/party_ideology_map.json",
+            ]
+            + SQL_MODEL_CODE,
+            outputs=["data/gold/deputies_enriched_features_parquet"],
+            depends_on=["gold"],
+            writes_db=True,
+        ),
+        # One model per legislature for this year, each built in a fresh folder and
+        # swapped in whole; other years' partitions are left alone
+        Stage(
+            "model",
+            [python, "model.py", "--year", str(year)],
+            ROOT_DIR,
+            inputs=[
+                "model.py",
+                "data/gold/deputies_enriched_features_parquet",
+                "data/gold/deputy_proposition_overlap_parquet",
+            ],
+            outputs=[f"model/partitions/legislature=*/year={year}/*"],
+        ),
+    ]
+
+
+DEFAULT_STAGES = ["bronze", "silver", "gold", "overlap", "enrich", "model"]
+
+
+def expand(patterns: Sequence[str]) -> List[str]:
+    """Files matched by globs relative to the repository root, as sorted relative paths."""
+    paths = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(ROOT_DIR, pattern)):
+            if os.path.isfile(path):
+                paths.add(os.path.relpath(path, ROOT_DIR))
+    return sorted(paths)
+
+
+def write_json(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FileHasher:
+    """sha256 of files, remembered by (size, mtime) so unchanged files aren't re-read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.known = read_json(path)
+
+    def sha256(self, rel_path: str) -> str:
+        stat = os.stat(os.path.join(ROOT_DIR, rel_path))
+        known = self.known.get(rel_path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = hashlib.sha256()
+        with open(os.path.join(ROOT_DIR, rel_path), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.known[rel_path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def hashes(self, patterns: Sequence[str]) -> Dict[str, str]:
+        return {path: self.sha256(path) for path in expand(patterns)}
+
+    def save(self) -> None:
+        write_json(self.path, self.known)
+
+
+class StageCache:
+    """
+    Content-addressed cache of stage outputs under data/_state/pipeline.
+    A stage's fingerprint covers its command, the content of its input files and
+    the fingerprints of the stages it depends on. Each fingerprint maps to the
+    hashes of the outputs it produced, whose bytes are kept in objects/<sha256>,
+    so outputs of an earlier fingerprint can be restored without rerunning.
+    The database is not copied: a `writes_db` stage is only reused when the
+    database was last built by that same fingerprint.
+    """
+
+    def __init__(self, state_dir: str = STATE_DIR):
+        self.state_dir = state_dir
+        self.hasher = FileHasher(os.path.join(state_dir, "file_hashes.json"))
+        self.db_state_path = os.path.join(state_dir, "db.json")
+        self.db_state = read_json(self.db_state_path) if os.path.exists(DB_PATH) else {}
+
+    def fingerprint(self, stage: Stage, upstream: Dict[str, str]) -> str:
+        key = {
+            "stage": stage.name,
+            "command": [os.path.basename(part) for part in stage.command],
+            "inputs": self.hasher.hashes(stage.inputs),
+            "upstream": {name: upstream.get(name) for name in stage.depends_on},
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _entry_path(self, stage: Stage, fingerprint: str) -> str:
+        return os.path.join(self.state_dir, "stages", stage.name, f"{fingerprint}.json")
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.state_dir, "objects", sha256[:2], sha256)
+
+    def lookup(self, stage: Stage, fingerprint: str) -> Optional[str]:
+        """'cached' if the current outputs are those of this fingerprint, 'restored'
+        if they could be put back from the object store, None if the stage must run."""
+        entry = read_json(self._entry_path(stage, fingerprint))
+        if not entry:
+            return None
+        if stage.writes_db and self.db_state.get(stage.name) != fingerprint:
+            return None
+        outputs = entry["outputs"]
+        if self.hasher.hashes(stage.outputs) == outputs:
+            return "cached"
+        if stage.writes_db or not all(
+            os.path.exists(self._object_path(sha256)) for sha256 in outputs.values()
+        ):
+            return None
+        for path in expand(stage.outputs):
+            os.remove(os.path.join(ROOT_DIR, path))
+        for path, sha256 in outputs.items():
+            target = os.path.join(ROOT_DIR, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(self._object_path(sha256), target)
+        return "restored"
+
+    def store(self, stage: Stage, fingerprint: str, seconds: float) -> None:
+        outputs = self.hasher.hashes(stage.outputs)
+        for path, sha256 in outputs.items():
+            object_path = self._object_path(sha256)
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                shutil.copyfile(os.path.join(ROOT_DIR, path), f"{object_path}.tmp")
+                os.replace(f"{object_path}.tmp", object_path)
+        write_json(
+            self._entry_path(stage, fingerprint),
+            {"outputs": outputs, "seconds": round(seconds, 3), "stored_at": time.time()},
+        )
+        if stage.writes_db:
+            self.db_state[stage.name] = fingerprint
+
+    def save(self) -> None:
+        self.hasher.save()
+        write_json(self.db_state_path, self.db_state)
+
+
+def run_pipeline(
+    stages: Sequence[Stage], selected: Sequence[str], force: bool = False
+) -> Dict:
+    """
+    Run the selected stages in order, skipping those whose outputs are cached for
+    their current fingerprint. A failed stage stops the run; the stages after it
+    are recorded as skipped. Returns the run summary.
+    """
+    cache = StageCache()
+    summary = RunSummary(DATA_DIR)
+    fingerprints: Dict[str, str] = {}
+    failed = False
+    try:
+        for stage in stages:
+            if stage.name not in selected:
+                continue
+            if failed:
+                summary.record(stage.name, "skipped")
+                continue
+
+            start = time.perf_counter()
+            fingerprint = cache.fingerprint(stage, fingerprints)
+            fingerprints[stage.name] = fingerprint
+            status = (
+                cache.lookup(stage, fingerprint)
+                if stage.cacheable and not force
+                else None
+            )
+            if status:
+                logger.info(f"Stage {stage.name} {status} ({fingerprint[:12]})")
+                summary.record(stage.name, status, time.perf_counter() - start)
+                continue
+
+            logger.info(f"Running stage {stage.name} ({fingerprint[:12]})")
+            if stage.clear_outputs:
+                for path in expand(stage.outputs):
+                    os.remove(os.path.join(ROOT_DIR, path))
+            try:
+                subprocess.run(stage.command, cwd=stage.cwd, check=True)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Stage {stage.name} failed: {e}")
+                summary.record(
+                    stage.name, "failed", time.perf_counter() - start, error=str(e)
+                )
+                failed = True
+                continue
+            if stage.cacheable:
+                cache.store(stage, fingerprint, time.perf_counter() - start)
+            summary.record(stage.name, "ran", time.perf_counter() - start)
+    finally:
+        cache.save()
+    return summary.save()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    stages = build_stages(year=2024)
+    parser = argparse.ArgumentParser(
+        description="Run the pipeline end to end, reusing stages whose inputs didn't change."
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=[stage.name for stage in stages],
+        default=DEFAULT_STAGES,
+        help="Stages to run, always in pipeline order (collect and classify hit external APIs)",
+    )
+    parser.add_argument(
+        "--year",
+        type=int,
+        default=2024,
+        help="Year to collect and build; the tables hold one year, the models of earlier runs' years are kept",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Rerun the selected stages even if cached"
+    )
+    args = parser.parse_args()
+
+    summary = run_pipeline(build_stages(args.year), args.stages, force=args.force)
+    if any(task["status"] == "failed" for task in summary["tasks"]):
+        raise SystemExit(1)
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Asyncio token bucket allowing `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available and consume them (FIFO across waiters)."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class ThreadTokenBucket:
+    """Thread-safe token bucket for the requests-based collector (same semantics as TokenBucket)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available and consume them."""
+        with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                time.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class _AIMDLimit:
+    """
+    Additive-increase/multiplicative-decrease concurrency limit.
+    Each success grows the limit by about one slot per limit's worth of requests;
+    a throttled response halves it, at most once per `cooldown` seconds so a
+    burst of 429s from the same window only counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else initial
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+
+    def _grow(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def _shrink(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return False
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self._last_decrease = now
+        return True
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+
+class AdaptiveLimit(_AIMDLimit):
+    """Asyncio adaptive concurrency limit; use `async with limit:` around each request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimit":
+        async with self._condition:
+            await self._condition.wait_for(self._has_room)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def success(self) -> None:
+        async with self._condition:
+            self._grow()
+            self._condition.notify_all()
+
+    async def throttled(self) -> bool:
+        """Back off after a 429; returns True if the limit was lowered."""
+        async with self._condition:
+            return self._shrink()
+
+
+class ThreadAdaptiveLimit(_AIMDLimit):
+    """Thread-safe adaptive concurrency limit; use `with limit:` around each request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> "ThreadAdaptiveLimit":
+        with self._condition:
+            self._condition.wait_for(self._has_room)
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def success(self) -> None:
+        with self._condition:
+            self._grow()
+            self._condition.notify_all()
+
+    def throttled(self) -> bool:
+        """Back off after a 429; returns True if the limit was lowered."""
+        with self._condition:
+            return self._shrink()
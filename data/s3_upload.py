@@ -1,37 +1,231 @@
 import os
-import boto3
+import json
+import time
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+
+LAYERS = ['silver', 'raw', 'bronze', 'gold']
+
+# Files bigger than this go up in parts of this size, several parts at a time
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_CHUNKSIZE,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+    max_concurrency=4,
+)
+
+# What was uploaded where, to find changed files without asking S3
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_state', 's3_manifest.json')
+
+
+def is_data_file(relative_path):
+    """CSVs, Parquet files and the extensionless `*_parquet` exports; not code, SQL or run state."""
+    parts = relative_path.replace(os.sep, '/').split('/')
+    if any(part.startswith(('_', '.')) for part in parts):
+        return False
+    name = parts[-1]
+    return name.endswith('.csv') or name.endswith('.parquet') or name.endswith('_parquet')
+
+
+def local_files(local_base_folder, s3_base_folder, ignore_folders):
+    """S3 key -> local path of every data file in the layers not ignored."""
+    files = {}
+    for folder in LAYERS:
+        local_folder = os.path.join(local_base_folder, folder)
+        if folder in ignore_folders or not os.path.exists(local_folder):
+            continue
+        for root, dirs, names in os.walk(local_folder):
+            for name in names:
+                file_path = os.path.join(root, name)
+                relative_path = os.path.relpath(file_path, local_base_folder)
+                if is_data_file(relative_path):
+                    s3_key = '/'.join(part for part in [s3_base_folder.strip('/'), relative_path.replace(os.sep, '/')] if part)
+                    files[s3_key] = file_path
+    return files
+
+
+def s3_etag(file_path, chunksize=MULTIPART_CHUNKSIZE):
+    """The ETag S3 gives the file when uploaded with TRANSFER_CONFIG: its MD5, or the MD5 of its parts' MD5s."""
+    digests = []
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunksize), b''):
+            digests.append(hashlib.md5(chunk))
+    if os.path.getsize(file_path) < chunksize:
+        return (digests[0] if digests else hashlib.md5()).hexdigest()
+    combined = hashlib.md5(b''.join(d.digest() for d in digests))
+    return f'{combined.hexdigest()}-{len(digests)}'
+
+
+def remote_objects(s3_client, bucket_name, prefix):
+    """S3 key -> ETag of the objects under a prefix."""
+    objects = {}
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            objects[obj['Key']] = obj['ETag'].strip('"')
+    return objects
+
 
-def upload_to_s3(bucket_name, s3_base_folder, ignore_folders=None):
+def load_manifest(target):
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f).get(target, {})
+
+
+def save_manifest(target, entries):
+    manifests = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifests = json.load(f)
+    manifests[target] = entries
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    with open(MANIFEST_PATH + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifests, f, indent=2, sort_keys=True)
+    os.replace(MANIFEST_PATH + '.tmp', MANIFEST_PATH)
+
+
+def upload_to_s3(bucket_name, s3_base_folder, ignore_folders=None, sync=False, compare='manifest',
+                 delete=False, endpoint_url=None, workers=8, dry_run=False):
+    """
+    Upload the data files of every layer to the bucket, in parallel.
+    With `sync`, only files whose ETag differs from the last upload recorded in
+    the manifest (compare='manifest') or from the object in the bucket
+    (compare='etag') are uploaded. `delete` removes objects under the layers that
+    no longer exist locally. Returns the counts, bytes and seconds of the run.
+    """
     if ignore_folders is None:
         ignore_folders = []
 
-    s3_client = boto3.client('s3')
+    start = time.perf_counter()
+    s3_client = boto3.client('s3', endpoint_url=endpoint_url)
     local_base_folder = os.path.dirname(os.path.abspath(__file__))
+    files = local_files(local_base_folder, s3_base_folder, ignore_folders)
+    target = f'{endpoint_url or "aws"}/{bucket_name}'
+    manifest = load_manifest(target)
+
+    # The ETag of a file is only recomputed when its size or mtime changed
+    local_etags = {}
+    for s3_key, file_path in files.items():
+        stat = os.stat(file_path)
+        entry = manifest.get(s3_key, {})
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            local_etags[s3_key] = entry['etag']
+        else:
+            local_etags[s3_key] = s3_etag(file_path)
+
+    remote = {}
+    if compare == 'etag' or delete:
+        prefixes = [
+            '/'.join(part for part in [s3_base_folder.strip('/'), folder] if part) + '/'
+            for folder in LAYERS if folder not in ignore_folders
+        ]
+        for prefix in prefixes:
+            remote.update(remote_objects(s3_client, bucket_name, prefix))
+
+    if not sync:
+        to_upload = sorted(files)
+    elif compare == 'etag':
+        to_upload = sorted(key for key in files if remote.get(key) != local_etags[key])
+    else:
+        to_upload = sorted(key for key in files if manifest.get(key, {}).get('etag') != local_etags[key])
+    orphans = sorted(key for key in remote if key not in files and is_data_file(key)) if delete else []
+
+    # Unchanged files whose mtime moved are recorded so they aren't hashed again
+    for s3_key in set(files) - set(to_upload):
+        stat = os.stat(files[s3_key])
+        manifest[s3_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'etag': local_etags[s3_key]}
+
+    def upload(s3_key):
+        file_path = files[s3_key]
+        stat = os.stat(file_path)
+        s3_client.upload_file(file_path, bucket_name, s3_key, Config=TRANSFER_CONFIG)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'etag': local_etags[s3_key]}
+
+    uploaded_bytes = 0
+    failed = []
+    if dry_run:
+        for s3_key in to_upload:
+            print(f"Would upload {files[s3_key]} to s3://{bucket_name}/{s3_key}")
+        for s3_key in orphans:
+            print(f"Would delete s3://{bucket_name}/{s3_key}")
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upload, s3_key): s3_key for s3_key in to_upload}
+            for future in as_completed(futures):
+                s3_key = futures[future]
+                try:
+                    manifest[s3_key] = future.result()
+                except Exception as e:
+                    failed.append(s3_key)
+                    print(f"Failed to upload {files[s3_key]}: {e}")
+                    continue
+                uploaded_bytes += manifest[s3_key]['size']
+                print(f"Uploaded {files[s3_key]} to s3://{bucket_name}/{s3_key}")
+
+        # delete_objects takes up to 1000 keys per call
+        for i in range(0, len(orphans), 1000):
+            batch = orphans[i:i + 1000]
+            s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            for key in batch:
+                print(f"Deleted s3://{bucket_name}/{key}")
+
+        for s3_key in set(manifest) - set(files):
+            del manifest[s3_key]
+        save_manifest(target, manifest)
+
+    seconds = time.perf_counter() - start
+    report = {
+        'files': len(files),
+        'uploaded': len(to_upload) - len(failed),
+        'unchanged': len(files) - len(to_upload),
+        'failed': len(failed),
+        'deleted': len(orphans) if not dry_run else 0,
+        'uploaded_bytes': uploaded_bytes if not dry_run else 0,
+        'seconds': round(seconds, 2),
+    }
+    print(
+        f"{report['uploaded']} files uploaded ({uploaded_bytes / 1e6:.1f} MB), "
+        f"{report['unchanged']} unchanged, {report['deleted']} deleted, "
+        f"{report['failed']} failed in {seconds:.1f}s"
+    )
+    return report
 
-    def upload_directory(local_folder, s3_folder):
-        for root, dirs, files in os.walk(local_folder):
-            for file in files:
-                if file.endswith('.csv') or 'parquet' in file:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, local_base_folder)
-                    s3_key = os.path.join(s3_folder, relative_path).replace("\\", "/")
-                    s3_client.upload_file(file_path, bucket_name, s3_key)
-                    print(f"Uploaded {file_path} to s3://{bucket_name}/{s3_key}")
-
-    for folder in ['silver', 'raw', 'bronze', 'gold']:
-        if folder not in ignore_folders:
-            local_folder = os.path.join(local_base_folder, folder)
-            if os.path.exists(local_folder):
-                upload_directory(local_folder, s3_base_folder)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Upload files to S3.')
     parser.add_argument('--ignore', nargs='*', default=[], help='Folders to ignore')
+    parser.add_argument('--bucket', default='proj-deputados-fiap')
+    parser.add_argument('--prefix', default='', help='Folder inside the bucket')
+    parser.add_argument('--sync', action='store_true', help='Upload only the files that changed')
+    parser.add_argument(
+        '--compare',
+        choices=['manifest', 'etag'],
+        default='manifest',
+        help='Compare with the manifest of the last upload (no S3 calls) or with the ETags in the bucket',
+    )
+    parser.add_argument('--delete', action='store_true', help='Delete remote files that no longer exist locally')
+    parser.add_argument('--endpoint-url', help='S3-compatible endpoint, e.g. a local MinIO or moto server')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--dry-run', action='store_true', help='List what would be uploaded and deleted')
     args = parser.parse_args()
 
-    bucket_name = "proj-deputados-fiap"
-    s3_base_folder = ""
-    ignore_folders = args.ignore
-
-    upload_to_s3(bucket_name, s3_base_folder, ignore_folders)
\ No newline at end of file
+    report = upload_to_s3(
+        args.bucket,
+        args.prefix,
+        args.ignore,
+        sync=args.sync,
+        compare=args.compare,
+        delete=args.delete,
+        endpoint_url=args.endpoint_url,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    if report['failed']:
+        raise SystemExit(1)
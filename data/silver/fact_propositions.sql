@@ -0,0 +1,54 @@
+-- config: fts_id=proposition_id, fts_text=ementa
+-- One row per proposition, searchable through a full-text index over the ementa.
+-- The collector stores each deputy's ementas as a Python list literal: DuckDB's
+-- list cast splits it on the right commas but keeps each item's quotes.
+WITH ementas AS (
+    SELECT
+        deputy_id,
+        CAST(ementas AS VARCHAR[]) AS quoted_ementas
+    FROM deputies_db.bronze.fact_propositions
+),
+
+propositions AS (
+    SELECT
+        e.deputy_id,
+        r.ementa_index,
+        trim(e.quoted_ementas[r.ementa_index]) AS quoted_ementa
+    FROM ementas AS e,
+        range(1, len(e.quoted_ementas) + 1) AS r(ementa_index)
+),
+
+unquoted AS (
+    SELECT
+        deputy_id,
+        ementa_index,
+        replace(replace(
+            CASE
+                WHEN left(quoted_ementa, 1) IN ('''', '"') THEN quoted_ementa[2:-2]
+                ELSE quoted_ementa
+            END,
+            '\''', ''''), '\\', '\') AS ementa
+    FROM propositions
+    WHERE quoted_ementa <> ''
+),
+
+-- The collector keeps no Câmara id, so the key hashes what identifies a proposition:
+-- its deputy, its ementa and which repetition of that ementa it is for the deputy.
+-- It doesn't move when other propositions are added or removed.
+keyed AS (
+    SELECT
+        *,
+        row_number() OVER (PARTITION BY deputy_id, ementa ORDER BY ementa_index) AS repetition
+    FROM unquoted
+)
+
+SELECT
+    CAST(md5_number_lower(concat_ws('|', k.deputy_id, k.repetition, k.ementa)) >> 1 AS BIGINT) AS proposition_id,
+    k.deputy_id,
+    deps.name,
+    deps.party,
+    k.ementa_index,
+    k.ementa
+FROM keyed AS k
+LEFT JOIN deputies_db.bronze.dim_deputies AS deps ON k.deputy_id = deps.deputy_id
+ORDER BY k.deputy_id, k.ementa_index;
@@ -1,32 +1,13 @@
 import os
-import duckdb
+import sys
+import logging
 
-# Create a DuckDB connection to the deputies_db
-con = duckdb.connect('../deputies_db.db')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sql_models import discover_models, run_models
 
-# Create the silver schema if it doesn't exist
-con.execute("CREATE SCHEMA IF NOT EXISTS silver;")
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Iterate over the .sql files in the current folder
-for sql_file in os.listdir('.'):
-    if sql_file.endswith('.sql'):
-        table_name = sql_file.replace('.sql', '')
-        
-        # Read the SQL query from the file
-        with open(sql_file, 'r') as open_file:
-            query = open_file.read()
-        
-        # Execute the query on the bronze schema
-        result_df = con.execute(query).fetchdf()
-        
-        # Save the result to the silver schema
-        con.execute(f"CREATE OR REPLACE TABLE silver.{table_name} AS SELECT * FROM result_df;")
-        print(f"File {sql_file} processed and saved the result to table silver.{table_name}")
-        
-        # Export the result to a Parquet file partitioned by party
-        parquet_path = f"{table_name}_parquet"
-        con.execute(f"COPY (SELECT * FROM silver.{table_name}) TO '{parquet_path}' (FORMAT PARQUET);")
-        print(f"Exported table silver.{table_name} to Parquet files partitioned by party at {parquet_path}")
-
-# Close the DuckDB connection
-con.close()
\ No newline at end of file
+if __name__ == '__main__':
+    # Build every .sql file in the current folder as a table in the silver schema,
+    # directly inside DuckDB and in dependency order, then export it to Parquet
+    run_models('../deputies_db.db', discover_models('.', 'silver'))
@@ -0,0 +1,453 @@
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote
+
+import duckdb
+
+from orchestrator import CollectionTask, RunSummary, run_tasks
+
+logger = logging.getLogger(__name__)
+
+# Tables referenced as deputies_db.<schema>.<table> or <schema>.<table>
+TABLE_REF_RE = re.compile(r"\b(?:deputies_db\.)?(bronze|silver|gold)\.(\w+)\b", re.IGNORECASE)
+LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+
+# Per-model overrides, as a comment line: `-- config: incremental=false, partition_by=none`
+CONFIG_RE = re.compile(r"^--\s*config:\s*(.+)$", re.MULTILINE)
+
+# Column each layer's Parquet export is partitioned by (None: a single file)
+LAYER_PARTITIONS = {"silver": None, "gold": "party"}
+
+# Full-text index settings for models configured with `fts_id` and `fts_text` (ementas are Portuguese)
+FTS_OPTIONS = "stemmer = 'portuguese', stopwords = 'none', strip_accents = 1, lower = 1"
+
+# Layers whose models can be refreshed per deputy, and the key they are refreshed by
+INCREMENTAL_KEYS = {"gold": "deputy_id"}
+
+
+class SqlModel:
+    """
+    One `<schema>/<table>.sql` file materialized as the table `<schema>.<table>`.
+    Relative file paths in the query (read_parquet, read_json...) are resolved
+    against the folder of the .sql file. The Parquet export goes next to the
+    .sql file, or to `export_dir` when given.
+    """
+
+    def __init__(self, schema: str, path: str, export_dir: Optional[str] = None):
+        self.schema = schema
+        self.path = path
+        self.export_dir = export_dir
+        self.table = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as f:
+            self.sql = f.read()
+        self.config = {
+            key.strip(): value.strip()
+            for line in CONFIG_RE.findall(self.sql)
+            for key, _, value in (item.partition("=") for item in line.split(","))
+        }
+
+    @property
+    def partition_by(self) -> Optional[str]:
+        """Column the Parquet export is partitioned by: the model's config, else its layer's."""
+        value = self.config.get("partition_by", LAYER_PARTITIONS.get(self.schema))
+        return None if value in (None, "none") else value
+
+    @property
+    def incremental(self) -> bool:
+        """Models whose rows depend on other keys' rows opt out with `incremental=false`."""
+        return self.config.get("incremental", "true") != "false"
+
+    @property
+    def name(self) -> str:
+        return f"{self.schema}.{self.table}"
+
+    def references(self) -> Set[str]:
+        """Every bronze/silver/gold table the query reads, as `schema.table`."""
+        sql = LINE_COMMENT_RE.sub("", self.sql)
+        return {
+            f"{schema.lower()}.{table}"
+            for schema, table in TABLE_REF_RE.findall(sql)
+            if f"{schema.lower()}.{table}" != self.name
+        }
+
+    def create_sql(self) -> str:
+        query = self.sql.strip().rstrip(";")
+        return f"CREATE OR REPLACE TABLE {self.name} AS\n{query}"
+
+    @property
+    def parquet_path(self) -> str:
+        return os.path.join(self.export_dir or os.path.dirname(self.path), f"{self.table}_parquet")
+
+
+def export_parquet(con: duckdb.DuckDBPyConnection, model: SqlModel) -> None:
+    """Export a built model to its parquet_path, partitioned as its config or layer requires."""
+    partition_by = model.partition_by
+    if partition_by:
+        options = f"FORMAT PARQUET, PARTITION_BY {partition_by}, OVERWRITE"
+    else:
+        options = "FORMAT PARQUET"
+    con.execute(f"COPY (SELECT * FROM {model.name}) TO '{model.parquet_path}' ({options});")
+    logger.info(f"Exported table {model.name} to {model.parquet_path}")
+
+
+def load_fts(con: duckdb.DuckDBPyConnection) -> None:
+    """Load the fts extension, downloading it only if it isn't installed yet."""
+    try:
+        con.execute("LOAD fts;")
+    except duckdb.Error:
+        con.execute("INSTALL fts; LOAD fts;")
+
+
+def create_fts_index(con: duckdb.DuckDBPyConnection, model: SqlModel) -> bool:
+    """
+    (Re)build the full-text index of a model over its `fts_text` column, keyed by
+    `fts_id`; the index is a snapshot and doesn't follow changes to the table.
+    BM25 search is then `fts_<schema>_<table>.match_bm25(<fts_id>, 'query')`.
+    Returns False, without failing the build, when the fts extension can't be loaded.
+    """
+    try:
+        load_fts(con)
+    except duckdb.Error as e:
+        logger.warning(f"Skipping full-text index of {model.name}: {e}")
+        return False
+    con.execute(
+        f"PRAGMA create_fts_index({sql_literal(model.name)}, "
+        f"{sql_literal(model.config['fts_id'])}, {sql_literal(model.config['fts_text'])}, "
+        f"{FTS_OPTIONS}, overwrite = 1);"
+    )
+    logger.info(f"Indexed {model.name}.{model.config['fts_text']} for full-text search")
+    return True
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def table_columns(con: duckdb.DuckDBPyConnection, name: str) -> List[str]:
+    schema, table = name.split(".")
+    return [
+        row[0]
+        for row in con.execute(
+            "SELECT column_name FROM information_schema.columns "
+            f"WHERE table_schema = {sql_literal(schema)} AND table_name = {sql_literal(table)}"
+        ).fetchall()
+    ]
+
+
+def source_fingerprints(
+    con: duckdb.DuckDBPyConnection, model: SqlModel, key: str
+) -> Tuple[str, str]:
+    """
+    How to tell what changed in a model's inputs since its last build.
+    Sources with a `key` column get a per-key fingerprint (sum of row hashes and
+    row count per source); returns that query and one fingerprint covering the
+    sources without the key, whose changes can't be attributed to any deputy.
+    """
+    keyed, unkeyed = [], []
+    for ref in sorted(model.references()):
+        if key in table_columns(con, ref):
+            keyed.append(
+                f"SELECT {key}, '{ref}' AS source, SUM(hash(t))::HUGEINT AS row_hash, "
+                f"COUNT(*) AS row_count FROM {ref} AS t GROUP BY {key}"
+            )
+        else:
+            row_hash, row_count = con.execute(
+                f"SELECT SUM(hash(t))::HUGEINT, COUNT(*) FROM {ref} AS t"
+            ).fetchone()
+            unkeyed.append(f"{ref}:{row_hash}:{row_count}")
+    keyed_sql = (
+        f"SELECT {key}, md5(string_agg(source || ':' || row_hash || ':' || row_count, ',' "
+        f"ORDER BY source)) AS fingerprint FROM ({' UNION ALL '.join(keyed)}) GROUP BY {key}"
+    )
+    return keyed_sql, hashlib.sha256(",".join(unkeyed).encode()).hexdigest()
+
+
+def build_incremental(
+    con: duckdb.DuckDBPyConnection, model: SqlModel, key: str
+) -> Tuple[int, Optional[Set]]:
+    """
+    Refresh only the rows of a model whose inputs changed since its last build.
+    Input fingerprints per `key` are kept in <schema>._key_fingerprints; the keys
+    whose fingerprint changed (or appeared/disappeared) are deleted from the table
+    and re-inserted from the model query filtered to those keys, in one transaction.
+    A changed query, a change in an input without the key, or a missing table
+    triggers a full rebuild.
+    Returns (changed rows, affected partition values, or None when everything was rebuilt).
+    """
+    state = f"{model.schema}._incremental_state"
+    fingerprints = f"{model.schema}._key_fingerprints"
+    name = sql_literal(model.name)
+    partition_by = model.partition_by
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {state} (model VARCHAR PRIMARY KEY, "
+        "sql_sha256 VARCHAR, unkeyed_fingerprint VARCHAR, built_at TIMESTAMP);"
+    )
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {fingerprints} "
+        f"(model VARCHAR, {key} BIGINT, fingerprint VARCHAR);"
+    )
+
+    keyed_sql, unkeyed = source_fingerprints(con, model, key)
+    sql_sha256 = hashlib.sha256(model.sql.encode()).hexdigest()
+    previous = con.execute(
+        f"SELECT sql_sha256, unkeyed_fingerprint FROM {state} WHERE model = {name}"
+    ).fetchone()
+    full = previous != (sql_sha256, unkeyed) or not table_columns(con, model.name)
+
+    con.execute("BEGIN TRANSACTION;")
+    try:
+        con.execute(
+            f"CREATE OR REPLACE TEMP TABLE current_fingerprints AS {keyed_sql};"
+        )
+        if full:
+            con.execute(model.create_sql())
+            con.execute(f"DELETE FROM {fingerprints} WHERE model = {name};")
+            con.execute(
+                f"INSERT INTO {fingerprints} SELECT {name}, {key}, fingerprint "
+                "FROM current_fingerprints;"
+            )
+            changed = con.execute(f"SELECT COUNT(*) FROM {model.name}").fetchone()[0]
+            partitions = None
+        else:
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE changed_keys AS
+                SELECT COALESCE(c.{key}, p.{key}) AS {key}
+                FROM current_fingerprints AS c
+                FULL OUTER JOIN (
+                    SELECT {key}, fingerprint FROM {fingerprints} WHERE model = {name}
+                ) AS p ON c.{key} = p.{key}
+                WHERE c.fingerprint IS DISTINCT FROM p.fingerprint;
+            """)
+            changed_filter = f"{key} IN (SELECT {key} FROM changed_keys)"
+            partitions = set()
+            if partition_by:
+                # Partitions the changed rows leave...
+                partitions.update(
+                    row[0]
+                    for row in con.execute(
+                        f"SELECT DISTINCT {partition_by} FROM {model.name} "
+                        f"WHERE {changed_filter}"
+                    ).fetchall()
+                )
+            con.execute(f"DELETE FROM {model.name} WHERE {changed_filter};")
+            query = model.sql.strip().rstrip(";")
+            con.execute(
+                f"INSERT INTO {model.name} BY NAME "
+                f"SELECT * FROM (\n{query}\n) WHERE {changed_filter};"
+            )
+            changed = con.execute(
+                f"SELECT COUNT(*) FROM {model.name} WHERE {changed_filter}"
+            ).fetchone()[0]
+            if partition_by:
+                # ...and the partitions they land in
+                partitions.update(
+                    row[0]
+                    for row in con.execute(
+                        f"SELECT DISTINCT {partition_by} FROM {model.name} "
+                        f"WHERE {changed_filter}"
+                    ).fetchall()
+                )
+            con.execute(
+                f"DELETE FROM {fingerprints} WHERE model = {name} AND {changed_filter};"
+            )
+            con.execute(
+                f"INSERT INTO {fingerprints} SELECT {name}, {key}, fingerprint "
+                f"FROM current_fingerprints WHERE {changed_filter};"
+            )
+        con.execute(
+            f"INSERT OR REPLACE INTO {state} VALUES "
+            f"({name}, {sql_literal(sql_sha256)}, {sql_literal(unkeyed)}, now());"
+        )
+        con.execute("COMMIT;")
+    except Exception:
+        con.execute("ROLLBACK;")
+        raise
+    return changed, partitions
+
+
+def export_partitions(
+    con: duckdb.DuckDBPyConnection, model: SqlModel, partitions: Set
+) -> None:
+    """
+    Rewrite only some partitions of a model's partitioned Parquet export.
+    The partitions are written to a scratch folder and then swapped in one by one;
+    a partition with no rows left is removed.
+    """
+    partition_by = model.partition_by
+    root, scratch = model.parquet_path, f"{model.parquet_path}.tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    values = ", ".join(sql_literal(value) for value in partitions if value is not None)
+    conditions = [f"{partition_by} IN ({values})"] if values else []
+    if None in partitions:
+        conditions.append(f"{partition_by} IS NULL")
+    con.execute(
+        f"COPY (SELECT * FROM {model.name} WHERE {' OR '.join(conditions)}) "
+        f"TO '{scratch}' (FORMAT PARQUET, PARTITION_BY {partition_by});"
+    )
+
+    def folders(path: str) -> Dict[str, str]:
+        """Partition folders by decoded value (DuckDB URL-encodes the names)."""
+        if not os.path.isdir(path):
+            return {}
+        return {
+            unquote(folder.split("=", 1)[1]): folder
+            for folder in os.listdir(path)
+            if folder.startswith(f"{partition_by}=")
+        }
+
+    existing, written = folders(root), folders(scratch)
+    os.makedirs(root, exist_ok=True)
+    for value in partitions:
+        value = "NULL" if value is None else str(value)
+        if value in existing:
+            shutil.rmtree(os.path.join(root, existing[value]))
+        if value in written:
+            os.replace(
+                os.path.join(scratch, written[value]), os.path.join(root, written[value])
+            )
+    shutil.rmtree(scratch, ignore_errors=True)
+    logger.info(
+        f"Rewrote {len(partitions)} partitions of {model.parquet_path}: "
+        + ", ".join(sorted("NULL" if v is None else str(v) for v in partitions))
+    )
+
+
+def discover_models(directory: str, schema: str) -> List[SqlModel]:
+    """The models of one layer: every .sql file in its folder, in name order."""
+    return [
+        SqlModel(schema, path)
+        for path in sorted(glob.glob(os.path.join(directory, "*.sql")))
+    ]
+
+
+def model_dependencies(models: Sequence[SqlModel]) -> Dict[str, List[str]]:
+    """For each model, the other models it reads; references to anything else are sources."""
+    names = {model.name for model in models}
+    return {
+        model.name: sorted(ref for ref in model.references() if ref in names)
+        for model in models
+    }
+
+
+def run_models(
+    db_path: str,
+    models: Sequence[SqlModel],
+    max_workers: int = 4,
+    export: bool = True,
+    incremental: bool = False,
+) -> Dict[str, int]:
+    """
+    Materialize the models inside DuckDB (CREATE OR REPLACE TABLE ... AS <query>),
+    in dependency order, running models that don't depend on each other side by side.
+    Each built model is exported to Parquet unless `export` is False.
+    With `incremental`, models of layers in INCREMENTAL_KEYS only refresh the rows
+    (and Parquet partitions) of the keys whose inputs changed since the last run.
+    Returns the row count of each built model; raises if any model failed.
+    """
+    dependencies = model_dependencies(models)
+    con = duckdb.connect(db_path)
+    for schema in sorted({model.schema for model in models}):
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema};")
+
+    def build(model: SqlModel) -> Callable[..., int]:
+        def run(**upstream) -> int:
+            cursor = con.cursor()
+            try:
+                start = time.perf_counter()
+                model_dir = os.path.dirname(os.path.abspath(model.path))
+                cursor.execute(f"SET file_search_path = {sql_literal(model_dir)};")
+                key = (
+                    INCREMENTAL_KEYS.get(model.schema)
+                    if incremental and model.incremental
+                    else None
+                )
+                if key:
+                    rows, partitions = build_incremental(cursor, model, key)
+                    logger.info(
+                        f"Refreshed {model.name} from {os.path.basename(model.path)}: "
+                        f"{rows} rows {'rebuilt' if partitions is None else 'changed'} "
+                        f"in {time.perf_counter() - start:.2f}s"
+                    )
+                else:
+                    cursor.execute(model.create_sql())
+                    rows = cursor.execute(f"SELECT COUNT(*) FROM {model.name}").fetchone()[0]
+                    partitions = None
+                    logger.info(
+                        f"Built {model.name} from {os.path.basename(model.path)}: "
+                        f"{rows} rows in {time.perf_counter() - start:.2f}s"
+                    )
+                if export and partitions is None:
+                    export_parquet(cursor, model)
+                elif export and partitions:
+                    export_partitions(cursor, model, partitions)
+                if "fts_id" in model.config and partitions != set():
+                    create_fts_index(cursor, model)
+                return rows
+            finally:
+                cursor.close()
+
+        return run
+
+    for model in models:
+        sources = sorted(model.references() - set(dependencies[model.name]))
+        logger.info(
+            f"{model.name} depends on models {dependencies[model.name] or '-'}, "
+            f"sources {sources or '-'}"
+        )
+    tasks = [
+        CollectionTask(model.name, build(model), dependencies[model.name])
+        for model in models
+    ]
+    summary = RunSummary(os.path.dirname(os.path.abspath(db_path)))
+    try:
+        results = run_tasks(tasks, summary, max_workers)
+    finally:
+        con.close()
+
+    failed = [model.name for model in models if model.name not in results]
+    if failed:
+        raise RuntimeError(f"SQL models failed or were skipped: {failed}")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(
+        description="Build the silver and gold SQL models inside DuckDB."
+    )
+    parser.add_argument(
+        "--layers", nargs="+", choices=list(LAYER_PARTITIONS), default=list(LAYER_PARTITIONS)
+    )
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--no-export", action="store_true")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Refresh gold rows and partitions only for deputies whose inputs changed",
+    )
+    args = parser.parse_args()
+
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    models = [
+        model
+        for layer in args.layers
+        for model in discover_models(os.path.join(data_dir, layer), layer)
+    ]
+    run_models(
+        os.path.join(data_dir, "deputies_db.db"),
+        models,
+        args.max_workers,
+        export=not args.no_export,
+        incremental=args.incremental,
+    )
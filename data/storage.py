@@ -0,0 +1,74 @@
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import fsspec
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKET_URL = "s3://proj-deputados-fiap"
+
+# Copies of the remote files already read, shared by every run on this machine
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".storage_cache")
+
+
+class Storage:
+    """
+    Files under a root URL on any fsspec filesystem: a local folder, an
+    s3://bucket[/prefix] or, with `endpoint_url`, an S3-compatible server
+    (MinIO, moto) standing in for it.
+    Remote reads go through an on-disk cache of the files read so far, so a rerun
+    only downloads files that changed upstream; local roots are read directly.
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_BUCKET_URL,
+        endpoint_url: Optional[str] = None,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        storage_options: Optional[Dict] = None,
+    ):
+        options = dict(storage_options or {})
+        if endpoint_url:
+            options.setdefault("client_kwargs", {})["endpoint_url"] = endpoint_url
+        self.fs, self.root = fsspec.core.url_to_fs(root, **options)
+        self.root = self.root.rstrip("/")
+        self.protocol = fsspec.core.split_protocol(root)[0] or "file"
+        if self.protocol != "file" and cache_dir:
+            # A cached file whose ETag or modification time changed upstream is fetched again
+            self.fs = fsspec.filesystem(
+                "filecache",
+                target_protocol=self.protocol,
+                target_options=options,
+                cache_storage=cache_dir,
+                check_files=True,
+            )
+
+    def path(self, relative_path: str) -> str:
+        return f"{self.root}/{relative_path.lstrip('/')}"
+
+    def read_parquet(
+        self,
+        relative_path: str,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[List[Tuple]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read a Parquet file or hive-partitioned dataset (`party=.../*.parquet`).
+        `filters` (in pyarrow's [(column, op, value), ...] form) on partition
+        columns skip whole partitions before any file is opened or downloaded,
+        and only the `columns` asked for are decoded from the files that remain.
+        """
+        dataset = ds.dataset(
+            self.path(relative_path), filesystem=self.fs, format="parquet", partitioning="hive"
+        )
+        expression = pq.filters_to_expression(filters) if filters else None
+        fragments = list(dataset.get_fragments(filter=expression))
+        logger.info(
+            f"Reading {len(fragments)} of {len(dataset.files)} files of {relative_path}"
+            + (f" ({len(columns)} columns)" if columns else "")
+        )
+        return dataset.to_table(columns=list(columns) if columns else None, filter=expression).to_pandas()
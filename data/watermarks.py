@@ -0,0 +1,177 @@
+import ast
+import glob
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class WatermarkStore:
+    """
+    Per-deputy, per-endpoint collection watermarks persisted as JSON.
+    Expenses keep the last `dataDocumento` seen; propositions keep the last
+    proposition id and the date the deputy was last collected.
+    """
+
+    def __init__(self, output_dir: str, year: int):
+        self.year = year
+        self.path = os.path.join(output_dir, "_state", "watermarks.json")
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        except (OSError, ValueError):
+            self._state = {}
+
+    def _key(self, endpoint: str, deputy_id: int) -> str:
+        return f"{endpoint}:{self.year}:{int(deputy_id)}"
+
+    def get(self, endpoint: str, deputy_id: int) -> Optional[Dict]:
+        with self._lock:
+            return self._state.get(self._key(endpoint, deputy_id))
+
+    def set(self, endpoint: str, deputy_id: int, value: Dict) -> None:
+        with self._lock:
+            self._state[self._key(endpoint, deputy_id)] = value
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        logger.info(f"Saved collection watermarks to {self.path}")
+
+    def expense_months(self, deputy_id: int) -> Optional[List[int]]:
+        """Months of `year` to refetch for a deputy, or None for the whole year."""
+        watermark = self.get("expenses", deputy_id)
+        if not watermark:
+            return None
+        last_date = date.fromisoformat(watermark["last_document_date"][:10])
+        if last_date.year != self.year:
+            return None
+        # Refetch the watermark month too: documents are often filed late
+        return list(range(last_date.month, 13))
+
+    def record_expenses(self, deputy_id: int, expenses_fact: pd.DataFrame) -> None:
+        if expenses_fact.empty:
+            return
+        last_date = pd.to_datetime(expenses_fact["dataDocumento"]).max()
+        if pd.isna(last_date):
+            return
+        previous = self.get("expenses", deputy_id)
+        if previous and previous["last_document_date"] >= last_date.isoformat():
+            return
+        self.set("expenses", deputy_id, {"last_document_date": last_date.isoformat()})
+
+    def reset_expenses(self, deputy_id: int) -> None:
+        """
+        Forget a deputy's expense watermark after a fetch that came back short, so the
+        next incremental run refetches the whole year instead of only the later months.
+        """
+        with self._lock:
+            self._state.pop(self._key("expenses", deputy_id), None)
+
+    def proposition_cursor(self, deputy_id: int) -> Tuple[Optional[str], int]:
+        """(dataApresentacaoInicio, last proposition id) to resume a deputy from."""
+        watermark = self.get("propositions", deputy_id)
+        if not watermark:
+            return None, 0
+        return watermark["collected_on"], int(watermark["last_id"])
+
+    def record_propositions(self, deputy_id: int, last_id: int) -> None:
+        self.set(
+            "propositions",
+            deputy_id,
+            {"last_id": int(last_id), "collected_on": date.today().isoformat()},
+        )
+
+
+def latest_output_file(output_dir: str, prefix: str, year: int) -> Optional[str]:
+    """Most recent `{prefix}_{year}_YYYYMMDD.csv` in the output folder, if any."""
+    files = sorted(glob.glob(os.path.join(output_dir, f"{prefix}_{year}_*.csv")))
+    return files[-1] if files else None
+
+
+def write_rolling_snapshot(
+    df: pd.DataFrame, output_dir: str, prefix: str, year: int
+) -> str:
+    """
+    Write today's snapshot and drop the one it supersedes, so bronze ingestion
+    (which loads every file matching the prefix) never sees both.
+    """
+    previous = latest_output_file(output_dir, prefix, year)
+    timestamp = datetime.now().strftime("%Y%m%d")
+    file_path = os.path.join(output_dir, f"{prefix}_{year}_{timestamp}.csv")
+    tmp_path = f"{file_path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, file_path)
+    if previous and os.path.abspath(previous) != os.path.abspath(file_path):
+        os.remove(previous)
+        logger.info(f"Replaced snapshot {previous}")
+    return file_path
+
+
+def merge_expenses(
+    existing: pd.DataFrame,
+    fresh: pd.DataFrame,
+    refreshed: Dict[int, Optional[List[int]]],
+    year: int,
+) -> pd.DataFrame:
+    """
+    Replace the refetched (deputy, month) slices of `existing` with `fresh` rows.
+    `refreshed` maps each refetched deputy to its months, or None for the whole year.
+    """
+    if existing.empty:
+        return fresh
+    stale = pd.Series(False, index=existing.index)
+    for deputy_id, months in refreshed.items():
+        mask = (existing["deputy_id"] == deputy_id) & (existing["ano"] == year)
+        if months is not None:
+            mask &= existing["mes"].isin(months)
+        stale |= mask
+    kept = existing[~stale]
+    return pd.concat([kept, fresh], ignore_index=True) if not fresh.empty else kept
+
+
+def _as_list(ementas) -> List[str]:
+    """Ementas come back as a list repr from CSV and as an array from Parquet."""
+    if isinstance(ementas, list):
+        return ementas
+    if hasattr(ementas, "tolist"):
+        return list(ementas.tolist())
+    if isinstance(ementas, str) and ementas.startswith("["):
+        return ast.literal_eval(ementas)
+    return []
+
+
+def merge_propositions(
+    existing: pd.DataFrame, fresh: pd.DataFrame, appended: List[int]
+) -> pd.DataFrame:
+    """
+    Merge newly collected propositions into the existing per-deputy rows.
+    Deputies in `appended` were fetched after their watermark, so their new
+    ementas and counts are added; everyone else in `fresh` replaces their row.
+    """
+    if existing.empty:
+        return fresh
+    rows = {
+        row["deputy_id"]: {**row, "ementas": _as_list(row["ementas"])}
+        for row in existing.to_dict("records")
+    }
+    appended_ids = set(appended)
+    for row in fresh.to_dict("records"):
+        current = rows.get(row["deputy_id"])
+        if row["deputy_id"] in appended_ids and current is not None:
+            current["proposition_count"] += row["proposition_count"]
+            current["ementas"] = current["ementas"] + row["ementas"]
+        else:
+            rows[row["deputy_id"]] = row
+    return pd.DataFrame(list(rows.values()), columns=existing.columns)
@@ -8,12 +8,31 @@ from sklearn.metrics.pairwise import cosine_similarity
 import scipy.sparse
 import joblib
 import os
+import shutil
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+FEATURES_PATH = 'data/gold/deputies_enriched_features_parquet'
+
+# Deputy pairs with shared or near-duplicate propositions (utils/proposition_overlap.py)
+OVERLAP_PATH = 'data/gold/deputy_proposition_overlap_parquet'
+
+# Share of the similarity given to the proposition overlap, for pairs sharing at least
+# MIN_SHARED_PROPOSITIONS (with fewer, the overlap of a deputy with one proposition is 0 or 1)
+OVERLAP_WEIGHT = 0.2
+MIN_SHARED_PROPOSITIONS = 3
+
+# One folder per period: model/partitions/legislature=57/year=2024
+PARTITIONS_PATH = 'model/partitions'
 
 class DeputyRecommender:
-    def __init__(self, data_path, model_path='model'):
+    def __init__(self, data_path, model_path='model', overlap_path=None):
         self.data_path = data_path
         self.model_path = model_path
-        self.df = pd.read_csv(data_path)
+        self.df = pd.read_parquet(data_path)
+        self.overlap = self._load_overlap(overlap_path)
         self._clean_data()
         self._prepare_features()
         self.preprocessor = self._create_preprocessor()
@@ -26,9 +45,8 @@ class DeputyRecommender:
             self._save_model()
 
     def _clean_data(self):
-        # Adjust some columns with inf numbers 
-        self.df.replace([np.inf, -np.inf], np.nan, inplace=True)
-        
+        # Ratios with a zero denominator already come as nulls from the gold layer
+
         # Separate numeric and non-numeric columns
         numeric_cols = self.df.select_dtypes(include=[np.number]).columns
         non_numeric_cols = self.df.select_dtypes(exclude=[np.number]).columns
@@ -105,7 +123,9 @@ class DeputyRecommender:
         return np.array(weights)
 
     def _preprocess_data(self):
-        processed = self.preprocessor.fit_transform(self.df)
+        return self._weighted(self.preprocessor.fit_transform(self.df))
+
+    def _weighted(self, processed):
         feature_names = self.preprocessor.get_feature_names_out()
         weights = self._calculate_feature_weights(feature_names)
         
@@ -116,8 +136,51 @@ class DeputyRecommender:
         
         return processed
 
+    def _fitted_preprocessor(self):
+        # A loaded model only keeps the transformed data: refitting on the same frame gives the same encoding
+        if not hasattr(self.preprocessor, 'transformers_'):
+            self.preprocessor.fit(self.df)
+        return self.preprocessor
+
+    def _load_overlap(self, overlap_path):
+        if overlap_path is None or not os.path.exists(overlap_path):
+            return None
+        overlap = pd.read_parquet(overlap_path)
+        deputy_ids = set(self.df['deputy_id'])
+        return overlap[overlap['deputy_id_a'].isin(deputy_ids) & overlap['deputy_id_b'].isin(deputy_ids)]
+
     def _compute_similarity(self):
-        return cosine_similarity(self.processed_data)
+        similarity = cosine_similarity(self.processed_data)
+        if self.overlap is None:
+            return similarity
+
+        # Blended in place: a second N x N matrix is what breaks first at scale
+        pairs = self.overlap[self.overlap['shared_propositions'] >= MIN_SHARED_PROPOSITIONS]
+        position = pd.Series(np.arange(len(self.df)), index=self.df['deputy_id'])
+        a = position.loc[pairs['deputy_id_a']].to_numpy()
+        b = position.loc[pairs['deputy_id_b']].to_numpy()
+        similarity *= 1 - OVERLAP_WEIGHT
+        similarity[a, b] += OVERLAP_WEIGHT * pairs['overlap'].to_numpy()
+        similarity[b, a] += OVERLAP_WEIGHT * pairs['overlap'].to_numpy()
+        similarity[np.diag_indices_from(similarity)] += OVERLAP_WEIGHT
+        return similarity
+
+    def _overlap_row(self, deputy_id):
+        """The proposition overlap of `deputy_id` with each deputy of this model, as blended into the similarity."""
+        row = np.zeros(len(self.df))
+        pairs = self.overlap[self.overlap['shared_propositions'] >= MIN_SHARED_PROPOSITIONS]
+        position = pd.Series(np.arange(len(self.df)), index=self.df['deputy_id'])
+        for own, other in (('deputy_id_a', 'deputy_id_b'), ('deputy_id_b', 'deputy_id_a')):
+            matched = pairs[pairs[own] == deputy_id]
+            row[position.loc[matched[other]].to_numpy()] = matched['overlap'].to_numpy()
+        return row
+
+    def _shared_propositions(self, deputy_id, other_id):
+        if self.overlap is None:
+            return 0
+        if not hasattr(self, '_shared'):
+            self._shared = self.overlap.set_index(['deputy_id_a', 'deputy_id_b'])['shared_propositions']
+        return int(self._shared.get(tuple(sorted([deputy_id, other_id])), 0))
 
     def _model_exists(self):
         return os.path.exists(f'{self.model_path}/data.pkl') and os.path.exists(f'{self.model_path}/similarity.pkl')
@@ -190,6 +253,38 @@ class DeputyRecommender:
             'similar_deputies': results[:top_n]
         }
 
+    def recommend_for_features(self, deputy, top_n=5):
+        """
+        Deputies of this model most similar to `deputy`, a one-row frame of features
+        that may come from another period; the same deputy_id is left out. Scores are
+        blended like the model's own similarity, with this model's proposition
+        overlap of the same deputy_id (none if they weren't in this period).
+        """
+        features = self._weighted(self._fitted_preprocessor().transform(deputy))
+        scores = cosine_similarity(features, self.processed_data)[0]
+        source = deputy.iloc[0]
+        if self.overlap is not None:
+            scores = (1 - OVERLAP_WEIGHT) * scores + OVERLAP_WEIGHT * self._overlap_row(source['deputy_id'])
+
+        results = []
+        for idx in np.argsort(-scores, kind='stable'):
+            if len(results) >= top_n:
+                break
+            current_deputy = self.df.iloc[idx]
+            if current_deputy['deputy_id'] != source['deputy_id']:
+                results.append({
+                    'deputy_id': current_deputy['deputy_id'],
+                    'name': current_deputy['name'],
+                    'similarity_score': round(scores[idx], 4),
+                    'key_similarities': self._get_key_similarities(source, current_deputy),
+                    'most_similar_fields': self._get_most_similar_fields(source, current_deputy)
+                })
+
+        return {
+            'input_deputy_id': source['deputy_id'],
+            'similar_deputies': results
+        }
+
     def recommend_by_name(self, deputy_name, top_n=5):
         if deputy_name not in self.df['name'].values:
             raise ValueError(f"Deputado '{deputy_name}' não encontrado")
@@ -216,6 +311,10 @@ class DeputyRecommender:
                 similarities[label] = f"Diferença: {round(diff, 2)}"
             else:
                 similarities[label] = f"Original: {source[field]} → Similar: {target[field]}"
+
+        shared = self._shared_propositions(source['deputy_id'], target['deputy_id'])
+        if shared:
+            similarities['Proposições em Comum'] = shared
         
         return similarities
 
@@ -232,6 +331,147 @@ class DeputyRecommender:
         
         return most_similar_fields
 
+
+def partition_path(legislature, year, partitions_path=PARTITIONS_PATH):
+    return os.path.join(partitions_path, f'legislature={legislature}', f'year={year}')
+
+
+def build_partition(features, legislature, year, partitions_path=PARTITIONS_PATH, overlap=None):
+    """
+    Build the model of one period in its own folder: a snapshot of the period's
+    features (and proposition overlap, if any) next to its data.pkl and
+    similarity.pkl. The folder is swapped in whole, so a reader never loads a
+    half-built partition.
+    """
+    path = partition_path(legislature, year, partitions_path)
+    tmp_path, old_path = f'{path}.tmp', f'{path}.old'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    features_path = os.path.join(tmp_path, 'features.parquet')
+    features.reset_index(drop=True).to_parquet(features_path, index=False)
+    overlap_path = None
+    if overlap is not None:
+        deputy_ids = set(features['deputy_id'])
+        overlap = overlap[overlap['deputy_id_a'].isin(deputy_ids) & overlap['deputy_id_b'].isin(deputy_ids)]
+        overlap_path = os.path.join(tmp_path, 'overlap.parquet')
+        overlap.reset_index(drop=True).to_parquet(overlap_path, index=False)
+    DeputyRecommender(features_path, tmp_path, overlap_path)
+
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return legislature, year, len(features)
+
+
+def build_partitions(jobs, partitions_path=PARTITIONS_PATH, workers=None):
+    """Build (features, legislature, year, overlap) jobs in parallel, one process per period."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(build_partition, features, legislature, year, partitions_path, overlap)
+            for features, legislature, year, overlap in jobs
+        ]
+        return [future.result() for future in futures]
+
+
+def partition_jobs(data_path, year, overlap_path=OVERLAP_PATH):
+    """One job per legislature in a features table, all of them for `year`."""
+    df = pd.read_parquet(data_path)
+    overlap = pd.read_parquet(overlap_path) if os.path.exists(overlap_path) else None
+    return [(group, int(legislature), year, overlap) for legislature, group in df.groupby('legislation_id')]
+
+
+def read_partition(legislature, year, partitions_path=PARTITIONS_PATH):
+    """The features and proposition overlap (or None) a partition was built from."""
+    path = partition_path(legislature, year, partitions_path)
+    overlap_path = os.path.join(path, 'overlap.parquet')
+    overlap = pd.read_parquet(overlap_path) if os.path.exists(overlap_path) else None
+    return pd.read_parquet(os.path.join(path, 'features.parquet')), overlap
+
+
+def built_periods(partitions_path=PARTITIONS_PATH):
+    """(legislature, year) of every built partition, oldest first."""
+    periods = []
+    if not os.path.exists(partitions_path):
+        return periods
+    for legislature_dir in os.listdir(partitions_path):
+        if not legislature_dir.startswith('legislature='):
+            continue
+        for year_dir in os.listdir(os.path.join(partitions_path, legislature_dir)):
+            path = os.path.join(partitions_path, legislature_dir, year_dir)
+            if year_dir.startswith('year=') and os.path.exists(os.path.join(path, 'similarity.pkl')):
+                periods.append((int(legislature_dir.split('=')[1]), int(year_dir.split('=')[1])))
+    return sorted(periods)
+
+
+class RecommenderRegistry:
+    """
+    The recommenders of every built period, loaded when first asked for.
+    Each one holds an N x N similarity matrix, so at most `max_loaded` stay in
+    memory and the least recently used is dropped beyond that.
+    """
+
+    def __init__(self, partitions_path=PARTITIONS_PATH, max_loaded=2):
+        self.partitions_path = partitions_path
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def periods(self):
+        return built_periods(self.partitions_path)
+
+    def get(self, legislature, year):
+        key = (int(legislature), int(year))
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+            path = partition_path(*key, self.partitions_path)
+            if not os.path.exists(os.path.join(path, 'similarity.pkl')):
+                raise ValueError(f"Modelo da legislatura {key[0]}, ano {key[1]} não encontrado")
+            recommender = DeputyRecommender(
+                os.path.join(path, 'features.parquet'), path, os.path.join(path, 'overlap.parquet')
+            )
+            self._loaded[key] = recommender
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+            return recommender
+
+    def recommend_by_id(self, deputy_id, legislature, year, top_n=5):
+        return self.get(legislature, year).recommend_by_id(deputy_id, top_n)
+
+    def compare(self, deputy_id, period, against, top_n=5):
+        """The deputies of period `against` most similar to `deputy_id` as they were in `period`."""
+        source = self.get(*period)
+        if deputy_id not in source.df['deputy_id'].values:
+            raise ValueError(f"Deputado com ID '{deputy_id}' não encontrado")
+
+        deputy = source.df[source.df['deputy_id'] == deputy_id]
+        return self.get(*against).recommend_for_features(deputy, top_n)
+
+
 if __name__ == "__main__":
-    recommender = DeputyRecommender('enriched_df.csv')
+    parser = argparse.ArgumentParser(description='Build the recommender, one model per legislature and year.')
+    parser.add_argument('--data-path', default=FEATURES_PATH, help='Enriched features of one year')
+    parser.add_argument('--overlap-path', default=OVERLAP_PATH, help='Proposition overlap of the same year')
+    parser.add_argument('--year', type=int, default=2024, help='Year of the features in --data-path')
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Also rebuild every other built period from its own features snapshot',
+    )
+    parser.add_argument('--workers', type=int, default=None, help='Periods built at the same time')
+    args = parser.parse_args()
+
+    jobs = partition_jobs(args.data_path, args.year, args.overlap_path)
+    if args.rebuild:
+        new_periods = {(legislature, year) for _, legislature, year, _ in jobs}
+        for legislature, year in built_periods():
+            if (legislature, year) not in new_periods:
+                features, overlap = read_partition(legislature, year)
+                jobs.append((features, legislature, year, overlap))
+
+    for legislature, year, deputies in build_partitions(jobs, workers=args.workers):
+        print(f'Built the model of legislature {legislature}, year {year}: {deputies} deputies')
 
@@ -0,0 +1,81 @@
+import duckdb
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+from sql_models import FTS_OPTIONS, load_fts
+
+TABLE = 'silver.fact_propositions'
+FTS_SCHEMA = 'fts_silver_fact_propositions'
+
+
+class PropositionSearch:
+    """
+    Which deputies proposed things about a subject, ranked by BM25 over the
+    full-text index of silver.fact_propositions.
+    Uses the pipeline database when it exists; otherwise the table is loaded from
+    its Parquet export and indexed in memory. Without the fts extension, searches
+    fall back to matching the query words in the ementas.
+    """
+
+    def __init__(self, db_path='data/deputies_db.db', parquet_path='data/silver/fact_propositions_parquet'):
+        self.db_path = db_path
+        self.parquet_path = parquet_path
+        self.con = self._connect()
+        self.indexed = self._has_index()
+
+    def _connect(self):
+        if os.path.exists(self.db_path):
+            try:
+                return duckdb.connect(self.db_path, read_only=True)
+            except duckdb.IOException:
+                # The pipeline is writing to the database
+                pass
+
+        con = duckdb.connect()
+        con.execute('CREATE SCHEMA silver;')
+        con.execute(f"CREATE TABLE {TABLE} AS SELECT * FROM read_parquet('{self.parquet_path}');")
+        try:
+            load_fts(con)
+            con.execute(f"PRAGMA create_fts_index('{TABLE}', 'proposition_id', 'ementa', {FTS_OPTIONS});")
+        except duckdb.Error:
+            pass
+        return con
+
+    def _has_index(self):
+        try:
+            load_fts(self.con)
+        except duckdb.Error:
+            return False
+        return self.con.execute(
+            f"SELECT COUNT(*) FROM duckdb_schemas() WHERE schema_name = '{FTS_SCHEMA}'"
+        ).fetchone()[0] > 0
+
+    def search(self, query, top_n=10):
+        """Deputies with propositions matching `query`: how many match, their summed score and the best match."""
+        if self.indexed:
+            score = f"{FTS_SCHEMA}.match_bm25(proposition_id, $query)"
+        else:
+            score = (
+                "list_sum(list_transform(string_split(strip_accents(lower($query)), ' '), "
+                "term -> (term <> '' AND strip_accents(lower(ementa)) LIKE '%' || term || '%')::INT))"
+            )
+        # A cursor per search: the app shares one instance across sessions
+        return self.con.cursor().execute(f"""
+            WITH scored AS (
+                SELECT deputy_id, name, party, ementa, {score} AS score
+                FROM {TABLE}
+            )
+            SELECT
+                deputy_id,
+                name,
+                party,
+                COUNT(*) AS matches,
+                ROUND(SUM(score), 3) AS score,
+                arg_max(ementa, score) AS best_match
+            FROM scored
+            WHERE score > 0
+            GROUP BY ALL
+            ORDER BY score DESC, matches DESC
+            LIMIT $top_n
+        """, {'query': query, 'top_n': top_n}).df()
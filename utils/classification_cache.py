@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "data",
+    ".llm_cache",
+    "classifications.sqlite",
+)
+
+
+class ClassificationCache:
+    """
+    Persistent cache of LLM classifications in SQLite, keyed by a hash of the
+    prompt template, the model name and the normalized input, so the model is
+    only called for inputs it hasn't classified with the same prompt before.
+    Safe to share between threads; hits and misses are counted per instance.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0, "stored": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                key TEXT PRIMARY KEY,
+                kind TEXT,
+                model TEXT,
+                value TEXT,
+                created_at REAL
+            )
+        """)
+        self._con.commit()
+
+    @staticmethod
+    def key(template: str, model: str, payload) -> str:
+        """Stable key for a prompt template, a model and the (JSON-serializable) normalized input."""
+        normalized = json.dumps(
+            [template, model, payload], ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """The cached classification for a key, or None."""
+        with self._lock:
+            row = self._con.execute(
+                "SELECT value FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, kind: str, model: str, value) -> None:
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?)",
+                (key, kind, model, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._con.commit()
+            self.stats["stored"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def log_stats(self, since: Optional[Dict[str, int]] = None) -> None:
+        """Log the counts, or only those since an earlier `snapshot()`."""
+        stats = self.snapshot()
+        if since:
+            stats = {name: count - since.get(name, 0) for name, count in stats.items()}
+        logging.info(
+            "Classification cache: "
+            + ", ".join(f"{name}={count}" for name, count in stats.items())
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
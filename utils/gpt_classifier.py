@@ -1,19 +1,58 @@
+import argparse
+import ast
 import getpass
 import json
 import os
+import sys
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
 import pandas as pd
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from checkpoint import JsonlCheckpoint
+from http_retry import RetryPolicy
+from rate_limit import ThreadAdaptiveLimit, ThreadTokenBucket
+from storage import Storage
+
+from classification_cache import ClassificationCache
+from proposition_budget import (
+    BudgetStats,
+    chunk_by_budget,
+    combine_classifications,
+    count_tokens,
+    dedupe_near_identical,
+)
+
 # Constants for file paths
-INPUT_DATA_PATH = "../data/gold/deputies_consolidated_metrics_parquet"
+DATA_ROOT = "../data"
+INPUT_DATASET = "gold/deputies_consolidated_metrics_parquet"
+INPUT_COLUMNS = ["deputy_id", "proposition_count", "propositions_list"]
 OUTPUT_PARQUET_PATH = "../data/gold/classified_deputies.parquet"
 OUTPUT_JSON_PATH = "../data/gold/classified_deputies.json"
+CHECKPOINT_PATH = "../data/gold/_state/classified_deputies.jsonl"
+
+MODEL_NAME = "gpt-4o-mini"
+
+# gpt-4o-mini limits of a low usage tier; the classifier stays under both
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200_000
+
+# Tokens reserved for the structured answer on top of the prompt
+COMPLETION_TOKENS = 100
+
+# Ementa tokens per prompt; with the template and the answer a call stays under
+# the one-second burst of the tokens-per-minute budget
+PROPOSITION_TOKEN_BUDGET = 3000
+
+# Chunks of one deputy classified side by side (within the overall concurrency)
+MAX_PARALLEL_CHUNKS = 8
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -52,8 +91,7 @@ class Classification(BaseModel):
     )
 
 
-TAGGING_PROMPT = ChatPromptTemplate.from_template(
-    """
+TAGGING_TEMPLATE = """
     Analyze political propositions and classify them using these criteria:
     1. Ideological position
     2. Agenda category
@@ -68,62 +106,9 @@ TAGGING_PROMPT = ChatPromptTemplate.from_template(
     Propositions:
     {input}
     """
-)
-
-
-def initialize_llm():
-    """Configure and return the language model."""
-    return ChatOpenAI(temperature=0.1, model="gpt-4o-mini").with_structured_output(Classification)
-
-
-def process_deputy_propositions(deputy_df: pd.DataFrame, llm: ChatOpenAI) -> dict:
-    """Process propositions for a single deputy."""
-    propositions = deputy_df["propositions_list"].iloc[0]
-    prompt = TAGGING_PROMPT.invoke({"input": propositions})
-    result = llm.invoke(prompt)
-    return {
-        "deputy_id": int(deputy_df.deputy_id),
-        "classification": result.model_dump()
-    }
-
-
-def classify_deputies_batch(df: pd.DataFrame, batch_size: int = 50) -> List[dict]:
-    """Process deputies in batches with error handling."""
-    llm = initialize_llm()
-    results = []
-    deputy_groups = df.groupby("deputy_id")
-
-    for deputy_id, group in deputy_groups:
-        try:
-            logging.info(f"Processing deputy {deputy_id}")
-            results.append(process_deputy_propositions(group, llm))
-        except Exception as e:
-            logging.error(f"Error processing deputy {deputy_id}: {str(e)}")
-    
-    return results
-
+TAGGING_PROMPT = ChatPromptTemplate.from_template(TAGGING_TEMPLATE)
 
-def save_results(results: List[dict]) -> None:
-    """Save classification results in multiple formats."""
-    json_data = json.dumps(results, ensure_ascii=False, indent=4)
-    
-    pd.DataFrame(results).to_parquet(
-        OUTPUT_PARQUET_PATH,
-        index=False
-    )
-    
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        f.write(json_data)
-
-def classify_party(party_name):
-    if "OPENAI_API_KEY" not in os.environ:
-        os.environ["OPENAI_API_KEY"] = getpass.getpass("OpenAI API Key: ")
-    """
-    Classifies a Brazilian political party by ideology.
-    First checks the dictionary, then queries OpenAI if missing.
-    """
-    
-    classification_prompt = ChatPromptTemplate.from_template("""
+PARTY_TEMPLATE = """
     Return the ideological position of a given Brazillian party.
     Answer should contain only one option of the following: 
         - 'Esquerda'
@@ -149,36 +134,430 @@ def classify_party(party_name):
 
     Party: {party_name}
     Note: you will be punished if return something different from the options above"
-    """)
-    llm = ChatOpenAI(model="gpt-4o-mini")
-    
+    """
+PARTY_CLASSIFICATION_PROMPT = ChatPromptTemplate.from_template(PARTY_TEMPLATE)
+
+
+def initialize_llm(model_name: str = MODEL_NAME):
+    """Configure and return the language model."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(temperature=0.1, model=model_name).with_structured_output(Classification)
+
+
+@lru_cache(maxsize=1)
+def default_cache() -> ClassificationCache:
+    """The on-disk classification cache shared by every call in this process."""
+    return ClassificationCache()
+
+
+def normalize_propositions(propositions) -> List[str]:
+    """
+    The ementas of a deputy as a sorted list of trimmed, lower-cased texts.
+    Silver stores them as a one-item array holding the stringified list, which is
+    unpacked here; the result is both the prompt input and part of the cache key.
+    """
+    if propositions is None:
+        return []
+    if isinstance(propositions, str):
+        propositions = [propositions]
+    texts = []
+    for item in propositions:
+        if isinstance(item, str) and item.strip().startswith("["):
+            try:
+                texts.extend(ast.literal_eval(item.strip()))
+                continue
+            except (ValueError, SyntaxError):
+                pass
+        texts.append(item)
+    normalized = (" ".join(str(text).lower().split()) for text in texts)
+    return sorted(text for text in normalized if text)
+
+
+def load_deputies(
+    data_root: str = DATA_ROOT, parties: Optional[List[str]] = None, endpoint_url: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    The deputies with propositions in the gold metrics, read through Storage: only
+    the columns classification needs, and only the `parties` partitions when given.
+    `data_root` is the local data folder or a bucket mirroring it (s3://proj-deputados-fiap).
+    """
+    storage = Storage(data_root, endpoint_url=endpoint_url)
+    filters = [("party", "in", list(parties))] if parties else None
+    df = storage.read_parquet(INPUT_DATASET, columns=INPUT_COLUMNS, filters=filters)
+    return df[df["proposition_count"] > 0].reset_index(drop=True)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a prompt plus the tokens reserved for its answer."""
+    return count_tokens(text) + COMPLETION_TOKENS
+
+
+class LLMRateLimiter:
+    """
+    Requests- and tokens-per-minute budgets shared by the classification threads,
+    as token buckets refilled continuously and allowing bursts of `burst_seconds`.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = TOKENS_PER_MINUTE,
+        burst_seconds: float = 1.0,
+    ):
+        self.requests = ThreadTokenBucket(
+            requests_per_minute / 60, max(1.0, requests_per_minute / 60 * burst_seconds)
+        )
+        self.tokens = ThreadTokenBucket(
+            tokens_per_minute / 60, tokens_per_minute / 60 * burst_seconds
+        )
+
+    def acquire(self, tokens: int) -> None:
+        self.requests.acquire()
+        # A prompt bigger than the burst can't wait for more than a full bucket
+        self.tokens.acquire(min(tokens, self.tokens.capacity))
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of an OpenAI API error (429 for rate limits); None for other errors."""
+    if type(error).__name__ == "RateLimitError":
+        return 429
+    return getattr(error, "status_code", None)
+
+
+def invoke_with_retry(
+    llm,
+    prompt,
+    limiter: LLMRateLimiter,
+    concurrency: ThreadAdaptiveLimit,
+    retry: RetryPolicy,
+    timings: Optional[List[tuple]] = None,
+):
+    """
+    Call the model within the rate limits, retrying rate-limited (429) and 5xx
+    calls with backoff. A 429 also lowers the number of calls in flight.
+    The (start, end) times of the successful call are appended to `timings`.
+    """
+    tokens = estimate_tokens(prompt.to_string())
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        with concurrency:
+            start = time.perf_counter()
+            try:
+                result = llm.invoke(prompt)
+            except Exception as e:
+                status = error_status(e)
+                if status not in retry.statuses or not retry.should_retry(attempt, status):
+                    raise
+                if status == 429:
+                    concurrency.throttled()
+                response = getattr(e, "response", None)
+                retry_after = getattr(response, "headers", {}).get("retry-after")
+                delay = retry.delay(attempt, retry_after)
+                logging.warning(
+                    f"LLM call failed with {status}, retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{retry.max_retries})"
+                )
+            else:
+                concurrency.success()
+                if timings is not None:
+                    timings.append((start, time.perf_counter()))
+                return result
+        time.sleep(delay)
+        attempt += 1
+
+
+def classify_chunks(
+    chunks: List[tuple],
+    llm,
+    limiter: LLMRateLimiter,
+    concurrency: ThreadAdaptiveLimit,
+    retry: RetryPolicy,
+) -> tuple:
+    """
+    Classify (texts, weight) chunks of one deputy in parallel and combine them.
+    Returns the classification, the prompt tokens sent and the (start, end) of
+    each model call.
+    """
+
+    def classify(texts: List[str]) -> tuple:
+        prompt = TAGGING_PROMPT.invoke({"input": texts})
+        timings: List[tuple] = []
+        result = invoke_with_retry(llm, prompt, limiter, concurrency, retry, timings)
+        return json.loads(result.model_dump_json()), count_tokens(prompt.to_string()), timings[0]
+
+    if len(chunks) == 1:
+        answers = [classify(chunks[0][0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_PARALLEL_CHUNKS)) as executor:
+            answers = list(executor.map(classify, [texts for texts, _ in chunks]))
+
+    if len(answers) == 1:
+        classification = answers[0][0]
+    else:
+        classification = combine_classifications(
+            [(answer, weight) for (answer, _, _), (_, weight) in zip(answers, chunks)],
+            [position.value for position in IdeologicalPosition],
+            [category.value for category in AgendaCategory],
+        )
+    return (
+        classification,
+        sum(tokens for _, tokens, _ in answers),
+        [interval for _, _, interval in answers],
+    )
+
+
+def process_deputy_propositions(
+    deputy_df: pd.DataFrame,
+    llm,
+    limiter: Optional[LLMRateLimiter] = None,
+    concurrency: Optional[ThreadAdaptiveLimit] = None,
+    retry: Optional[RetryPolicy] = None,
+    cache: Optional[ClassificationCache] = None,
+    model_name: str = MODEL_NAME,
+    token_budget: Optional[int] = PROPOSITION_TOKEN_BUDGET,
+    budget_stats: Optional[BudgetStats] = None,
+) -> dict:
+    """
+    Process propositions for a single deputy, calling the model only on a cache miss.
+    Near-identical ementas are classified once and the rest is split into prompts
+    of at most `token_budget` ementa tokens, whose answers are combined weighted by
+    how many ementas each stands for. With `token_budget=None` the whole list
+    goes into a single prompt.
+    """
+    deputy_id = int(deputy_df.deputy_id.iloc[0])
+    propositions = normalize_propositions(deputy_df["propositions_list"].iloc[0])
+    cache = cache or default_cache()
+    payload = propositions if token_budget is None else [propositions, token_budget]
+    key = cache.key(TAGGING_TEMPLATE, model_name, payload)
+    classification = cache.get(key)
+    if classification is None:
+        if token_budget is None:
+            kept = [(text, 1) for text in propositions]
+            chunks = [(propositions, len(propositions))]
+        else:
+            kept = dedupe_near_identical(propositions)
+            chunks = chunk_by_budget(kept, token_budget, model_name) or [(propositions, 0)]
+        classification, sent_tokens, calls = classify_chunks(
+            chunks,
+            llm,
+            limiter or LLMRateLimiter(),
+            concurrency or ThreadAdaptiveLimit(1),
+            retry or RetryPolicy(),
+        )
+        cache.put(key, "deputy", model_name, classification)
+        if budget_stats is not None:
+            full_prompt = TAGGING_PROMPT.invoke({"input": propositions}).to_string()
+            budget_stats.record(
+                ementas=len(propositions),
+                kept=len(kept),
+                chunks=len(chunks),
+                full_prompt_tokens=count_tokens(full_prompt, model_name),
+                sent_tokens=sent_tokens,
+                calls=calls,
+            )
+    return {
+        "deputy_id": deputy_id,
+        "classification": classification
+    }
+
+
+def classify_deputies_batch(
+    df: pd.DataFrame,
+    batch_size: int = 50,
+    llm=None,
+    requests_per_minute: float = REQUESTS_PER_MINUTE,
+    tokens_per_minute: float = TOKENS_PER_MINUTE,
+    retry: Optional[RetryPolicy] = None,
+    cache: Optional[ClassificationCache] = None,
+    model_name: str = MODEL_NAME,
+    token_budget: Optional[int] = PROPOSITION_TOKEN_BUDGET,
+    budget_stats: Optional[BudgetStats] = None,
+    checkpoint: Optional[JsonlCheckpoint] = None,
+    resume: bool = False,
+) -> List[dict]:
+    """
+    Classify deputies concurrently, with up to `batch_size` model calls in flight,
+    within the requests- and tokens-per-minute limits. Rate-limited calls are
+    retried with backoff; a deputy that still fails is logged and left out.
+    With a `checkpoint`, every result and failure is appended to it as it
+    completes; `resume` skips the deputies it already holds a result for, so
+    only new and failed deputies are classified (otherwise it starts empty).
+    Deputies whose propositions were already classified with the same prompt and
+    model are answered from `cache` (the on-disk cache by default).
+    Long proposition lists are deduplicated and chunked to `token_budget`; the
+    tokens and latency that saved are logged and added to `budget_stats`.
+    Results are ordered by deputy_id.
+    """
+    llm = llm or initialize_llm(model_name)
+    cache = cache or default_cache()
+    cache_stats = cache.snapshot()
+    limiter = LLMRateLimiter(requests_per_minute, tokens_per_minute)
+    concurrency = ThreadAdaptiveLimit(batch_size)
+    retry = retry or RetryPolicy(max_retries=6, base_delay=1.0, max_delay=60.0)
+    budget_stats = budget_stats or BudgetStats()
+    # Load the tokenizer before the calls are timed
+    count_tokens("", model_name)
+    results = []
+    deputy_groups = df.groupby("deputy_id")
+    if checkpoint is not None:
+        if resume:
+            classified = {
+                deputy_id
+                for deputy_id, record in checkpoint.load().items()
+                if record["status"] == "ok"
+            }
+            deputy_groups = [(d, group) for d, group in deputy_groups if d not in classified]
+            logging.info(f"Resuming: {len(classified)} deputies already classified")
+        else:
+            checkpoint.clear()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=batch_size) as executor:
+        futures = {
+            executor.submit(
+                process_deputy_propositions,
+                group,
+                llm,
+                limiter,
+                concurrency,
+                retry,
+                cache,
+                model_name,
+                token_budget,
+                budget_stats,
+            ): deputy_id
+            for deputy_id, group in deputy_groups
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            deputy_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"Error processing deputy {deputy_id}: {str(e)}")
+                if checkpoint is not None:
+                    checkpoint.append(
+                        {"deputy_id": int(deputy_id), "status": "failed", "error": str(e)}
+                    )
+                continue
+            results.append(result)
+            if checkpoint is not None:
+                checkpoint.append({**result, "status": "ok"})
+            logging.info(f"Classified deputy {deputy_id} ({done}/{len(futures)})")
+
+    logging.info(
+        f"Classified {len(results)}/{len(futures)} deputies "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    cache.log_stats(since=cache_stats)
+    budget_stats.log()
+    return sorted(results, key=lambda result: result["deputy_id"])
+
+
+def save_results(checkpoint: JsonlCheckpoint, deputy_ids, keep_others: bool = False) -> List[int]:
+    """
+    Write the Parquet and JSON outputs from the checkpoint, read once, keeping the
+    classified deputies among `deputy_ids` in deputy_id order. With `keep_others`
+    (a run over some parties), the deputies outside `deputy_ids` keep their
+    previous classification. Returns the deputies without a classification.
+    """
+    records = checkpoint.load()
+    deputy_ids = set(int(d) for d in deputy_ids)
+    results = [
+        {"deputy_id": deputy_id, "classification": records[deputy_id]["classification"]}
+        for deputy_id in sorted(deputy_ids)
+        if records.get(deputy_id, {}).get("status") == "ok"
+    ]
+    if keep_others and os.path.exists(OUTPUT_JSON_PATH):
+        with open(OUTPUT_JSON_PATH, "r", encoding="utf-8") as f:
+            previous = [result for result in json.load(f) if result["deputy_id"] not in deputy_ids]
+        results = sorted(results + previous, key=lambda result: result["deputy_id"])
+
+    pd.DataFrame(results).to_parquet(OUTPUT_PARQUET_PATH + ".tmp", index=False)
+    os.replace(OUTPUT_PARQUET_PATH + ".tmp", OUTPUT_PARQUET_PATH)
+    with open(OUTPUT_JSON_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    os.replace(OUTPUT_JSON_PATH + ".tmp", OUTPUT_JSON_PATH)
+
+    classified = {result["deputy_id"] for result in results}
+    return sorted(deputy_ids - classified)
+
+
+@lru_cache(maxsize=1)
+def party_llm():
+    """One chat client for every party classification."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=MODEL_NAME)
+
+
+def classify_party(party_name, cache: Optional[ClassificationCache] = None):
+    """
+    Classifies a Brazilian political party by ideology.
+    First checks the classification cache, then queries OpenAI if missing.
+    """
+    cache = cache or default_cache()
+    key = cache.key(PARTY_TEMPLATE, MODEL_NAME, party_name.strip().upper())
+    classification = cache.get(key)
+    if classification is not None:
+        return classification
+
+    if "OPENAI_API_KEY" not in os.environ:
+        os.environ["OPENAI_API_KEY"] = getpass.getpass("OpenAI API Key: ")
+
     # Format the prompt
-    prompt = classification_prompt.format(party_name=party_name)
-    
-    response = llm.predict(prompt)
+    prompt = PARTY_CLASSIFICATION_PROMPT.format(party_name=party_name)
 
-    # Store the result in dictionary to avoid repeated API calls
+    response = party_llm().predict(prompt)
+
+    # Store the result in the cache to avoid repeated API calls
     classification = response.strip()
+    cache.put(key, "party", MODEL_NAME, classification)
 
     return classification
 
 def main() -> None:
     """Main execution workflow."""
+    parser = argparse.ArgumentParser(description="Classify deputies by their propositions with an LLM.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep the deputies classified by an interrupted run and retry only the rest",
+    )
+    parser.add_argument(
+        "--data-root",
+        default=DATA_ROOT,
+        help="Folder or bucket (s3://proj-deputados-fiap) holding gold/deputies_consolidated_metrics_parquet",
+    )
+    parser.add_argument("--endpoint-url", help="S3-compatible server to read --data-root from instead of AWS")
+    parser.add_argument(
+        "--parties",
+        nargs="+",
+        help="Classify only these parties' deputies; the others keep their previous classification",
+    )
+    args = parser.parse_args()
+
     if "OPENAI_API_KEY" not in os.environ:
         os.environ["OPENAI_API_KEY"] = getpass.getpass("OpenAI API Key: ")
 
     logging.info("Reading input data")
-    deputies_df = pd.read_parquet(INPUT_DATA_PATH)
+    deputies_df = load_deputies(args.data_root, args.parties, args.endpoint_url)
+    checkpoint = JsonlCheckpoint(CHECKPOINT_PATH)
     logging.info("Classifying deputies")
-    classifications = classify_deputies_batch(deputies_df.query('proposition_count > 0'))
+    classify_deputies_batch(deputies_df, checkpoint=checkpoint, resume=args.resume)
     logging.info("Saving results")
-    save_results(classifications)
+    missing = save_results(checkpoint, deputies_df["deputy_id"], keep_others=bool(args.parties))
 
     logging.info(f"Results saved to:\n- {OUTPUT_PARQUET_PATH}\n- {OUTPUT_JSON_PATH}")
+    if missing:
+        logging.error(
+            f"{len(missing)} deputies could not be classified: {missing}. "
+            f"Rerun with --resume to retry only them"
+        )
+        sys.exit(1)
+    checkpoint.clear()
 
 
 if __name__ == "__main__":
     main()
-    
-
-
@@ -0,0 +1,292 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.metrics import accuracy_score, f1_score, mean_absolute_error
+from sklearn.model_selection import KFold
+
+from gpt_classifier import (
+    DATA_ROOT,
+    OUTPUT_PARQUET_PATH as LABELS_PATH,
+    classify_deputies_batch,
+    load_deputies,
+    normalize_propositions,
+)
+
+MODEL_PATH = "../model/local_classifier.pkl"
+REPORT_PATH = "../model/local_classifier_report.json"
+OUTPUT_PARQUET_PATH = "../data/gold/classified_deputies_local.parquet"
+OUTPUT_JSON_PATH = "../data/gold/classified_deputies_local.json"
+
+CATEGORICAL_TARGETS = ["ideology", "agenda_category"]
+
+# Cross-validated agreement with GPT (on both categories) the local labels must reach.
+# The model barely beats always answering the most common label, so only its most
+# confident deputies are labelled; the rest go to the LLM or stay unlabelled.
+MIN_LOCAL_AGREEMENT = 0.75
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def deputy_documents(df: pd.DataFrame) -> pd.Series:
+    """One text per deputy, indexed by deputy_id: the ementas as the LLM sees them."""
+    return pd.Series(
+        ["\n".join(normalize_propositions(p)) for p in df["propositions_list"]],
+        index=df["deputy_id"].astype(int),
+    )
+
+
+def load_training_data(data_root: str = DATA_ROOT, labels_path: str = LABELS_PATH) -> tuple:
+    """Documents and GPT labels (ideology, agenda_category, populist_elements) of the labelled deputies."""
+    labels = pd.read_parquet(labels_path)
+    labels = pd.concat(
+        [labels[["deputy_id"]], pd.json_normalize(labels["classification"].tolist())], axis=1
+    ).set_index("deputy_id")
+    documents = deputy_documents(load_deputies(data_root))
+    documents = documents[documents.index.isin(labels.index)]
+    return documents, labels.loc[documents.index]
+
+
+class LocalClassifier:
+    """
+    TF-IDF over a deputy's ementas with a logistic regression per category and a
+    ridge regression for populist_elements, distilled from the GPT labels.
+    Confidence is the lower of the two category probabilities.
+    Its labels are approximate (see model/local_classifier_report.json): overall
+    accuracy is a few points above the majority class, and only high-confidence
+    predictions agree with GPT often enough to be used.
+    """
+
+    def __init__(self):
+        self.vectorizer = TfidfVectorizer(strip_accents="unicode", min_df=2, sublinear_tf=True)
+        self.models = {
+            "ideology": LogisticRegression(C=10, max_iter=2000),
+            "agenda_category": LogisticRegression(C=10, max_iter=2000),
+            "populist_elements": Ridge(alpha=1.0),
+        }
+
+    def fit(self, documents: pd.Series, labels: pd.DataFrame) -> "LocalClassifier":
+        features = self.vectorizer.fit_transform(documents)
+        for target, model in self.models.items():
+            model.fit(features, labels[target])
+        return self
+
+    def predict(self, documents: pd.Series) -> pd.DataFrame:
+        features = self.vectorizer.transform(documents)
+        predictions = pd.DataFrame(index=documents.index)
+        confidence = np.ones(len(documents))
+        for target in CATEGORICAL_TARGETS:
+            model = self.models[target]
+            probabilities = model.predict_proba(features)
+            predictions[target] = model.classes_[probabilities.argmax(axis=1)]
+            confidence = np.minimum(confidence, probabilities.max(axis=1))
+        populist = self.models["populist_elements"].predict(features)
+        predictions["populist_elements"] = np.clip(populist, 0, 1).round(1)
+        predictions["confidence"] = confidence.round(3)
+        return predictions
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str = MODEL_PATH) -> "LocalClassifier":
+        return joblib.load(path)
+
+
+def agreement_report(
+    documents: pd.Series,
+    labels: pd.DataFrame,
+    folds: int = 5,
+    thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8),
+) -> Dict:
+    """
+    Cross-validated agreement of the local model with the GPT labels: accuracy and
+    macro-F1 per category (next to always answering the most common label),
+    populist MAE (next to always answering the mean), and for each confidence
+    threshold the share of deputies kept local and how often both categories agree there.
+    """
+    predictions = []
+    for train, test in KFold(folds, shuffle=True, random_state=0).split(documents):
+        model = LocalClassifier().fit(documents.iloc[train], labels.iloc[train])
+        predictions.append(model.predict(documents.iloc[test]))
+    predictions = pd.concat(predictions).loc[labels.index]
+
+    report = {"deputies": len(labels), "folds": folds}
+    for target in CATEGORICAL_TARGETS:
+        report[target] = {
+            "accuracy": round(accuracy_score(labels[target], predictions[target]), 3),
+            "macro_f1": round(f1_score(labels[target], predictions[target], average="macro"), 3),
+            "majority_accuracy": round(labels[target].value_counts(normalize=True).iloc[0], 3),
+        }
+    report["populist_elements"] = {
+        "mae": round(mean_absolute_error(labels["populist_elements"], predictions["populist_elements"]), 3),
+        "mean_baseline_mae": round(
+            (labels["populist_elements"] - labels["populist_elements"].mean()).abs().mean(), 3
+        ),
+    }
+    agree = (predictions[CATEGORICAL_TARGETS] == labels[CATEGORICAL_TARGETS]).all(axis=1)
+    report["by_threshold"] = [
+        {
+            "threshold": threshold,
+            "local_share": round((predictions["confidence"] >= threshold).mean(), 3),
+            "local_agreement": round(agree[predictions["confidence"] >= threshold].mean(), 3)
+            if (predictions["confidence"] >= threshold).any()
+            else None,
+        }
+        for threshold in thresholds
+    ]
+    return report
+
+
+def confidence_threshold(report: Dict, min_agreement: float = MIN_LOCAL_AGREEMENT) -> Optional[float]:
+    """Lowest confidence whose cross-validated agreement with GPT reaches `min_agreement`, if any."""
+    for row in report["by_threshold"]:
+        if row["local_agreement"] is not None and row["local_agreement"] >= min_agreement:
+            return row["threshold"]
+    return None
+
+
+def classify_with_fallback(
+    df: pd.DataFrame,
+    classifier: LocalClassifier,
+    threshold: float,
+    llm_fallback: bool = False,
+    **llm_options,
+) -> List[dict]:
+    """
+    Classify deputies locally at or above `threshold` confidence. The others are
+    sent to gpt_classifier (with `llm_options`) when `llm_fallback` is set, and
+    are otherwise left unlabelled (classification None): below the threshold the
+    local labels are little better than guessing the most common one.
+    Results are shaped like classify_deputies_batch's, with the source ("local",
+    "llm" or "unlabelled") and the local confidence added, and ordered by deputy_id.
+    """
+    predictions = classifier.predict(deputy_documents(df))
+    low = predictions.index[predictions["confidence"] < threshold]
+    llm_results = {}
+    if len(low) and llm_fallback:
+        logging.info(f"{len(low)}/{len(predictions)} deputies below {threshold} confidence, asking the LLM")
+        for result in classify_deputies_batch(df[df["deputy_id"].isin(low)], **llm_options):
+            llm_results[result["deputy_id"]] = result["classification"]
+    elif len(low):
+        logging.warning(f"{len(low)}/{len(predictions)} deputies below {threshold} confidence left unlabelled")
+
+    results = []
+    for deputy_id, row in predictions.iterrows():
+        local = {
+            "ideology": row["ideology"],
+            "agenda_category": row["agenda_category"],
+            "populist_elements": float(row["populist_elements"]),
+        }
+        if deputy_id in llm_results:
+            classification, source = llm_results[deputy_id], "llm"
+        elif row["confidence"] >= threshold:
+            classification, source = local, "local"
+        else:
+            classification, source = None, "unlabelled"
+        results.append({
+            "deputy_id": int(deputy_id),
+            "classification": classification,
+            "source": source,
+            "confidence": float(row["confidence"]),
+        })
+    return sorted(results, key=lambda result: result["deputy_id"])
+
+
+def train(report_folds: int = 5, data_root: str = DATA_ROOT) -> None:
+    documents, labels = load_training_data(data_root)
+    logging.info(f"Training on the GPT labels of {len(labels)} deputies")
+    start = time.perf_counter()
+    LocalClassifier().fit(documents, labels).save()
+    logging.info(f"Model trained in {time.perf_counter() - start:.1f}s and saved to {MODEL_PATH}")
+
+    report = agreement_report(documents, labels, folds=report_folds)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    for target in CATEGORICAL_TARGETS:
+        logging.info(f"Agreement on {target}: {report[target]}")
+    logging.info(f"Populist elements: {report['populist_elements']}")
+    for row in report["by_threshold"]:
+        logging.info(
+            f"Confidence >= {row['threshold']}: {row['local_share']:.0%} of deputies kept local, "
+            f"agreeing with GPT on both categories for {row['local_agreement']}"
+        )
+
+
+def classify(
+    threshold: Optional[float], min_agreement: float, llm_fallback: bool, data_root: str = DATA_ROOT
+) -> None:
+    with open(REPORT_PATH, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if threshold is None:
+        threshold = confidence_threshold(report, min_agreement)
+        if threshold is None:
+            logging.error(
+                f"The local model agrees with GPT on less than {min_agreement:.0%} of deputies at every "
+                f"confidence in {REPORT_PATH}; refusing to label with it"
+            )
+            sys.exit(1)
+    logging.warning(
+        f"Local labels are approximate: in cross-validation the model's ideology accuracy is "
+        f"{report['ideology']['accuracy']} (always answering the most common label: "
+        f"{report['ideology']['majority_accuracy']}) and agenda accuracy "
+        f"{report['agenda_category']['accuracy']} (most common label: "
+        f"{report['agenda_category']['majority_accuracy']}). Labelling at confidence >= {threshold}."
+    )
+
+    df = load_deputies(data_root)
+    start = time.perf_counter()
+    results = classify_with_fallback(df, LocalClassifier.load(), threshold, llm_fallback)
+    sources = pd.Series([result["source"] for result in results]).value_counts().to_dict()
+    logging.info(f"Classified {len(results)} deputies in {time.perf_counter() - start:.1f}s: {sources}")
+
+    pd.DataFrame(results).to_parquet(OUTPUT_PARQUET_PATH, index=False)
+    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    logging.info(f"Results saved to:\n- {OUTPUT_PARQUET_PATH}\n- {OUTPUT_JSON_PATH}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline deputy classifier distilled from the GPT labels.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train", help="Fit on classified_deputies.parquet and report agreement")
+    train_parser.add_argument("--folds", type=int, default=5)
+    classify_parser = subparsers.add_parser(
+        "classify",
+        help="Label the deputies the local model is confident about (approximate labels, see the report)",
+    )
+    classify_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Confidence below which deputies aren't labelled locally "
+        "(default: the lowest reaching --min-agreement in the report)",
+    )
+    classify_parser.add_argument("--min-agreement", type=float, default=MIN_LOCAL_AGREEMENT)
+    classify_parser.add_argument(
+        "--llm-fallback",
+        action="store_true",
+        help="Ask the LLM for the deputies below the threshold instead of leaving them unlabelled",
+    )
+    for subparser in (train_parser, classify_parser):
+        subparser.add_argument(
+            "--data-root", default=DATA_ROOT, help="Folder or bucket holding the gold metrics"
+        )
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.folds, args.data_root)
+    else:
+        classify(args.threshold, args.min_agreement, args.llm_fallback, args.data_root)
+
+
+if __name__ == "__main__":
+    main()
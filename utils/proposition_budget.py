@@ -0,0 +1,211 @@
+import logging
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+# Ementas that share this much of their word 3-grams are classified once
+NEAR_DUPLICATE_JACCARD = 0.85
+
+# Fallback when the tiktoken encoding can't be loaded (it is downloaded on first use)
+CHARS_PER_TOKEN = 4
+
+
+_encoding_lock = threading.Lock()
+
+
+def _encoding(model_name: str):
+    # Classification threads ask at once; the encoding is loaded (or given up on) once
+    with _encoding_lock:
+        return _load_encoding(model_name)
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model_name: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.warning(
+            f"tiktoken encoding unavailable ({type(e).__name__}), "
+            f"estimating {CHARS_PER_TOKEN} characters per token"
+        )
+        return None
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o-mini") -> int:
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = "gpt-4o-mini") -> str:
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def shingles(text: str, keep_digits: bool = False) -> frozenset:
+    """Word 3-grams of a text without accents, punctuation or (unless kept) digits."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    words = re.sub(r"[^a-z0-9 ]+" if keep_digits else r"[^a-z ]+", " ", text.lower()).split()
+    if len(words) < 3:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i : i + 3]) for i in range(len(words) - 2))
+
+
+def dedupe_near_identical(
+    texts: Sequence[str], threshold: float = NEAR_DUPLICATE_JACCARD
+) -> List[Tuple[str, int]]:
+    """
+    Collapse near-identical ementas (template requests differing only in a date,
+    a number or a name) into the first of them, in input order.
+    Returns (text, how many ementas it stands for).
+    """
+    kept: List[str] = []
+    weights: List[int] = []
+    exact: Dict[frozenset, int] = {}
+    shingle_sets: List[frozenset] = []
+    postings: Dict[str, List[int]] = {}
+    for text in texts:
+        shingle_set = shingles(text)
+        match = exact.get(shingle_set)
+        if match is None:
+            # Only kept ementas sharing a 3-gram can be near-identical
+            shared: Dict[int, int] = {}
+            for shingle in shingle_set:
+                for i in postings.get(shingle, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            for i in sorted(shared):
+                if shared[i] / (len(shingle_set) + len(shingle_sets[i]) - shared[i]) >= threshold:
+                    match = i
+                    break
+        if match is not None:
+            weights[match] += 1
+            continue
+        exact[shingle_set] = len(kept)
+        for shingle in shingle_set:
+            postings.setdefault(shingle, []).append(len(kept))
+        kept.append(text)
+        weights.append(1)
+        shingle_sets.append(shingle_set)
+    return list(zip(kept, weights))
+
+
+def chunk_by_budget(
+    items: Sequence[Tuple[str, int]], budget: int, model_name: str = "gpt-4o-mini"
+) -> List[Tuple[List[str], int]]:
+    """
+    Pack (text, weight) items, in order, into chunks of at most `budget` tokens.
+    A text longer than the budget on its own is truncated to it.
+    Returns (texts, summed weight) per chunk.
+    """
+    chunks: List[Tuple[List[str], int]] = []
+    texts: List[str] = []
+    used = weight = 0
+    for text, item_weight in items:
+        tokens = count_tokens(text, model_name) + 2  # quotes and separator in the prompt
+        if tokens > budget:
+            text, tokens = truncate_to_tokens(text, budget - 2, model_name), budget
+        if texts and used + tokens > budget:
+            chunks.append((texts, weight))
+            texts, used, weight = [], 0, 0
+        texts.append(text)
+        used += tokens
+        weight += item_weight
+    if texts:
+        chunks.append((texts, weight))
+    return chunks
+
+
+def combine_classifications(
+    parts: Sequence[Tuple[Dict, int]],
+    ideology_order: Sequence[str],
+    agenda_order: Sequence[str],
+) -> Dict:
+    """
+    Merge the classifications of a deputy's chunks, weighted by how many ementas
+    each chunk stands for: ideology is the weighted mean position on the
+    progressive-conservative scale, agenda the weighted mode (ties go to the
+    category listed first) and populist_elements the weighted mean.
+    """
+    total = sum(weight for _, weight in parts)
+    position = sum(ideology_order.index(p["ideology"]) * w for p, w in parts) / total
+    agenda_weights = {category: 0 for category in agenda_order}
+    for part, weight in parts:
+        agenda_weights[part["agenda_category"]] += weight
+    return {
+        "ideology": ideology_order[int(position + 0.5)],
+        "agenda_category": max(agenda_order, key=lambda c: (agenda_weights[c], -agenda_order.index(c))),
+        "populist_elements": round(sum(p["populist_elements"] * w for p, w in parts) / total, 2),
+    }
+
+
+class BudgetStats:
+    """Per-run token and latency accounting of the budgeting stage (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            "deputies": 0,
+            "ementas": 0,
+            "deduplicated": 0,
+            "chunks": 0,
+            "full_prompt_tokens": 0,
+            "sent_tokens": 0,
+            "model_seconds": 0.0,
+            "overlapped_seconds": 0.0,
+        }
+
+    def record(
+        self,
+        ementas: int,
+        kept: int,
+        chunks: int,
+        full_prompt_tokens: int,
+        sent_tokens: int,
+        calls: Sequence[Tuple[float, float]],
+    ) -> None:
+        """Account for one deputy; `calls` are the (start, end) times of its chunk calls."""
+        model_seconds = sum(end - start for start, end in calls)
+        # Time the calls ran alongside each other: their summed length minus their union
+        union, reach = 0.0, float("-inf")
+        for start, end in sorted(calls):
+            union += max(0.0, end - max(start, reach))
+            reach = max(reach, end)
+        with self._lock:
+            self.stats["deputies"] += 1
+            self.stats["ementas"] += ementas
+            self.stats["deduplicated"] += ementas - kept
+            self.stats["chunks"] += chunks
+            self.stats["full_prompt_tokens"] += full_prompt_tokens
+            self.stats["sent_tokens"] += sent_tokens
+            self.stats["model_seconds"] += model_seconds
+            self.stats["overlapped_seconds"] += model_seconds - union
+
+    def report(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["tokens_saved"] = stats["full_prompt_tokens"] - stats["sent_tokens"]
+        stats["latency_saved_seconds"] = round(stats["overlapped_seconds"], 3)
+        return stats
+
+    def log(self) -> None:
+        stats = self.report()
+        if not stats["deputies"]:
+            return
+        saved = stats["tokens_saved"] / stats["full_prompt_tokens"] if stats["full_prompt_tokens"] else 0
+        logging.info(
+            f"Token budget: {stats['sent_tokens']} prompt tokens sent instead of "
+            f"{stats['full_prompt_tokens']} ({saved:.1%} saved), "
+            f"{stats['deduplicated']}/{stats['ementas']} near-duplicate ementas dropped, "
+            f"{stats['deputies']} deputies in {stats['chunks']} chunks, "
+            f"{stats['latency_saved_seconds']:.1f}s of model latency saved by parallel chunks"
+        )
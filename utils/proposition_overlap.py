@@ -0,0 +1,220 @@
+import argparse
+import logging
+import time
+import zlib
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from proposition_budget import shingles
+
+DB_PATH = "../data/deputies_db.db"
+GOLD_DIR = "../data/gold"
+DUPLICATES_TABLE = "proposition_duplicates"
+OVERLAP_TABLE = "deputy_proposition_overlap"
+
+# Ementas sharing this much of their word 3-grams are the same proposition
+NEAR_DUPLICATE_JACCARD = 0.8
+
+# 16 bands of 8 rows: pairs from ~0.7 Jaccard up are very likely to share a band
+NUM_PERM = 128
+BANDS = 16
+
+# Smallest prime above 2**32, so (a * x + b) of 32-bit hashes fits in uint64
+PRIME = np.uint64(4294967311)
+
+# Ementas shared by more deputies than this are procedural boilerplate, not affinity
+MAX_GROUP_DEPUTIES = 50
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def minhash_signatures(
+    shingle_sets: Sequence[frozenset], num_perm: int = NUM_PERM, seed: int = 0, block: int = 2048
+) -> np.ndarray:
+    """
+    MinHash signature (num_perm values) of each shingle set: the minimum of
+    num_perm universal hashes of its shingles. Two signatures agree on a value
+    with probability equal to the sets' Jaccard similarity.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    lengths = np.array([len(s) for s in shingle_sets], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)])
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for s in shingle_sets for shingle in s),
+        dtype=np.uint64,
+        count=int(starts[-1]),
+    )
+
+    # Sets are hashed a block at a time, so the (shingles x permutations) matrix stays small
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    for lo in range(0, len(shingle_sets), block):
+        hi = min(lo + block, len(shingle_sets))
+        permuted = (np.outer(hashes[starts[lo] : starts[hi]], a) + b) % PRIME
+        signatures[lo:hi] = np.minimum.reduceat(permuted, starts[lo:hi] - starts[lo], axis=0)
+    return signatures
+
+
+def lsh_candidates(signatures: np.ndarray, bands: int = BANDS) -> List[Tuple[int, int]]:
+    """
+    Pairs of rows whose signatures are identical in at least one band: the only
+    pairs worth comparing, found by bucketing each band instead of comparing all pairs.
+    """
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows : (band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, rows * keys.itemsize))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(counts[inverse] > 1)
+        order = shared[np.argsort(inverse[shared], kind="stable")]
+        for bucket in np.split(order, np.flatnonzero(np.diff(inverse[order])) + 1):
+            pairs.update(combinations(bucket.tolist(), 2))
+    return sorted(pairs)
+
+
+def find_near_duplicates(
+    texts: Sequence[str],
+    threshold: float = NEAR_DUPLICATE_JACCARD,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+) -> np.ndarray:
+    """
+    Group texts whose word 3-grams have at least `threshold` Jaccard similarity,
+    directly or through a chain of such texts. Identical shingle sets are grouped
+    first; LSH candidates among the distinct ones are checked against their
+    exact Jaccard. Returns, for each text, the index of the first text of its group.
+    """
+    start = time.perf_counter()
+    distinct: Dict[frozenset, int] = {}
+    # Digits stay: requests that differ only in the bill they're about are different propositions
+    text_sets = np.array(
+        [distinct.setdefault(shingles(text, keep_digits=True), len(distinct)) for text in texts],
+        dtype=np.int64,
+    )
+    sets = list(distinct)
+
+    candidates = lsh_candidates(minhash_signatures(sets, num_perm), bands) if len(sets) > 1 else []
+    parent = list(range(len(sets)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    matches = 0
+    for i, j in candidates:
+        shared = len(sets[i] & sets[j])
+        if shared / (len(sets[i]) + len(sets[j]) - shared) >= threshold:
+            matches += 1
+            parent[max(find(i), find(j))] = min(find(i), find(j))
+
+    roots = np.array([find(i) for i in range(len(sets))], dtype=np.int64)
+    groups = roots[text_sets]
+    # The first text of each group, which roots (first distinct sets) don't give directly
+    _, first = np.unique(groups, return_index=True)
+    first_text = dict(zip(groups[first].tolist(), first.tolist()))
+    logging.info(
+        f"{len(texts)} ementas, {len(sets)} distinct: {len(candidates)} LSH candidate pairs, "
+        f"{matches} near-duplicates, {len(first_text)} groups in {time.perf_counter() - start:.1f}s"
+    )
+    return np.array([first_text[group] for group in groups.tolist()], dtype=np.int64)
+
+
+def proposition_duplicates(propositions: pd.DataFrame, groups: np.ndarray) -> pd.DataFrame:
+    """
+    Propositions whose ementa is shared with another one, with their group (the
+    proposition_id of its first proposition, the smallest when `propositions` is
+    ordered by proposition_id as in main) and how many propositions and deputies share it.
+    """
+    df = propositions[["proposition_id", "deputy_id", "ementa"]].copy()
+    df["group_id"] = df["proposition_id"].to_numpy()[groups]
+    by_group = df.groupby("group_id")
+    df["group_propositions"] = by_group["proposition_id"].transform("size")
+    df["group_deputies"] = by_group["deputy_id"].transform("nunique")
+    df = df[df["group_propositions"] > 1]
+    return df[
+        ["proposition_id", "deputy_id", "group_id", "group_propositions", "group_deputies", "ementa"]
+    ].sort_values(["group_id", "proposition_id"], ignore_index=True)
+
+
+def deputy_overlap(
+    propositions: pd.DataFrame, groups: np.ndarray, max_group_deputies: int = MAX_GROUP_DEPUTIES
+) -> pd.DataFrame:
+    """
+    Deputy pairs (deputy_id_a < deputy_id_b) with at least one proposition in
+    common: how many, each deputy's number of distinct propositions, and their
+    Jaccard and overlap (shared over the smaller of the two) coefficients.
+    Groups shared by more than `max_group_deputies` deputies are left out of the shared count.
+    """
+    memberships = pd.DataFrame(
+        {"deputy_id": propositions["deputy_id"].to_numpy(), "group": groups}
+    ).drop_duplicates()
+    totals = memberships.groupby("deputy_id").size()
+
+    deputies_per_group = memberships.groupby("group")["deputy_id"].transform("size")
+    shared = memberships[(deputies_per_group > 1) & (deputies_per_group <= max_group_deputies)]
+    pairs = shared.merge(shared, on="group", suffixes=("_a", "_b"))
+    pairs = pairs[pairs["deputy_id_a"] < pairs["deputy_id_b"]]
+    overlap = (
+        pairs.groupby(["deputy_id_a", "deputy_id_b"]).size().rename("shared_propositions").reset_index()
+    )
+    overlap["propositions_a"] = totals.loc[overlap["deputy_id_a"]].to_numpy()
+    overlap["propositions_b"] = totals.loc[overlap["deputy_id_b"]].to_numpy()
+    union = overlap["propositions_a"] + overlap["propositions_b"] - overlap["shared_propositions"]
+    overlap["jaccard"] = (overlap["shared_propositions"] / union).round(4)
+    overlap["overlap"] = (
+        overlap["shared_propositions"] / overlap[["propositions_a", "propositions_b"]].min(axis=1)
+    ).round(4)
+    return overlap.sort_values(["deputy_id_a", "deputy_id_b"], ignore_index=True)
+
+
+def save_gold_table(con: duckdb.DuckDBPyConnection, table: str, df: pd.DataFrame) -> None:
+    """Replace gold.<table> with `df` and export it like the SQL models, to <table>_parquet."""
+    con.register("gold_frame", df)
+    con.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+    con.execute(f"CREATE OR REPLACE TABLE gold.{table} AS SELECT * FROM gold_frame;")
+    con.unregister("gold_frame")
+    path = f"{GOLD_DIR}/{table}_parquet"
+    con.execute(f"COPY gold.{table} TO '{path}' (FORMAT PARQUET);")
+    logging.info(f"Saved {len(df)} rows to gold.{table} and {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Find shared and near-duplicate propositions and the deputies who share them."
+    )
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_JACCARD)
+    parser.add_argument(
+        "--max-group-deputies",
+        type=int,
+        default=MAX_GROUP_DEPUTIES,
+        help="Ignore ementas shared by more deputies than this when counting overlap",
+    )
+    args = parser.parse_args()
+
+    con = duckdb.connect(DB_PATH)
+    propositions = con.execute(
+        "SELECT proposition_id, deputy_id, ementa FROM silver.fact_propositions ORDER BY proposition_id"
+    ).df()
+    groups = find_near_duplicates(propositions["ementa"].tolist(), args.threshold)
+
+    duplicates = proposition_duplicates(propositions, groups)
+    overlap = deputy_overlap(propositions, groups, args.max_group_deputies)
+    save_gold_table(con, DUPLICATES_TABLE, duplicates)
+    save_gold_table(con, OVERLAP_TABLE, overlap)
+    con.close()
+    logging.info(
+        f"{duplicates['group_id'].nunique()} shared or near-duplicate ementas, "
+        f"{len(overlap)} deputy pairs with propositions in common"
+    )
+
+
+if __name__ == "__main__":
+    main()